@@ -1,5 +1,16 @@
-export async function GET() {
-  const res = await fetch("http://localhost:8000/predict?x=5");
-  const data = await res.json();
-  return Response.json(data);
-} 
\ No newline at end of file
+const BACKEND_URL = "http://localhost:8000";
+
+// Proxies /api?... to the prediction backend and passes the body through as a
+// stream, so NDJSON / SSE points reach the client as soon as they are produced.
+// Views that only need a few hundred vertices should pass max_points (or
+// tolerance, in meters) to get a simplified level of detail of the trajectory.
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url);
+  const res = await fetch(`${BACKEND_URL}/predict?${searchParams}`);
+  const headers = new Headers();
+  for (const name of ["content-type", "x-trajectory-shape", "x-trajectory-columns"]) {
+    const value = res.headers.get(name);
+    if (value) headers.set(name, value);
+  }
+  return new Response(res.body, { status: res.status, headers });
+}
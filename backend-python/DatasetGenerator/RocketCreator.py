@@ -2,23 +2,22 @@ import numpy as np
 from rocketpy import Environment,Rocket,Flight
 from rocketpy.simulation import FlightDataExporter
 import motor_closed_rocket as mc
+import geodesy
+import trajectory_lod
 import datetime
 
 class RocketCreator:
-    def __init__(self,delay=0,heading = 220,ramp_inclinaison = 85,motor_name = "Pro75M1670",radius = 127 / 2000,mass = 14.426,inertia = (6.321, 6.321, 0.034),center_of_mass_without_motor=1,cone_length = 0.55829, rocket_length = 2.533, fin_cat = "trapezoidal",number_of_ailerons = 4,root_chord=0.120,tip_chord=0.060,span=0.110,fins_pos = 0,fin_inclinaison = 0.5,drag_coeff = 1.0,trigger = "apogee"):
-        # Constant
-        self.EARTH_RADIUS = 6371000
-        self.latitude_0 = 43.242222
-        self.longitude_0 = -0.030556
-        self.altitude_0 = 409
-        self.r = self.EARTH_RADIUS + self.altitude_0
+    def __init__(self,delay=0,heading = 220,ramp_inclinaison = 85,motor_name = "Pro75M1670",radius = 127 / 2000,mass = 14.426,inertia = (6.321, 6.321, 0.034),center_of_mass_without_motor=1,cone_length = 0.55829, rocket_length = 2.533, fin_cat = "trapezoidal",number_of_ailerons = 4,root_chord=0.120,tip_chord=0.060,span=0.110,fins_pos = 0,fin_inclinaison = 0.5,drag_coeff = 1.0,trigger = "apogee",launch_site = geodesy.DEFAULT_SITE):
+        # Launch site : a geodesy.LaunchSite or a (latitude, longitude, altitude) tuple
+        self.launch_site = geodesy.as_launch_site(launch_site)
+        self.latitude_0 = self.launch_site.latitude
+        self.longitude_0 = self.launch_site.longitude
+        self.altitude_0 = self.launch_site.altitude
 
 
         # Exported variables
-            # Initial position :
-        self.x0 = self.r * np.cos(self.latitude_0) * np.cos(self.longitude_0)
-        self.y0 = self.r * np.cos(self.latitude_0) * np.sin(self.longitude_0)
-        self.z0 = self.r * np.sin(self.latitude_0)
+            # Initial position (ECEF, WGS84) :
+        self.x0, self.y0, self.z0 = self.launch_site.ecef
             # Ramp info :
         self.heading = heading
         self.ramp_inclinaison = ramp_inclinaison
@@ -45,7 +44,7 @@ class RocketCreator:
 
 
         # Environment variables
-        self.environment = Environment(latitude=self.latitude_0, longitude=0, elevation=self.altitude_0)
+        self.environment = Environment(latitude=self.latitude_0, longitude=self.longitude_0, elevation=self.altitude_0)
         self.date = datetime.date.today() + datetime.timedelta(days=delay)
         self.environment.set_date((self.date.year, self.date.month, self.date.day, 12))
         self.environment.set_atmospheric_model(type="forecast", file="GFS")
@@ -107,11 +106,13 @@ class RocketCreator:
         self.flight = Flight(rocket=self.rocket, environment=self.environment, rail_length=5.2, inclination=self.ramp_inclinaison, heading=self.heading)
         self.flight.env.longitude = self.longitude_0
 
-    def plot_flight(self, trajectory_filepath=None, kml_filepath=None, show_plots=True, wind_filepath=None):
+    def plot_flight(self, trajectory_filepath=None, kml_filepath=None, show_plots=True, wind_filepath=None,
+                    kml_tolerance=1.0):
         """
         Plots the flight and exports data.
         If filepaths are provided, data is saved to them.
         Set show_plots=False to disable popping up 3D plot windows.
+        kml_tolerance (m) is the level of detail of the KML path (None keeps every point).
         """
 
         # 1. Plotting
@@ -121,11 +122,7 @@ class RocketCreator:
             # 2. KML Export
         # Use the provided kml_filepath, or default to "trajectory.kml"
         kml_name = kml_filepath if kml_filepath else "trajectory.kml"
-        FlightDataExporter(self.flight).export_kml(
-            file_name=kml_name,
-            extrude=True,
-            altitude_mode="relativetoground",
-        )
+        self.export_kml(kml_name, kml_tolerance)
 
         exporter = FlightDataExporter(self.flight)
 
@@ -137,10 +134,24 @@ class RocketCreator:
         # Added 't' to match the data you were saving in dataset_generator.py
         exporter.export_data(traj_name, "x", "y", "z")
 
-        # 4. Wind Data Export (Keeps original behavior)
-        # This will just overwrite "wind_data.csv" every time, which is fine.
-        wind_name = wind_filepath if wind_filepath else "wind_data.csv"
-        exporter.export_data(wind_name, "z", "wind_velocity_x", "wind_velocity_y")
+        # 4. Wind Data Export, only on request: the dataset stores one wind profile per
+        # atmosphere snapshot instead (see wind_profiles.py)
+        if wind_filepath:
+            exporter.export_data(wind_filepath, "z", "wind_velocity_x", "wind_velocity_y")
+
+    def export_kml(self, kml_filepath, tolerance=1.0):
+        """
+        Exports the trajectory to KML, converting the local x/y/z solution to WGS84 in one pass.
+        The path is simplified to the given tolerance (m); launch, apogee and landing stay exact.
+        """
+        solution = trajectory_lod.simplify(np.array(self.flight.solution)[:, :4], tolerance=tolerance)
+        x, y, z = solution[:, 1], solution[:, 2], solution[:, 3]
+        # The rail stands on the ground elevation of the atmospheric model
+        ground = self.environment.elevation
+        site = geodesy.LaunchSite(self.launch_site.latitude, self.launch_site.longitude, ground)
+        latitude, longitude, _ = geodesy.local_to_geodetic(x, y, z, site)
+        geodesy.write_kml(kml_filepath, latitude, longitude, z - ground, extrude=True,
+                          altitude_mode="relativeToGround")
 
     def is_stable(self):
         burnout_time = self.motor.burn_out_time
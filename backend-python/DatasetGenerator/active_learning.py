@@ -0,0 +1,230 @@
+import argparse
+import ast
+import os
+import random
+import traceback
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesClassifier, ExtraTreesRegressor
+
+from dataset_generator import (FIN_CHOICES, MASTER_INPUT_FILE, MOTOR_CHOICES, OUTPUT_DIR, TRIGGER_CHOICES,
+                               USE_CACHE, get_random_params, simulate_rocket)
+from dataset_index import next_rocket_number, summarize_trajectory, trajectory_path
+from simulation_cache import SimulationCache
+
+# Active learning on top of dataset_generator.py: instead of simulating uniformly random
+# rockets, every round fits a cheap ensemble surrogate (extremely randomized trees) from the
+# launch parameters to the flight summary of the rockets simulated so far, draws a large batch
+# of candidates with get_random_params(), and simulates only the ones the trees disagree on
+# most, among those predicted to be stable. The master inputs file grows exactly as with
+# dataset_generator.py, so the training pipeline does not change.
+#
+#   python active_learning.py --rounds 10 --batch 20 --candidates 5000
+
+# --- Configuration ---
+ROUNDS = 5
+BATCH_SIZE = 20
+N_CANDIDATES = 5000
+N_ESTIMATORS = 100
+# Candidates below this predicted probability of being stable are never simulated
+STABILITY_THRESHOLD = 0.5
+# With fewer verdicts of either kind, every candidate is assumed to be stable
+MIN_VERDICTS = 10
+LOG_FILE = os.path.join(OUTPUT_DIR, "active_learning_log.csv")
+
+NUMERIC_PARAMS = [
+    "delay", "heading", "ramp_inclinaison", "radius", "mass", "inertia_ixy", "inertia_iz",
+    "center_of_mass_without_motor", "cone_length", "rocket_length", "number_of_ailerons", "root_chord",
+    "tip_chord", "span", "fins_pos", "fin_inclinaison", "drag_coeff",
+]
+CATEGORIES = {"motor_name": MOTOR_CHOICES, "fin_cat": FIN_CHOICES, "trigger": TRIGGER_CHOICES}
+# Flight summary (see dataset_index.py) the surrogate learns to predict
+TARGETS = ["apogee", "apogee_time", "flight_time", "landing_x", "landing_y", "max_speed"]
+
+
+def encode_params(params_list):
+    """Feature matrix of get_random_params() dicts, master input rows or cached params."""
+    df = pd.DataFrame(params_list)
+    inertia = [ast.literal_eval(i) if isinstance(i, str) else i for i in df["inertia"]]
+    df["inertia_ixy"] = [i[0] for i in inertia]
+    df["inertia_iz"] = [i[2] for i in inertia]
+    columns = [df[NUMERIC_PARAMS].astype(float).to_numpy()]
+    for name, choices in CATEGORIES.items():
+        values = df[name].astype(str).to_numpy()
+        columns.append(np.stack([values == str(choice) for choice in choices], axis=1).astype(float))
+    return np.hstack(columns)
+
+
+class Surrogate:
+    """Committee of randomized trees; their spread on a candidate measures how uncertain it is."""
+
+    def __init__(self, n_estimators=N_ESTIMATORS, seed=None):
+        self.model = ExtraTreesRegressor(n_estimators=n_estimators, bootstrap=True, oob_score=True,
+                                         min_samples_leaf=2, n_jobs=-1, random_state=seed)
+
+    def fit(self, X, Y):
+        # Targets are standardized so that every summary weighs the same in the disagreement
+        self.mean = Y.mean(axis=0)
+        self.scale = np.where(Y.std(axis=0) > 0, Y.std(axis=0), 1.0)
+        self.Y_scaled = (Y - self.mean) / self.scale
+        self.model.fit(X, self.Y_scaled)
+        return self
+
+    def oob_error(self):
+        """Out-of-bag MAE of every target, in its own units: the accuracy estimate of the round."""
+        error = np.abs(self.model.oob_prediction_ - self.Y_scaled) * self.scale
+        return dict(zip(TARGETS, np.nanmean(error, axis=0)))
+
+    def disagreement(self, X):
+        per_tree = np.stack([tree.predict(X) for tree in self.model.estimators_])  # (trees, candidates, targets)
+        return per_tree.std(axis=0).mean(axis=1)
+
+
+class StabilityModel:
+    """P(stable) learned from every simulation verdict seen so far (cache included)."""
+
+    def __init__(self, n_estimators=N_ESTIMATORS, seed=None):
+        self.model = ExtraTreesClassifier(n_estimators=n_estimators, min_samples_leaf=2, n_jobs=-1,
+                                          random_state=seed)
+        self.fitted = False
+
+    def fit(self, X, stable):
+        stable = np.asarray(stable, dtype=bool)
+        self.fitted = min(stable.sum(), (~stable).sum()) >= MIN_VERDICTS
+        if self.fitted:
+            self.model.fit(X, stable)
+        return self
+
+    def probability(self, X):
+        if not self.fitted:
+            return np.ones(len(X))
+        return self.model.predict_proba(X)[:, list(self.model.classes_).index(True)]
+
+
+def select_batch(X, scores, batch_size):
+    """
+    Highest-scoring candidates, skipping any that is closer to an already selected one than
+    the typical spacing of the shortlist, so a batch does not pile up in a single region.
+    """
+    shortlist = np.argsort(-scores)[:batch_size * 10]
+    Z = X[shortlist]
+    Z = (Z - Z.mean(axis=0)) / np.where(Z.std(axis=0) > 0, Z.std(axis=0), 1.0)
+    distances = np.linalg.norm(Z[:, None, :] - Z[None, :, :], axis=2)
+    min_distance = np.quantile(distances[np.triu_indices(len(Z), k=1)], 0.05) if len(Z) > 1 else 0.0
+    chosen = []
+    for i in range(len(shortlist)):
+        if len(chosen) == batch_size:
+            break
+        if not chosen or distances[i, chosen].min() >= min_distance:
+            chosen.append(i)
+    return shortlist[chosen]
+
+
+def load_dataset(master_input_file=MASTER_INPUT_FILE):
+    """
+    Master input table, plus the rows that have a usable trajectory and their flight
+    summaries (the surrogate's training set).
+    """
+    if not os.path.exists(master_input_file):
+        return pd.DataFrame(columns=["rocket_id"]), [], np.empty((0, len(TARGETS)))
+    df_inputs = pd.read_csv(master_input_file)
+    summaries = [summarize_trajectory(trajectory_path(f)) for f in df_inputs["trajectory_file"]]
+    found = [s is not None and s["rows"] > 1 for s in summaries]
+    rows = [row for row, ok in zip(df_inputs.to_dict("records"), found) if ok]
+    Y = np.array([[s[t] for t in TARGETS] for s, ok in zip(summaries, found) if ok], dtype=float)
+    return df_inputs, rows, Y.reshape(-1, len(TARGETS))
+
+
+def run_active_learning(rounds=ROUNDS, batch_size=BATCH_SIZE, n_candidates=N_CANDIDATES, seed=None,
+                        master_input_file=MASTER_INPUT_FILE, log_file=LOG_FILE):
+    if seed is not None:
+        random.seed(seed)  # get_random_params() draws from the random module
+    cache = SimulationCache() if USE_CACHE else None
+    df_inputs, rows, Y = load_dataset(master_input_file)
+    if len(rows) < 2 * MIN_VERDICTS:
+        print(f"Error: active learning needs an initial dataset (found {len(rows)} rockets). "
+              f"Run dataset_generator.py first.")
+        return
+    print(f"Starting active learning from {len(rows)} rockets: {rounds} rounds of {batch_size} simulations.")
+
+    # Stability verdicts: the dataset rockets are stable, the cache also knows the unstable ones
+    verdict_params = list(rows)
+    verdicts = [True] * len(rows)
+    if cache is not None:
+        for params, stable in cache.verdicts():
+            verdict_params.append(params)
+            verdicts.append(stable)
+
+    log = []
+    next_number = next_rocket_number(df_inputs["rocket_id"])
+    for round_number in range(1, rounds + 1):
+        round_seed = None if seed is None else seed + round_number
+        surrogate = Surrogate(seed=round_seed).fit(encode_params(rows), Y)
+        stability = StabilityModel(seed=round_seed).fit(encode_params(verdict_params), verdicts)
+
+        candidates = [get_random_params() for _ in range(n_candidates)]
+        X_candidates = encode_params(candidates)
+        disagreement = surrogate.disagreement(X_candidates)
+        p_stable = stability.probability(X_candidates)
+        # Expected information: uncertainty weighted by the chance that the simulation is usable
+        scores = np.where(p_stable >= STABILITY_THRESHOLD, disagreement * p_stable, -np.inf)
+        selected = select_batch(X_candidates, scores, batch_size)
+        selected = selected[np.isfinite(scores[selected])]
+
+        new_rows, new_targets, stable_count = [], [], 0
+        for i in selected:
+            params = candidates[i]
+            rocket_id = f"rocket_{next_number:04d}"
+            try:
+                input_data = simulate_rocket(params, rocket_id, cache)
+            except Exception:
+                traceback.print_exc()
+                continue
+            verdict_params.append(params)
+            verdicts.append(input_data is not None)
+            if input_data is None:
+                continue
+            summary = summarize_trajectory(trajectory_path(input_data["trajectory_file"]))
+            if summary is None or summary["rows"] < 2:
+                continue
+            next_number += 1
+            stable_count += 1
+            new_rows.append(input_data)
+            new_targets.append([summary[t] for t in TARGETS])
+
+        if new_rows:
+            rows.extend(new_rows)
+            Y = np.vstack([Y, np.array(new_targets, dtype=float)])
+            df_inputs = pd.concat([df_inputs, pd.DataFrame(new_rows)], ignore_index=True)
+            df_inputs.to_csv(master_input_file, index=False)
+
+        oob = surrogate.oob_error()
+        log.append({
+            "round": round_number,
+            "rockets": len(df_inputs),
+            "simulated": len(selected),
+            "stable": stable_count,
+            "disagreement_selected": float(disagreement[selected].mean()) if len(selected) else np.nan,
+            "disagreement_candidates": float(disagreement.mean()),
+            "stability_model": stability.fitted,
+            **{f"oob_mae_{t}": v for t, v in oob.items()},
+        })
+        print(f"Round {round_number}: {stable_count}/{len(selected)} stable, dataset {len(df_inputs)} rockets, "
+              f"disagreement {log[-1]['disagreement_selected']:.3f} (candidates {log[-1]['disagreement_candidates']:.3f}), "
+              f"OOB apogee MAE {oob['apogee']:.1f} m")
+        pd.DataFrame(log).to_csv(log_file, index=False)
+
+    print(f"\nMaster input data saved to: {master_input_file}")
+    print(f"Round log saved to: {log_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate the rockets the surrogate model is least sure about.")
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="simulations per round")
+    parser.add_argument("--candidates", type=int, default=N_CANDIDATES, help="random candidates scored per round")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    run_active_learning(args.rounds, args.batch, args.candidates, args.seed)
@@ -7,19 +7,24 @@ import traceback
 # Import the tqdm library
 from tqdm import tqdm
 from RocketCreator import RocketCreator
+from simulation_cache import SimulationCache, atmosphere_snapshot
+from wind_profiles import PROFILE_DIR, WindProfileStore, profile_id, sample_environment
 
 # --- Configuration ---
 NUM_ROCKETS_TO_GENERATE = 5
 OUTPUT_DIR = "dataset"
 TRAJECTORY_DIR = os.path.join(OUTPUT_DIR, "trajectories")
-WIND_DIR = os.path.join(OUTPUT_DIR, "wind")
 KLM_DIR = os.path.join(OUTPUT_DIR, "klm_files")
 MASTER_INPUT_FILE = os.path.join(OUTPUT_DIR, "master_rocket_inputs.csv")
+USE_CACHE = True  # Reuse the results of identical simulations (see simulation_cache.py)
 
 # Ensure output directories exist
 os.makedirs(TRAJECTORY_DIR, exist_ok=True)
-os.makedirs(WIND_DIR, exist_ok=True)  # Added for completeness
 os.makedirs(KLM_DIR, exist_ok=True)  # Added for completeness
+os.makedirs(PROFILE_DIR, exist_ok=True)
+
+# Wind profiles shared by the rockets of the same atmosphere snapshot (see wind_profiles.py)
+WIND_PROFILES = WindProfileStore(PROFILE_DIR)
 
 # Define choices for categorical parameters
 MOTOR_CHOICES = ["Pro75M1670", "Pro75-3G", "Pro54-5G Barasinga"]
@@ -89,7 +94,51 @@ def get_random_params():
     }
     return params
 
-# ... (Imports and get_random_params remain the same) ...
+
+def simulate_rocket(params, rocket_id, cache=None, trajectory_dir=TRAJECTORY_DIR, klm_dir=KLM_DIR, profiles=None):
+    """
+    Simulates one rocket and exports its files, or restores them from the cache when the
+    same simulation already ran. Returns the master input row, or None if it is unstable.
+    The wind is stored once per atmosphere snapshot and referenced by wind_profile_id.
+    """
+    profiles = profiles or WIND_PROFILES
+    wind_profile_id = profile_id(atmosphere_snapshot(params))
+    paths = {
+        "trajectory": os.path.join(trajectory_dir, f"{rocket_id}_trajectory.csv"),
+        "kml": os.path.join(klm_dir, f"{rocket_id}_klm.kml"),
+    }
+
+    entry = cache.get(params) if cache is not None else None
+    if entry is not None and entry["stable"] and wind_profile_id not in profiles:
+        entry = None  # The profile store lost this snapshot: simulate again to sample it
+    if entry is not None:
+        stable = entry["stable"]
+        if stable:
+            cache.restore(entry, paths)
+    else:
+        rocket_sim = RocketCreator(**params)
+        stable = rocket_sim.is_stable()
+        if stable:
+            # Call the plot_flight method
+            rocket_sim.plot_flight(
+                trajectory_filepath=paths["trajectory"],
+                show_plots=False,
+                kml_filepath=paths["kml"]
+            )
+            profiles.put(wind_profile_id, *sample_environment(rocket_sim.environment))
+        if cache is not None:
+            cache.put(params, stable, paths if stable else None)
+
+    if not stable:
+        return None
+    input_data = params.copy()
+    input_data['rocket_id'] = rocket_id
+    input_data['trajectory_file'] = paths["trajectory"]
+    input_data['wind_profile_id'] = wind_profile_id
+    input_data['inertia'] = str(input_data['inertia'])
+    return input_data
+
+
 # Define ANSI color code for Cobalt Blue (Bright Blue)
 COBALT_BLUE = '\033[94m'
 RESET_COLOR = '\033[94m'
@@ -98,6 +147,7 @@ RESET_COLOR = '\033[94m'
 def main():
     print(f"Starting dataset generation. Target: {NUM_ROCKETS_TO_GENERATE} stable rockets.")
 
+    cache = SimulationCache() if USE_CACHE else None
     successful_simulations = []
     rocket_id_counter = 0
     success_count = 0
@@ -121,12 +171,13 @@ def main():
             # 1. Generate random inputs
             params = get_random_params()
 
-            # 2. Create the rocket instance
-            rocket_sim = RocketCreator(**params)
+            # 2. Simulate the rocket (or restore it from the cache) and save its data
+            rocket_id = f"rocket_{len(successful_simulations):04d}"
+            input_data = simulate_rocket(params, rocket_id, cache)
             rocket_id_counter += 1  # Increment attempt counter here
 
             # 3. Check for stability
-            if not rocket_sim.is_stable():
+            if input_data is None:
                 failure_count += 1
 
                 # --- Progress Bar Update (Failure) ---
@@ -138,29 +189,7 @@ def main():
                 })
                 continue
 
-            # 4. Save the data (Success path)
-            rocket_id = f"rocket_{len(successful_simulations):04d}"
-            wind_filename = f"{rocket_id}_wind.csv"
-            wind_filepath = os.path.join(WIND_DIR, wind_filename)
-            klm_filename = f"{rocket_id}_klm.kml"
-            kml_filepath = os.path.join(KLM_DIR, klm_filename)
-            trajectory_filename = f"{rocket_id}_trajectory.csv"
-            trajectory_filepath = os.path.join(TRAJECTORY_DIR, trajectory_filename)
-
-            # Call the plot_flight method
-            rocket_sim.plot_flight(
-                trajectory_filepath=trajectory_filepath,
-                show_plots=False,
-                wind_filepath=wind_filepath,
-                kml_filepath=kml_filepath
-            )
-
-            # 5. Store input parameters
-            input_data = params.copy()
-            input_data['rocket_id'] = rocket_id
-            input_data['trajectory_file'] = trajectory_filepath
-            input_data['inertia'] = str(input_data['inertia'])
-
+            # 4. Store input parameters (Success path)
             successful_simulations.append(input_data)
             success_count += 1
 
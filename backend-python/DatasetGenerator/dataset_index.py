@@ -0,0 +1,162 @@
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "MachineLearning"))
+from preprocessing import resolve_trajectory_path
+
+# Per-rocket summary index over dataset/trajectories, joined to the master inputs.
+# The trajectories are scanned once (in parallel); questions such as "which rockets reach
+# 3 km" or "max downrange per motor" and the dataset sanity checks then only read the index.
+#
+#   python dataset_index.py build
+#   python dataset_index.py query "apogee > 3000 and motor_name == 'Pro75-3G'"
+#   python dataset_index.py check
+
+OUTPUT_DIR = "dataset"
+MASTER_INPUT_FILE = os.path.join(OUTPUT_DIR, "master_rocket_inputs.csv")
+INDEX_FILE = os.path.join(OUTPUT_DIR, "rocket_index.csv")
+
+SUMMARY_COLUMNS = [
+    "rows", "flight_time", "launch_altitude", "apogee", "apogee_time", "landing_x", "landing_y",
+    "landing_altitude", "downrange", "max_speed", "launch_wind_x", "launch_wind_y",
+    "time_monotonic", "nan_values",
+]
+
+
+def trajectory_path(trajectory_file):
+    """Path of a trajectory_file of the master inputs, relative to DatasetGenerator."""
+    return resolve_trajectory_path(str(trajectory_file), "")
+
+
+def next_rocket_number(rocket_ids):
+    """Number of the next rocket_XXXX id after the ones already in the dataset."""
+    numbers = [int(m.group(1)) for m in (re.fullmatch(r"rocket_(\d+)", str(r)) for r in rocket_ids) if m]
+    return max(numbers, default=-1) + 1
+
+
+def summarize_trajectory(path):
+    """Summary of one trajectory file; None when the file is missing or unreadable."""
+    try:
+        df = pd.read_csv(path)
+    except (OSError, pd.errors.ParserError, pd.errors.EmptyDataError):
+        return None
+    if df.empty:
+        return dict.fromkeys(SUMMARY_COLUMNS, np.nan) | {"rows": 0}
+    t = df["time"].to_numpy()
+    xyz = df[["x", "y", "z"]].to_numpy()
+    z0 = xyz[0, 2]
+    i_apogee = int(np.argmax(xyz[:, 2]))
+    dt = np.diff(t)
+    step = np.linalg.norm(np.diff(xyz, axis=0), axis=1)
+    moving = dt > 0
+    has_wind = "wind_velocity_x" in df and "wind_velocity_y" in df
+    return {
+        "rows": len(df),
+        "flight_time": t[-1] - t[0],
+        "launch_altitude": z0,
+        "apogee": xyz[i_apogee, 2] - z0,
+        "apogee_time": t[i_apogee] - t[0],
+        "landing_x": xyz[-1, 0],
+        "landing_y": xyz[-1, 1],
+        "landing_altitude": xyz[-1, 2],
+        "downrange": float(np.hypot(xyz[-1, 0], xyz[-1, 1])),
+        "max_speed": float((step[moving] / dt[moving]).max()) if moving.any() else 0.0,
+        "launch_wind_x": df["wind_velocity_x"].iloc[0] if has_wind else np.nan,
+        "launch_wind_y": df["wind_velocity_y"].iloc[0] if has_wind else np.nan,
+        "time_monotonic": bool(np.all(dt >= 0)),
+        "nan_values": int(df.isna().to_numpy().sum()),
+    }
+
+
+def fill_launch_wind(df_summary, df_inputs):
+    """Launch wind of the trajectories without wind columns, from their shared wind profile."""
+    from wind_profiles import PROFILE_COLUMN, WindProfileStore
+    if PROFILE_COLUMN not in df_inputs:
+        return
+    missing = (df_summary["launch_wind_x"].isna() & df_inputs[PROFILE_COLUMN].notna()
+               & df_summary["launch_altitude"].notna()).to_numpy()
+    if missing.any():
+        wind = WindProfileStore().lookup(df_inputs.loc[missing, PROFILE_COLUMN].to_numpy(),
+                                         df_summary.loc[missing, "launch_altitude"].to_numpy())
+        df_summary.loc[missing, ["launch_wind_x", "launch_wind_y"]] = wind
+
+
+def build_index(master_input_file=MASTER_INPUT_FILE, index_file=INDEX_FILE, workers=None):
+    df_inputs = pd.read_csv(master_input_file)
+    paths = [trajectory_path(f) for f in df_inputs["trajectory_file"]]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        summaries = list(pool.map(summarize_trajectory, paths, chunksize=16))
+
+    df_summary = pd.DataFrame([s if s is not None else {} for s in summaries], columns=SUMMARY_COLUMNS)
+    df_summary.insert(0, "trajectory_found", [s is not None for s in summaries])
+    fill_launch_wind(df_summary, df_inputs)
+    df_index = pd.concat([df_inputs.reset_index(drop=True), df_summary], axis=1)
+    df_index.to_csv(index_file, index=False)
+    print(f"Indexed {int(df_summary['trajectory_found'].sum())}/{len(df_inputs)} trajectories into '{index_file}'.")
+    return df_index
+
+
+def load_index(index_file=INDEX_FILE):
+    return pd.read_csv(index_file)
+
+
+def query(expression, index_file=INDEX_FILE):
+    """Filters the index with a pandas query, e.g. "apogee > 3000 and fin_cat == 'elyptique'"."""
+    return load_index(index_file).query(expression)
+
+
+def load_trajectories(selection):
+    """Loads only the trajectories of the selected index rows: {rocket_id: DataFrame}."""
+    return {row.rocket_id: pd.read_csv(trajectory_path(row.trajectory_file))
+            for row in selection.itertuples() if row.trajectory_found}
+
+
+def check_index(df_index, ground_tolerance=50.0):
+    """Sanity checks run on the index only. Returns a list of (rocket_id, problem)."""
+    checks = [
+        (~df_index["trajectory_found"], "trajectory file missing or unreadable"),
+        (df_index["rows"] < 2, "trajectory has fewer than 2 points"),
+        (df_index["nan_values"] > 0, "trajectory contains NaN values"),
+        (df_index["time_monotonic"] == False, "time is not monotonic"),  # noqa: E712 (NaN-safe)
+        (df_index["flight_time"] <= 0, "non-positive flight time"),
+        (df_index["apogee"] <= 0, "rocket never climbs above the pad"),
+        ((df_index["landing_altitude"] - df_index["launch_altitude"]).abs() > ground_tolerance,
+         "flight does not end near ground level"),
+        (df_index["rocket_id"].duplicated(keep=False), "duplicated rocket_id"),
+    ]
+    problems = []
+    for mask, message in checks:
+        for rocket_id in df_index.loc[mask.fillna(False).astype(bool), "rocket_id"]:
+            problems.append((rocket_id, message))
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-rocket summary index of the trajectory dataset.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="scan the trajectories and write the index")
+    build_parser.add_argument("--workers", type=int, default=None)
+    query_parser = subparsers.add_parser("query", help="filter rockets with a pandas query expression")
+    query_parser.add_argument("expression")
+    query_parser.add_argument("--columns", default="rocket_id,motor_name,apogee,flight_time,downrange")
+    subparsers.add_parser("check", help="run the dataset sanity checks on the index")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_index(workers=args.workers)
+    elif args.command == "query":
+        selection = query(args.expression)
+        print(selection[args.columns.split(",")].to_string(index=False))
+        print(f"\n{len(selection)} rockets selected.")
+    else:
+        problems = check_index(load_index())
+        for rocket_id, message in problems:
+            print(f"{rocket_id}: {message}")
+        print(f"\n{len(problems)} problems found.")
+        sys.exit(1 if problems else 0)
@@ -0,0 +1,395 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+import pandas as pd
+
+from dataset_generator import (KLM_DIR, MASTER_INPUT_FILE, TRAJECTORY_DIR, USE_CACHE, WIND_PROFILES,
+                               get_random_params, simulate_rocket)
+from dataset_index import next_rocket_number
+from simulation_cache import SimulationCache
+from wind_profiles import PROFILE_COLUMN, WindProfileStore
+
+# Dataset generation over several machines sharing a directory (NFS, SMB, ...), without any
+# server: the coordinator writes seeded work chunks to the queue directory, workers on any node
+# claim them with lock files created atomically (O_CREAT | O_EXCL), simulate them into their
+# own shard, and the merge step renumbers every shard into dataset/ and master_rocket_inputs.csv.
+#
+#   python distributed_generation.py init /shared/queue --rockets 100000 --chunk-size 100 --seed 1
+#   python distributed_generation.py worker /shared/queue --processes 8      # on every node
+#   python distributed_generation.py status /shared/queue
+#   python distributed_generation.py merge /shared/queue
+#
+# A worker refreshes the mtime of its lock while it works. A lock older than the lease belongs
+# to a dead worker: another worker steals it and redoes the chunk from its seed (the simulation
+# cache makes the rockets already simulated on that node cheap). A shard only appears, by an
+# atomic rename, once its chunk is complete, so a half-done chunk is never merged.
+
+# --- Configuration ---
+CHUNK_SIZE = 100  # stable rockets per chunk
+LEASE_TIMEOUT = 600  # seconds without heartbeat before a claim is considered dead
+HEARTBEAT_INTERVAL = 60
+POLL_INTERVAL = 30  # seconds between claim attempts while other workers hold the last chunks
+MAX_ATTEMPTS_FACTOR = 20  # a chunk gives up after chunk_size * factor candidates
+
+
+class LeaseLost(Exception):
+    pass
+
+
+# --- 1. Queue layout ---
+def queue_paths(queue_dir):
+    return {name: os.path.join(queue_dir, name) for name in ("chunks", "claims", "shards", "wind_profiles")}
+
+
+def chunk_name(index):
+    return f"chunk_{index:05d}"
+
+
+def init_queue(queue_dir, rockets, chunk_size=CHUNK_SIZE, seed=None):
+    """Writes one seeded chunk file per chunk_size stable rockets."""
+    paths = queue_paths(queue_dir)
+    if os.path.exists(os.path.join(queue_dir, "queue.json")):
+        print(f"Error: a queue already exists in '{queue_dir}'.")
+        return
+    for path in paths.values():
+        os.makedirs(path, exist_ok=True)
+    seed = random.SystemRandom().getrandbits(32) if seed is None else seed
+    rng = random.Random(seed)
+    n_chunks = -(-rockets // chunk_size)
+    for index in range(n_chunks):
+        chunk = {"chunk": index, "seed": rng.getrandbits(63), "rockets": min(chunk_size, rockets - index * chunk_size)}
+        with open(os.path.join(paths["chunks"], chunk_name(index) + ".json"), "w") as f:
+            json.dump(chunk, f)
+    # Written last: workers only start on a complete queue
+    with open(os.path.join(queue_dir, "queue.json"), "w") as f:
+        json.dump({"rockets": rockets, "chunks": n_chunks, "chunk_size": chunk_size, "seed": seed,
+                   "created": time.time()}, f)
+    print(f"Queue '{queue_dir}': {n_chunks} chunks of up to {chunk_size} rockets (seed {seed}).")
+
+
+def load_chunks(queue_dir):
+    chunks_dir = queue_paths(queue_dir)["chunks"]
+    chunks = []
+    for name in sorted(os.listdir(chunks_dir)):
+        if name.endswith(".json"):
+            with open(os.path.join(chunks_dir, name)) as f:
+                chunks.append(json.load(f))
+    return chunks
+
+
+def shard_dir(queue_dir, index):
+    return os.path.join(queue_paths(queue_dir)["shards"], chunk_name(index))
+
+
+def is_done(queue_dir, index):
+    return os.path.exists(os.path.join(shard_dir(queue_dir, index), "inputs.csv"))
+
+
+# --- 2. Claims ---
+class Claim:
+    """Lock file of one chunk, owned through the random token written in it."""
+
+    def __init__(self, path, token):
+        self.path = path
+        self.token = token
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def acquire(cls, queue_dir, index, lease=LEASE_TIMEOUT):
+        path = os.path.join(queue_paths(queue_dir)["claims"], chunk_name(index) + ".lock")
+        token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except FileNotFoundError:
+            age = None
+        if age is not None:
+            if age < lease:
+                return None
+            # Stale: move it aside; only one of the workers racing for it gets the rename
+            try:
+                os.rename(path, f"{path}.stale-{uuid.uuid4().hex}")
+            except OSError:
+                return None
+            print(f"Reclaiming {chunk_name(index)} (no heartbeat for {age:.0f} s).")
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+        with os.fdopen(fd, "w") as f:
+            f.write(token)
+        return cls(path, token)
+
+    def owned(self):
+        try:
+            with open(self.path) as f:
+                return f.read() == self.token
+        except OSError:
+            return False
+
+    def heartbeat(self):
+        if not self.owned():
+            self.lost = True
+            return
+        os.utime(self.path)
+
+    def start_heartbeat(self, interval=HEARTBEAT_INTERVAL):
+        def beat():
+            while not self._stop.wait(interval) and not self.lost:
+                self.heartbeat()
+
+        self._thread = threading.Thread(target=beat, daemon=True)
+        self._thread.start()
+
+    def check(self):
+        if self.lost:
+            raise LeaseLost(f"{os.path.basename(self.path)} was reclaimed by another worker")
+
+    def release(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.owned():
+            os.remove(self.path)
+
+
+# --- 3. Worker ---
+def run_chunk(queue_dir, chunk, claim, cache, profiles):
+    """Simulates a chunk into a private directory, published as its shard once complete."""
+    index = chunk["chunk"]
+    final_dir = shard_dir(queue_dir, index)
+    work_dir = f"{final_dir}.tmp-{uuid.uuid4().hex}"
+    trajectory_dir = os.path.join(work_dir, "trajectories")
+    klm_dir = os.path.join(work_dir, "klm_files")
+    os.makedirs(trajectory_dir)
+    os.makedirs(klm_dir)
+
+    # get_random_params() draws from the random module: the seed fixes the candidates of the chunk
+    random.seed(chunk["seed"])
+    rows, attempts, start = [], 0, time.time()
+    try:
+        while len(rows) < chunk["rockets"] and attempts < chunk["rockets"] * MAX_ATTEMPTS_FACTOR:
+            claim.check()
+            params = get_random_params()
+            attempts += 1
+            rocket_id = f"{chunk_name(index)}_{len(rows):04d}"
+            try:
+                input_data = simulate_rocket(params, rocket_id, cache, trajectory_dir=trajectory_dir, klm_dir=klm_dir,
+                                             profiles=profiles)
+            except Exception:
+                traceback.print_exc()
+                continue
+            if input_data is not None:
+                # Paths relative to the shard; the merge rewrites them
+                input_data["trajectory_file"] = os.path.basename(input_data["trajectory_file"])
+                rows.append(input_data)
+        claim.check()
+
+        pd.DataFrame(rows).to_csv(os.path.join(work_dir, "inputs.csv"), index=False)
+        with open(os.path.join(work_dir, "chunk.json"), "w") as f:
+            json.dump({**chunk, "stable": len(rows), "attempts": attempts, "seconds": time.time() - start,
+                       "worker": claim.token}, f)
+        os.rename(work_dir, final_dir)
+    except OSError:
+        if not is_done(queue_dir, index):
+            raise
+        # A worker that was wrongly thought dead published the same chunk first
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return len(rows), attempts
+
+
+def run_worker(queue_dir, lease=LEASE_TIMEOUT, poll=POLL_INTERVAL, cache_dir=None):
+    """Claims and simulates chunks until every chunk of the queue is done."""
+    if not os.path.exists(os.path.join(queue_dir, "queue.json")):
+        print(f"Error: no queue in '{queue_dir}'. Run 'init' first.")
+        return
+    cache = (SimulationCache(cache_dir) if cache_dir else SimulationCache()) if USE_CACHE else None
+    profiles = WindProfileStore(queue_paths(queue_dir)["wind_profiles"])
+    chunks = load_chunks(queue_dir)
+    while True:
+        pending = [chunk for chunk in chunks if not is_done(queue_dir, chunk["chunk"])]
+        if not pending:
+            break
+        claimed = False
+        for chunk in pending:
+            claim = Claim.acquire(queue_dir, chunk["chunk"], lease)
+            if claim is None:
+                continue
+            claimed = True
+            claim.start_heartbeat(min(HEARTBEAT_INTERVAL, lease / 4))
+            try:
+                if not is_done(queue_dir, chunk["chunk"]):
+                    stable, attempts = run_chunk(queue_dir, chunk, claim, cache, profiles)
+                    print(f"[{os.getpid()}] {chunk_name(chunk['chunk'])}: {stable} stable / {attempts} attempts")
+            except LeaseLost as e:
+                print(f"[{os.getpid()}] {e}")
+            finally:
+                claim.release()
+        if not claimed:
+            # Every remaining chunk is held by a live worker: wait in case one of them dies
+            time.sleep(poll)
+
+
+def run_workers(queue_dir, processes=1, lease=LEASE_TIMEOUT, poll=POLL_INTERVAL, cache_dir=None):
+    """Several workers on this node (one process each, as RocketPy is single-threaded)."""
+    if processes == 1:
+        run_worker(queue_dir, lease, poll, cache_dir)
+        return
+    import multiprocessing
+    workers = [multiprocessing.Process(target=run_worker, args=(queue_dir, lease, poll, cache_dir))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+# --- 4. Status and merge ---
+def queue_status(queue_dir, lease=LEASE_TIMEOUT):
+    counts = {"done": 0, "running": 0, "stale": 0, "pending": 0}
+    stable = attempts = 0
+    for chunk in load_chunks(queue_dir):
+        index = chunk["chunk"]
+        lock = os.path.join(queue_paths(queue_dir)["claims"], chunk_name(index) + ".lock")
+        if is_done(queue_dir, index):
+            counts["done"] += 1
+            with open(os.path.join(shard_dir(queue_dir, index), "chunk.json")) as f:
+                info = json.load(f)
+            stable += info["stable"]
+            attempts += info["attempts"]
+        elif os.path.exists(lock):
+            counts["running" if time.time() - os.path.getmtime(lock) < lease else "stale"] += 1
+        else:
+            counts["pending"] += 1
+    return counts, stable, attempts
+
+
+def merge_queue(queue_dir, master_input_file=MASTER_INPUT_FILE, allow_partial=False):
+    """
+    Appends the done shards, in chunk order, to the dataset: files move to dataset/ under new
+    sequential rocket ids. The plan is saved before anything moves, so an interrupted merge
+    is resumed by running it again.
+    """
+    state_file = os.path.join(queue_dir, "merge.json")
+    state = {"merged": [], "pending": None}
+    if os.path.exists(state_file):
+        with open(state_file) as f:
+            state = json.load(f)
+
+    df_master = pd.read_csv(master_input_file) if os.path.exists(master_input_file) else pd.DataFrame()
+    if state["pending"] is None:
+        chunks = [c["chunk"] for c in load_chunks(queue_dir) if c["chunk"] not in state["merged"]]
+        done = [index for index in chunks if is_done(queue_dir, index)]
+        if len(done) < len(chunks) and not allow_partial:
+            print(f"Error: {len(chunks) - len(done)} chunks are not done yet (use --partial to merge the others).")
+            return
+        if not done:
+            print("Nothing to merge.")
+            return
+        next_number = next_rocket_number(df_master["rocket_id"]) if "rocket_id" in df_master else 0
+        plan = []
+        for index in done:
+            n_rows = len(pd.read_csv(os.path.join(shard_dir(queue_dir, index), "inputs.csv")))
+            plan.append({"chunk": index, "first": next_number, "rows": n_rows})
+            next_number += n_rows
+        state["pending"] = plan
+        save_merge_state(state_file, state)
+
+    shard_profiles = WindProfileStore(queue_paths(queue_dir)["wind_profiles"])
+    new_rows = []
+    for step in state["pending"]:
+        shard = shard_dir(queue_dir, step["chunk"])
+        df_shard = pd.read_csv(os.path.join(shard, "inputs.csv"))
+        for offset, row in enumerate(df_shard.to_dict("records")):
+            rocket_id = f"rocket_{step['first'] + offset:04d}"
+            moves = {
+                os.path.join(shard, "trajectories", row["trajectory_file"]):
+                    os.path.join(TRAJECTORY_DIR, f"{rocket_id}_trajectory.csv"),
+                os.path.join(shard, "klm_files", f"{row['rocket_id']}_klm.kml"):
+                    os.path.join(KLM_DIR, f"{rocket_id}_klm.kml"),
+            }
+            for source, destination in moves.items():
+                if os.path.exists(source) and not os.path.exists(destination):
+                    shutil.move(source, destination)
+            row["rocket_id"] = rocket_id
+            row["trajectory_file"] = os.path.join(TRAJECTORY_DIR, f"{rocket_id}_trajectory.csv")
+            if isinstance(row.get(PROFILE_COLUMN), str) and row[PROFILE_COLUMN] not in WIND_PROFILES:
+                WIND_PROFILES.put(row[PROFILE_COLUMN], *shard_profiles.get(row[PROFILE_COLUMN]))
+            new_rows.append(row)
+
+    # A previous run may have written the master file before being interrupted
+    if new_rows and not ("rocket_id" in df_master and new_rows[0]["rocket_id"] in set(df_master["rocket_id"])):
+        df_master = pd.concat([df_master, pd.DataFrame(new_rows)], ignore_index=True)
+        tmp_file = master_input_file + ".tmp"
+        df_master.to_csv(tmp_file, index=False)
+        os.replace(tmp_file, master_input_file)
+
+    state["merged"] += [step["chunk"] for step in state["pending"]]
+    state["pending"] = None
+    save_merge_state(state_file, state)
+    if len(state["merged"]) == len(load_chunks(queue_dir)):
+        remove_leftovers(queue_dir)
+    print(f"Merged {len(new_rows)} rockets; '{master_input_file}' now lists {len(df_master)} rockets.")
+
+
+def remove_leftovers(queue_dir):
+    """Work directories and stale locks of dead workers, once nothing can use them anymore."""
+    paths = queue_paths(queue_dir)
+    for name in os.listdir(paths["shards"]):
+        if ".tmp-" in name:
+            shutil.rmtree(os.path.join(paths["shards"], name), ignore_errors=True)
+    for name in os.listdir(paths["claims"]):
+        if ".stale-" in name:
+            os.remove(os.path.join(paths["claims"], name))
+
+
+def save_merge_state(state_file, state):
+    tmp_file = state_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_file, state_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dataset generation over several nodes sharing a directory.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    init_parser = subparsers.add_parser("init", help="write the chunks of a new queue")
+    init_parser.add_argument("queue")
+    init_parser.add_argument("--rockets", type=int, required=True, help="stable rockets to generate")
+    init_parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    init_parser.add_argument("--seed", type=int, default=None)
+    worker_parser = subparsers.add_parser("worker", help="claim and simulate chunks until the queue is done")
+    worker_parser.add_argument("queue")
+    worker_parser.add_argument("--processes", type=int, default=1)
+    worker_parser.add_argument("--lease", type=float, default=LEASE_TIMEOUT, help="seconds before a silent claim is dead")
+    worker_parser.add_argument("--poll", type=float, default=POLL_INTERVAL)
+    worker_parser.add_argument("--cache-dir", default=None, help="simulation cache (e.g. on the shared filesystem)")
+    status_parser = subparsers.add_parser("status", help="progress of the queue")
+    status_parser.add_argument("queue")
+    status_parser.add_argument("--lease", type=float, default=LEASE_TIMEOUT)
+    merge_parser = subparsers.add_parser("merge", help="append the done shards to the dataset")
+    merge_parser.add_argument("queue")
+    merge_parser.add_argument("--partial", action="store_true", help="merge the done chunks even if others remain")
+    args = parser.parse_args()
+
+    if args.command == "init":
+        init_queue(args.queue, args.rockets, args.chunk_size, args.seed)
+    elif args.command == "worker":
+        run_workers(args.queue, args.processes, args.lease, args.poll, args.cache_dir)
+    elif args.command == "status":
+        counts, stable, attempts = queue_status(args.queue, args.lease)
+        print(", ".join(f"{n} {state}" for state, n in counts.items()) + " chunks")
+        if attempts:
+            print(f"{stable} stable rockets out of {attempts} attempts ({stable / attempts:.0%}).")
+    else:
+        merge_queue(args.queue, allow_partial=args.partial)
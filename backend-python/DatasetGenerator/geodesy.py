@@ -0,0 +1,139 @@
+"""
+Vectorized conversions between the local launch frame, ECEF and WGS84 coordinates.
+
+The local frame is the one of the RocketPy trajectories: x towards East and y towards
+North (meters from the launch rail), z the altitude above sea level. Every function
+accepts scalars or NumPy arrays of any (broadcastable) shape, so whole trajectories or
+batches of rockets (rockets x points) are converted in one call, without Python loops.
+"""
+import numpy as np
+
+# WGS84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+WGS84_EP2 = WGS84_E2 / (1 - WGS84_E2)
+
+
+def geodetic_to_ecef(latitude, longitude, altitude):
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    n = WGS84_A / np.sqrt(1 - WGS84_E2 * sin_lat ** 2)  # prime vertical radius of curvature
+    x = (n + altitude) * cos_lat * np.cos(lon)
+    y = (n + altitude) * cos_lat * np.sin(lon)
+    z = (n * (1 - WGS84_E2) + altitude) * sin_lat
+    return x, y, z
+
+
+class LaunchSite:
+    def __init__(self, latitude, longitude, altitude):
+        """Launch rail position: latitude / longitude in degrees, altitude (m) above sea level."""
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+        self.ecef = np.array(geodetic_to_ecef(latitude, longitude, altitude))
+        lat, lon = np.radians(latitude), np.radians(longitude)
+        # Rows: East, North, Up unit vectors expressed in ECEF
+        self.enu_rotation = np.array([
+            [-np.sin(lon), np.cos(lon), 0.0],
+            [-np.sin(lat) * np.cos(lon), -np.sin(lat) * np.sin(lon), np.cos(lat)],
+            [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)],
+        ])
+
+
+# Launch site used by RocketCreator
+DEFAULT_SITE = LaunchSite(43.242222, -0.030556, 409)
+
+
+def as_launch_site(site):
+    """A LaunchSite given as itself or as a (latitude, longitude, altitude) tuple."""
+    return site if isinstance(site, LaunchSite) else LaunchSite(*site)
+
+
+def ecef_to_geodetic(x, y, z):
+    """
+    Bowring's method with one iteration: sub-millimetre accurate for points within a few
+    hundred kilometres of the surface. Trigonometry is replaced by algebra where possible,
+    as the conversion runs on millions of points at once.
+    """
+    x, y, z = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64), np.asarray(z, dtype=np.float64)
+    p = np.hypot(x, y)
+    # Parametric latitude: tan(beta) = a z / (b p)
+    cos_beta = WGS84_B * p
+    sin_beta = WGS84_A * z
+    norm = np.hypot(cos_beta, sin_beta)
+    cos_beta /= norm
+    sin_beta /= norm
+    num = z + WGS84_EP2 * WGS84_B * sin_beta ** 3
+    den = p - WGS84_E2 * WGS84_A * cos_beta ** 3
+    norm = np.hypot(num, den)
+    sin_lat, cos_lat = num / norm, den / norm
+    altitude = p * cos_lat + z * sin_lat - WGS84_A * np.sqrt(1 - WGS84_E2 * sin_lat ** 2)
+    latitude = np.degrees(np.arctan2(num, den))
+    longitude = np.degrees(np.arctan2(y, x))
+    return latitude, longitude, altitude
+
+
+def enu_to_ecef(east, north, up, site=DEFAULT_SITE):
+    (ex, ey, ez), (nx, ny, nz), (ux, uy, uz) = site.enu_rotation
+    x0, y0, z0 = site.ecef
+    x = x0 + ex * east + nx * north + ux * up
+    y = y0 + ey * east + ny * north + uy * up
+    z = z0 + ez * east + nz * north + uz * up
+    return x, y, z
+
+
+def ecef_to_enu(x, y, z, site=DEFAULT_SITE):
+    (ex, ey, ez), (nx, ny, nz), (ux, uy, uz) = site.enu_rotation
+    dx, dy, dz = x - site.ecef[0], y - site.ecef[1], z - site.ecef[2]
+    return ex * dx + ey * dy + ez * dz, nx * dx + ny * dy + nz * dz, ux * dx + uy * dy + uz * dz
+
+
+def local_to_geodetic(x, y, z, site=DEFAULT_SITE):
+    """Trajectory points (x East, y North, z altitude above sea level) -> latitude, longitude, altitude."""
+    up = np.asarray(z) - site.altitude
+    return ecef_to_geodetic(*enu_to_ecef(x, y, up, site))
+
+
+def geodetic_to_local(latitude, longitude, altitude, site=DEFAULT_SITE):
+    east, north, up = ecef_to_enu(*geodetic_to_ecef(latitude, longitude, altitude), site)
+    return east, north, up + site.altitude
+
+
+KML_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+    <Document>
+        <Style id="trajectory">
+            <LineStyle>
+                <color>641400F0</color>
+            </LineStyle>
+            <PolyStyle>
+                <color>641400F0</color>
+                <fill>1</fill>
+                <outline>1</outline>
+            </PolyStyle>
+        </Style>
+        <open>1</open>
+        <Placemark>
+            <name>{name}</name>
+            <styleUrl>#trajectory</styleUrl>
+            <LineString>
+                <extrude>{extrude}</extrude>
+                <altitudeMode>{altitude_mode}</altitudeMode>
+                <coordinates>{coordinates}</coordinates>
+            </LineString>
+        </Placemark>
+    </Document>
+</kml>
+"""
+
+
+def write_kml(filepath, latitude, longitude, altitude, name="Rocket Trajectory", extrude=True,
+              altitude_mode="relativeToGround"):
+    """Writes a trajectory as a KML LineString (altitude above ground for relativeToGround)."""
+    points = np.column_stack([longitude, latitude, altitude])
+    coordinates = " ".join(f"{lon:.8f},{lat:.8f},{alt:.3f}" for lon, lat, alt in points.tolist())
+    with open(filepath, "w") as f:
+        f.write(KML_TEMPLATE.format(name=name, extrude=int(extrude), altitude_mode=altitude_mode,
+                                    coordinates=coordinates))
@@ -0,0 +1,242 @@
+import datetime
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+import uuid
+
+import geodesy
+from RocketCreator import RocketCreator
+
+# Bump when RocketCreator or the exported files change in a way that invalidates old results
+CACHE_VERSION = 3  # 3: the launch site is part of the key
+DEFAULT_CACHE_DIR = os.path.join("cache", "simulations")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+EVICT_LOCK_TIMEOUT = 600  # seconds after which the eviction lock of a dead process is ignored
+
+
+def data_signature(data_dir="data"):
+    """Cheap (path, size, mtime) listing of data/, to notice changes without re-hashing."""
+    signature = []
+    for root, dirs, files in os.walk(data_dir):
+        dirs.sort()
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            signature.append((os.path.join(root, name), stat.st_size, stat.st_mtime_ns))
+    return signature
+
+
+def data_fingerprint(data_dir="data"):
+    """Hash of every file under data/ (motors, drag curves, airfoils), by path and content."""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(data_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, data_dir).replace(os.sep, "/").encode())
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def canonical_params(params):
+    """
+    Full RocketCreator input set: explicit params on top of the constructor defaults,
+    tuples as lists and numbers as floats so equal inputs always serialize the same.
+    """
+    defaults = {name: p.default for name, p in inspect.signature(RocketCreator.__init__).parameters.items()
+                if p.default is not inspect.Parameter.empty}
+    merged = {**defaults, **params}
+
+    def canonical(value):
+        if isinstance(value, geodesy.LaunchSite):
+            return canonical((value.latitude, value.longitude, value.altitude))
+        if isinstance(value, (tuple, list)):
+            return [canonical(v) for v in value]
+        if isinstance(value, bool) or isinstance(value, str) or value is None:
+            return value
+        return float(value)
+
+    return {name: canonical(value) for name, value in sorted(merged.items())}
+
+
+def atmosphere_snapshot(params, today=None):
+    """
+    The GFS forecast RocketCreator downloads for a launch at noon on today + delay, at the
+    launch site. Forecasts are reissued daily, so the issue day is part of the snapshot.
+    """
+    today = today or datetime.date.today()
+    launch_date = today + datetime.timedelta(days=int(params.get("delay", 0)))
+    site = geodesy.as_launch_site(params.get("launch_site", geodesy.DEFAULT_SITE))
+    return {"model": "GFS", "launch": f"{launch_date.isoformat()}T12", "issued": today.isoformat(),
+            "site": [round(float(site.latitude), 4), round(float(site.longitude), 4)]}
+
+
+class SimulationCache:
+    """
+    Disk cache of RocketCreator results (stability verdict and exported files), keyed by
+    a hash of the canonical parameters, the atmosphere snapshot and the content of data/.
+    Entries are evicted least-recently-used first once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, data_dir="data"):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.data_dir = data_dir
+        self.signature = data_signature(data_dir)
+        self.fingerprint = data_fingerprint(data_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.sizes = {}
+        self._scan()
+
+    def _entries(self):
+        for shard in os.listdir(self.cache_dir):
+            shard_dir = os.path.join(self.cache_dir, shard)
+            if len(shard) != 2 or not os.path.isdir(shard_dir):
+                continue
+            for key in os.listdir(shard_dir):
+                yield key, os.path.join(shard_dir, key)
+
+    def _scan(self):
+        # Drop entries made with other data files or cache versions, and measure the others
+        for key, entry_dir in self._entries():
+            if ".tmp-" in key:
+                # Leftover of an interrupted put()
+                if time.time() - os.path.getmtime(entry_dir) > 3600:
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+            meta = self._read_meta(entry_dir)
+            if meta is None or meta.get("fingerprint") != self.fingerprint or meta.get("version") != CACHE_VERSION:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+            self.sizes[key] = self._entry_size(entry_dir)
+
+    def _measure(self):
+        # Sizes of every complete entry, whoever wrote it
+        sizes = {}
+        for key, entry_dir in self._entries():
+            if ".tmp-" not in key:
+                try:
+                    sizes[key] = self._entry_size(entry_dir)
+                except OSError:
+                    pass  # evicted by another process meanwhile
+        return sizes
+
+    @staticmethod
+    def _entry_size(entry_dir):
+        return sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+
+    @staticmethod
+    def _read_meta(entry_dir):
+        try:
+            with open(os.path.join(entry_dir, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _refresh_fingerprint(self):
+        # A data file changed while we were running: its old entries no longer match any key
+        signature = data_signature(self.data_dir)
+        if signature != self.signature:
+            self.signature = signature
+            self.fingerprint = data_fingerprint(self.data_dir)
+
+    def key(self, params):
+        self._refresh_fingerprint()
+        payload = {
+            "version": CACHE_VERSION,
+            "params": canonical_params(params),
+            "atmosphere": atmosphere_snapshot(params),
+            "data": self.fingerprint,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def get(self, params):
+        """Returns the cached entry (meta with 'stable', 'files' and 'dir') or None on a miss."""
+        entry_dir = self._entry_dir(self.key(params))
+        meta = self._read_meta(entry_dir)
+        if meta is None:
+            return None
+        os.utime(os.path.join(entry_dir, "meta.json"))  # LRU bookkeeping
+        meta["dir"] = entry_dir
+        return meta
+
+    def put(self, params, stable, files=None):
+        """Stores the stability verdict and copies of the exported files ({name: path})."""
+        key = self.key(params)
+        entry_dir = self._entry_dir(key)
+        if os.path.exists(entry_dir):
+            return
+        # Build the entry next to its final place, then rename: readers never see a partial entry
+        tmp_dir = f"{entry_dir}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(tmp_dir)
+        stored = {}
+        for name, path in (files or {}).items():
+            if path and os.path.exists(path):
+                stored[name] = name + os.path.splitext(path)[1]
+                shutil.copyfile(path, os.path.join(tmp_dir, stored[name]))
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({"version": CACHE_VERSION, "fingerprint": self.fingerprint, "stable": bool(stable),
+                       "files": stored, "params": canonical_params(params), "created": time.time()}, f)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another process stored the same simulation first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self._evict()
+
+    @staticmethod
+    def restore(entry, destinations):
+        """Copies the cached files of an entry to their destinations ({name: path})."""
+        for name, path in destinations.items():
+            if path and name in entry["files"]:
+                shutil.copyfile(os.path.join(entry["dir"], entry["files"][name]), path)
+
+    def verdicts(self):
+        """(params, stable) of every cached simulation, stable or not."""
+        for key, entry_dir in self._entries():
+            meta = self._read_meta(entry_dir) if ".tmp-" not in key else None
+            if meta is not None and "params" in meta:
+                yield meta["params"], meta["stable"]
+
+    def _evict(self):
+        # Other processes fill the same directory, so the size is measured on disk (a directory
+        # walk, small next to a simulation) under a lock that lets only one process evict at a time
+        lock = self._lock_eviction()
+        if lock is None:
+            return  # another process is evicting
+        try:
+            self.sizes = self._measure()
+            total = sum(self.sizes.values())
+            for key in sorted(self.sizes, key=self._last_use):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+                total -= self.sizes.pop(key)
+        finally:
+            os.remove(lock)
+
+    def _lock_eviction(self):
+        path = os.path.join(self.cache_dir, "evict.lock")
+        try:
+            if time.time() - os.path.getmtime(path) > EVICT_LOCK_TIMEOUT:
+                os.remove(path)  # left by a process killed while evicting
+        except OSError:
+            pass
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return None
+        return path
+
+    def _last_use(self, key):
+        try:
+            return os.path.getmtime(os.path.join(self._entry_dir(key), "meta.json"))
+        except OSError:
+            return 0.0
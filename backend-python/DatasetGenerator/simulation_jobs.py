@@ -0,0 +1,328 @@
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+import uuid
+from contextlib import closing
+
+# Background queue of full-fidelity RocketPy simulations for the API (see main.py /jobs).
+# Jobs are persisted in a local SQLite file; a dispatcher thread in the API process starts
+# one worker process per job, at most max_workers at a time, and terminates the ones that
+# exceed their timeout or get cancelled. Workers go through dataset_generator.simulate_rocket,
+# so identical simulations are served from the generator's SimulationCache. No broker needed.
+#
+# Several API processes (uvicorn / gunicorn workers) may share the store: each running job
+# records the dispatcher that owns it and a lease that dispatcher keeps renewing. Only jobs
+# whose lease expired (their owner is gone) are failed, and max_workers bounds the running
+# jobs of all the processes together.
+#
+# Job life cycle: queued -> running -> succeeded | unstable | failed | timeout, or cancelled.
+
+GENERATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+JOBS_DIR = os.path.join(GENERATOR_DIR, "jobs")
+JOBS_DB = os.path.join(JOBS_DIR, "jobs.sqlite")
+MAX_WORKERS = max(1, (os.cpu_count() or 1) // 2)
+MAX_QUEUED_JOBS = 100
+DEFAULT_TIMEOUT = 300  # seconds
+JOB_RETENTION = 7 * 24 * 3600  # finished jobs and their files are purged after this
+POLL_INTERVAL = 0.2
+LEASE_TIMEOUT = 30  # seconds: a running job whose owner stopped renewing its lease is failed
+
+FINAL_STATUSES = ("succeeded", "unstable", "failed", "timeout", "cancelled")
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobStore:
+    """Jobs table in SQLite; safe to use from several threads and processes."""
+
+    def __init__(self, path=JOBS_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        with closing(self._connect()) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    timeout REAL NOT NULL,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    cached INTEGER,
+                    files TEXT,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL,
+                    owner TEXT,
+                    lease_until REAL
+                )
+            """)
+            # Stores created before job ownership existed
+            columns = {row["name"] for row in connection.execute("PRAGMA table_info(jobs)")}
+            for name, column_type in (("owner", "TEXT"), ("lease_until", "REAL")):
+                if name not in columns:
+                    connection.execute(f"ALTER TABLE jobs ADD COLUMN {name} {column_type}")
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _execute(self, sql, args=()):
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(sql, args)
+            return cursor.fetchall(), cursor.rowcount
+
+    def submit(self, params, timeout=DEFAULT_TIMEOUT, max_queued=MAX_QUEUED_JOBS):
+        job_id = uuid.uuid4().hex
+        with closing(self._connect()) as connection:
+            # The count and the insert are one transaction, so the bound holds across processes
+            connection.execute("BEGIN IMMEDIATE")
+            queued = connection.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= max_queued:
+                connection.execute("ROLLBACK")
+                raise QueueFullError(f"{queued} jobs are already queued")
+            connection.execute("INSERT INTO jobs (job_id, params, status, timeout, created) VALUES (?, ?, 'queued', ?, ?)",
+                               (job_id, json.dumps(params), timeout, time.time()))
+            connection.execute("COMMIT")
+        return job_id
+
+    def get(self, job_id):
+        rows, _ = self._execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        if not rows:
+            return None
+        job = dict(rows[0])
+        job["params"] = json.loads(job["params"])
+        job["files"] = json.loads(job["files"]) if job["files"] else {}
+        return job
+
+    def queued(self, limit):
+        rows, _ = self._execute("SELECT job_id, params, timeout FROM jobs WHERE status = 'queued' "
+                                "ORDER BY created LIMIT ?", (limit,))
+        return [(row["job_id"], json.loads(row["params"]), row["timeout"]) for row in rows]
+
+    def running_count(self):
+        rows, _ = self._execute("SELECT COUNT(*) AS n FROM jobs WHERE status = 'running'")
+        return rows[0]["n"]
+
+    def claim(self, job_id, owner, max_running, lease=LEASE_TIMEOUT):
+        """
+        queued -> running, owned by owner; False if the job was cancelled in the meantime or
+        max_running jobs are already running (in any process).
+        """
+        now = time.time()
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            running = connection.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+            if running >= max_running:
+                connection.execute("ROLLBACK")
+                return False
+            cursor = connection.execute("UPDATE jobs SET status = 'running', started = ?, owner = ?, lease_until = ? "
+                                        "WHERE job_id = ? AND status = 'queued'", (now, owner, now + lease, job_id))
+            connection.execute("COMMIT")
+            return cursor.rowcount == 1
+
+    def renew(self, owner, lease=LEASE_TIMEOUT):
+        """Extends the lease of every job the owner is running."""
+        self._execute("UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = 'running'",
+                      (time.time() + lease, owner))
+
+    def finish(self, job_id, status, error=None, cached=None, files=None):
+        """Records the outcome of a running job (the first outcome wins)."""
+        _, count = self._execute(
+            "UPDATE jobs SET status = ?, error = ?, cached = ?, files = ?, finished = ? "
+            "WHERE job_id = ? AND status = 'running'",
+            (status, error, cached, json.dumps(files) if files is not None else None, time.time(), job_id))
+        return count == 1
+
+    def cancel(self, job_id):
+        """Cancels a queued job at once; a running one is flagged for the dispatcher to terminate."""
+        _, count = self._execute("UPDATE jobs SET status = 'cancelled', finished = ? WHERE job_id = ? AND status = 'queued'",
+                                 (time.time(), job_id))
+        if count:
+            return True
+        _, count = self._execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status = 'running'",
+                                 (job_id,))
+        return count == 1
+
+    def cancel_requested(self, job_id):
+        rows, _ = self._execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,))
+        return bool(rows and rows[0]["cancel_requested"])
+
+    def fail_orphaned(self, error):
+        """Running jobs whose owner stopped renewing their lease: that server and its workers are gone."""
+        now = time.time()
+        _, count = self._execute("UPDATE jobs SET status = 'failed', error = ?, finished = ? "
+                                 "WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)",
+                                 (error, now, now))
+        return count
+
+    def expired(self, older_than):
+        placeholders = ", ".join("?" * len(FINAL_STATUSES))
+        rows, _ = self._execute(f"SELECT job_id FROM jobs WHERE status IN ({placeholders}) AND finished < ?",
+                                (*FINAL_STATUSES, older_than))
+        return [row["job_id"] for row in rows]
+
+    def delete(self, job_id):
+        self._execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+
+def job_dir(job_id, jobs_dir=JOBS_DIR):
+    return os.path.join(jobs_dir, job_id)
+
+
+def run_job(job_id, params, db_path, jobs_dir, use_cache=True):
+    """Worker process: one simulation, outcome written to the job store."""
+    store = JobStore(db_path)
+    try:
+        # RocketCreator reads data/ and the cache lives in cache/, both relative to DatasetGenerator
+        os.chdir(GENERATOR_DIR)
+        sys.path.insert(0, GENERATOR_DIR)
+        from dataset_generator import WIND_PROFILES, simulate_rocket
+        from simulation_cache import SimulationCache
+
+        params = dict(params)
+        params["inertia"] = tuple(params["inertia"])
+        output_dir = job_dir(job_id, jobs_dir)
+        os.makedirs(output_dir, exist_ok=True)
+        cache = SimulationCache() if use_cache else None
+        cached = cache is not None and cache.get(params) is not None
+        input_data = simulate_rocket(params, "rocket", cache, trajectory_dir=output_dir, klm_dir=output_dir)
+        if input_data is None:
+            store.finish(job_id, "unstable", cached=cached)
+            return
+        files = {name: f"rocket_{suffix}" for name, suffix in (("trajectory", "trajectory.csv"), ("kml", "klm.kml"))
+                 if os.path.exists(os.path.join(output_dir, f"rocket_{suffix}"))}
+        # The wind lives in the generator's shared profile store (absolute path, outside the job directory)
+        files["wind_profile"] = os.path.abspath(WIND_PROFILES.path(input_data["wind_profile_id"]))
+        store.finish(job_id, "succeeded", cached=cached, files=files)
+    except Exception as e:
+        traceback.print_exc()
+        store.finish(job_id, "failed", error=f"{type(e).__name__}: {e}")
+
+
+class JobManager:
+    """Dispatcher thread: starts queued jobs within the concurrency limit and enforces timeouts."""
+
+    def __init__(self, db_path=JOBS_DB, jobs_dir=JOBS_DIR, max_workers=MAX_WORKERS, use_cache=True, target=run_job):
+        self.store = JobStore(db_path)
+        self.db_path = db_path
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers
+        self.use_cache = use_cache
+        self.target = target
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # Spawned workers: forking a multi-threaded server process is unsafe
+        self.context = multiprocessing.get_context("spawn")
+        self.running = {}  # job_id -> (process, deadline)
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_purge = 0.0
+        self._last_renewal = 0.0
+
+    def start(self):
+        if self._thread is None:
+            interrupted = self.store.fail_orphaned("interrupted: the server stopped while the job was running")
+            if interrupted:
+                print(f"{interrupted} simulation jobs were interrupted by a restart.")
+            self._thread = threading.Thread(target=self._loop, name="simulation-jobs", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for job_id, (process, _) in list(self.running.items()):
+            process.terminate()
+            process.join()
+            self.store.finish(job_id, "failed", error="interrupted: the server stopped")
+        self.running.clear()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                if time.time() - self._last_renewal > LEASE_TIMEOUT / 3:
+                    self._renew()
+                self._reap()
+                self._launch()
+                if time.time() - self._last_purge > 3600:
+                    self.purge()
+            except Exception:
+                traceback.print_exc()
+            self._stop.wait(POLL_INTERVAL)
+
+    def _renew(self):
+        self._last_renewal = time.time()
+        self.store.renew(self.owner)
+        # Jobs of a sibling server process that died
+        self.store.fail_orphaned("interrupted: the server running the job stopped")
+
+    def _launch(self):
+        free = self.max_workers - self.store.running_count()
+        if free <= 0:
+            return
+        for job_id, params, timeout in self.store.queued(free):
+            if not self.store.claim(job_id, self.owner, self.max_workers):
+                continue
+            process = self.context.Process(target=self.target,
+                                           args=(job_id, params, self.db_path, self.jobs_dir, self.use_cache),
+                                           name=f"simulation-job-{job_id[:8]}", daemon=True)
+            process.start()
+            self.running[job_id] = (process, time.monotonic() + timeout)
+
+    def _reap(self):
+        for job_id, (process, deadline) in list(self.running.items()):
+            if not process.is_alive():
+                process.join()
+                # The worker records its own outcome; a crash (killed, segfault) leaves the job running
+                self.store.finish(job_id, "failed", error=f"worker exited with code {process.exitcode}")
+            elif self.store.cancel_requested(job_id):
+                self._terminate(process)
+                self.store.finish(job_id, "cancelled")
+            elif time.monotonic() > deadline:
+                self._terminate(process)
+                self.store.finish(job_id, "timeout", error="simulation exceeded its time limit")
+            else:
+                continue
+            del self.running[job_id]
+
+    @staticmethod
+    def _terminate(process):
+        process.terminate()
+        process.join(5)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def purge(self, retention=JOB_RETENTION):
+        """Deletes the finished jobs older than retention, with their files."""
+        self._last_purge = time.time()
+        for job_id in self.store.expired(time.time() - retention):
+            shutil.rmtree(job_dir(job_id, self.jobs_dir), ignore_errors=True)
+            self.store.delete(job_id)
+
+    def submit(self, params, timeout=DEFAULT_TIMEOUT):
+        return self.store.submit(params, timeout)
+
+    def cancel(self, job_id):
+        return self.store.cancel(job_id)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def file_path(self, job, name):
+        """Path of an output file of the job, None if the job did not produce it (or it is gone)."""
+        if name not in job["files"]:
+            return None
+        path = os.path.join(job_dir(job["job_id"], self.jobs_dir), job["files"][name])
+        return path if os.path.exists(path) else None
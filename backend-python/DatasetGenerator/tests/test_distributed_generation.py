@@ -0,0 +1,128 @@
+import glob
+import importlib
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import types
+
+import pandas as pd
+import pytest
+
+ROCKETS = 18
+CHUNK_SIZE = 5
+LEASE = 1.0
+
+
+def fake_generator(dataset_dir):
+    """dataset_generator stand-in: a fast seeded simulator that can hang on one rocket id."""
+    generator = types.ModuleType("dataset_generator")
+    generator.TRAJECTORY_DIR = os.path.join(dataset_dir, "trajectories")
+    generator.KLM_DIR = os.path.join(dataset_dir, "klm_files")
+    generator.MASTER_INPUT_FILE = os.path.join(dataset_dir, "master_rocket_inputs.csv")
+    generator.USE_CACHE = False
+    generator.WIND_PROFILES = None
+    generator.hang_at = None
+
+    def get_random_params():
+        return {"delay": 0, "mass": round(random.uniform(1.0, 10.0), 6)}
+
+    def simulate_rocket(params, rocket_id, cache=None, trajectory_dir=generator.TRAJECTORY_DIR,
+                        klm_dir=generator.KLM_DIR, profiles=None):
+        if rocket_id == generator.hang_at:
+            time.sleep(3600)
+        time.sleep(0.01)
+        if params["mass"] < 3.0:
+            return None  # unstable
+        path = os.path.join(trajectory_dir, f"{rocket_id}_trajectory.csv")
+        pd.DataFrame({"time": [0.0], "mass": [params["mass"]]}).to_csv(path, index=False)
+        with open(os.path.join(klm_dir, f"{rocket_id}_klm.kml"), "w") as f:
+            f.write("<kml/>")
+        return {**params, "rocket_id": rocket_id, "trajectory_file": path}
+
+    generator.get_random_params = get_random_params
+    generator.simulate_rocket = simulate_rocket
+    return generator
+
+
+def expected_masses(chunks):
+    """Replays the seeded draws of every chunk: the stable rockets the queue must produce."""
+    masses = []
+    for chunk in sorted(chunks, key=lambda c: c["chunk"]):
+        random.seed(chunk["seed"])
+        stable = []
+        while len(stable) < chunk["rockets"]:
+            mass = round(random.uniform(1.0, 10.0), 6)
+            if mass >= 3.0:
+                stable.append(mass)
+        masses += stable
+    return masses
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    dataset_dir = str(tmp_path / "dataset")
+    generator = fake_generator(dataset_dir)
+    os.makedirs(generator.TRAJECTORY_DIR)
+    os.makedirs(generator.KLM_DIR)
+    monkeypatch.setitem(sys.modules, "dataset_generator", generator)
+    cache = types.ModuleType("simulation_cache")  # the real one imports RocketPy
+    cache.SimulationCache = None
+    monkeypatch.setitem(sys.modules, "simulation_cache", cache)
+    monkeypatch.delitem(sys.modules, "distributed_generation", raising=False)
+    distributed = importlib.import_module("distributed_generation")
+    queue_dir = str(tmp_path / "queue")
+    distributed.init_queue(queue_dir, ROCKETS, CHUNK_SIZE, seed=7)
+    yield distributed, generator, queue_dir
+    sys.modules.pop("distributed_generation", None)
+
+
+def wait_for(condition, timeout=20.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_killed_worker_lease_expires_and_merge_has_no_duplicates_or_gaps(queue):
+    distributed, generator, queue_dir = queue
+    context = multiprocessing.get_context("fork")  # the workers inherit the stubbed simulator
+
+    # A first worker claims chunk 0 and is killed on its third rocket, after two are on disk
+    generator.hang_at = "chunk_00000_0002"
+    victim = context.Process(target=distributed.run_worker, args=(queue_dir, LEASE, 0.1))
+    victim.start()
+    wait_for(lambda: glob.glob(os.path.join(queue_dir, "shards", "chunk_00000.tmp-*", "trajectories",
+                                            "chunk_00000_0001_trajectory.csv")))
+    victim.kill()
+    victim.join()
+    generator.hang_at = None
+
+    workers = [context.Process(target=distributed.run_worker, args=(queue_dir, LEASE, 0.1)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+    assert [worker.exitcode for worker in workers] == [0, 0, 0]
+
+    counts, stable, _ = distributed.queue_status(queue_dir, LEASE)
+    assert counts == {"done": 4, "running": 0, "stale": 0, "pending": 0}
+    assert stable == ROCKETS
+    # The dead claim was moved aside once its lease expired, and another process redid the chunk
+    assert glob.glob(os.path.join(queue_dir, "claims", "chunk_00000.lock.stale-*"))
+    with open(os.path.join(queue_dir, "shards", "chunk_00000", "chunk.json")) as f:
+        assert json.load(f)["worker"].split(":")[1] != str(victim.pid)
+
+    distributed.merge_queue(queue_dir)
+
+    df = pd.read_csv(generator.MASTER_INPUT_FILE)
+    assert df["rocket_id"].tolist() == [f"rocket_{i:04d}" for i in range(ROCKETS)]
+    assert df["mass"].tolist() == expected_masses(distributed.load_chunks(queue_dir))
+    for row in df.itertuples():
+        assert pd.read_csv(row.trajectory_file)["mass"].iloc[0] == row.mass
+    assert len(os.listdir(generator.TRAJECTORY_DIR)) == ROCKETS
+    # The half-done work directory of the killed worker and the stale lock are cleaned up
+    assert not glob.glob(os.path.join(queue_dir, "shards", "*.tmp-*"))
+    assert not glob.glob(os.path.join(queue_dir, "claims", "*.stale-*"))
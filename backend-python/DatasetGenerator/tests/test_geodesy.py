@@ -0,0 +1,30 @@
+import numpy as np
+
+import geodesy
+
+
+def test_geodetic_enu_round_trip():
+    site = geodesy.LaunchSite(43.242222, -0.030556, 409)
+    rng = np.random.default_rng(0)
+    latitude = site.latitude + rng.uniform(-0.5, 0.5, 200)
+    longitude = site.longitude + rng.uniform(-0.5, 0.5, 200)
+    altitude = rng.uniform(0, 20000, 200)
+
+    east, north, up = geodesy.ecef_to_enu(*geodesy.geodetic_to_ecef(latitude, longitude, altitude), site)
+    back = geodesy.ecef_to_geodetic(*geodesy.enu_to_ecef(east, north, up, site))
+
+    np.testing.assert_allclose(back[0], latitude, atol=1e-9)
+    np.testing.assert_allclose(back[1], longitude, atol=1e-9)
+    np.testing.assert_allclose(back[2], altitude, atol=1e-4)
+
+
+def test_local_frame_round_trip_and_origin():
+    site = geodesy.as_launch_site((-33.9, 151.2, 50))
+    x, y, z = np.array([[0.0, 1200.0, -350.0], [0.0, -800.0, 2500.0], [50.0, 3000.0, 900.0]])
+
+    latitude, longitude, altitude = geodesy.local_to_geodetic(x, y, z, site)
+    np.testing.assert_allclose([latitude[0], longitude[0], altitude[0]], [-33.9, 151.2, 50], atol=1e-9)
+    # x points East and y North
+    assert longitude[1] > site.longitude and latitude[1] < site.latitude
+
+    np.testing.assert_allclose(geodesy.geodetic_to_local(latitude, longitude, altitude, site), [x, y, z], atol=1e-6)
@@ -0,0 +1,21 @@
+import numpy as np
+
+from trajectory_lod import point_importance, simplify
+
+
+def test_point_importance_of_empty_input():
+    assert point_importance(np.empty((0, 3))).shape == (0,)
+    assert point_importance(np.empty((0, 5, 3))).shape == (0, 5)
+    assert point_importance(np.empty((2, 0, 3))).shape == (2, 0)
+
+
+def test_point_importance_of_padding_only():
+    importance = point_importance(np.full((2, 4, 3), np.nan))
+
+    assert importance.shape == (2, 4)
+    assert np.all(importance == -np.inf)
+
+
+def test_simplify_empty_trajectory():
+    assert simplify(np.empty((0, 4)), max_points=10).shape == (0, 4)
+    assert simplify(np.empty((0, 7, 4)), tolerance=1.0).shape == (0, 0, 4)
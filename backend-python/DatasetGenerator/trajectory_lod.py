@@ -0,0 +1,123 @@
+"""
+Level-of-detail simplification of trajectories (Ramer-Douglas-Peucker).
+
+Instead of running RDP once per tolerance, point_importance() ranks every point by the
+largest tolerance (m) at which RDP would still keep it, in a single pass: RDP with tolerance
+eps keeps exactly the points whose importance is above eps, and the n most important points
+are the best n-point level of detail. Launch, apogee and landing points are always kept.
+
+All segments of all trajectories are split at once at every iteration, so a batch of
+(rockets, points, 3) positions costs about as many NumPy calls as a single trajectory.
+"""
+import numpy as np
+
+# Default levels of detail (maximum deviation in meters)
+DEFAULT_TOLERANCES = (0.5, 2.0, 10.0)
+
+
+def _segment_distances(points, start, end, free):
+    """Distance of points[free] to the segments points[start] -> points[end]."""
+    a = points[start]
+    ab = points[end] - a
+    ap = points[free] - a
+    length2 = np.einsum("ij,ij->i", ab, ab)
+    t = np.einsum("ij,ij->i", ap, ab) / np.where(length2 > 0, length2, 1.0)
+    t = np.clip(np.where(length2 > 0, t, 0.0), 0.0, 1.0)
+    return np.linalg.norm(ap - t[:, None] * ab, axis=1)
+
+
+def point_importance(positions):
+    """
+    positions: (n, 3) or (rockets, n, 3) array, NaN rows (padding) allowed.
+    Returns the importance of every point with the same leading shape: +inf for launch,
+    apogee and landing, -inf for NaN rows.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    single = positions.ndim == 2
+    if single:
+        positions = positions[None]
+    n_rockets, n_points, _ = positions.shape
+    points = positions.reshape(-1, 3)
+    valid = ~np.isnan(points).any(axis=1)
+
+    importance = np.full(len(points), -np.inf)
+    # NaN rows act as kept points: no segment ever spans two rockets or the padding
+    kept = ~valid
+    # Importance of the segment starting at each kept point (min over its ancestors)
+    segment_importance = np.full(len(points), np.inf)
+
+    valid_rows = valid.reshape(n_rockets, n_points)
+    rockets = np.flatnonzero(valid_rows.any(axis=1))
+    if rockets.size == 0:
+        # Empty trajectories, no rockets, or nothing but padding: no point to keep
+        importance = importance.reshape(n_rockets, n_points)
+        return importance[0] if single else importance
+    offsets = rockets * n_points
+    first = np.argmax(valid_rows[rockets], axis=1)
+    last = n_points - 1 - np.argmax(valid_rows[rockets, ::-1], axis=1)
+    apogee = np.argmax(np.where(valid_rows[rockets], positions[rockets, :, 2], -np.inf), axis=1)
+    forced = np.concatenate([offsets + first, offsets + apogee, offsets + last])
+    kept[forced] = True
+    importance[forced] = np.inf
+
+    while True:
+        free = np.flatnonzero(~kept)
+        if free.size == 0:
+            break
+        kept_index = np.flatnonzero(kept)
+        segment = np.searchsorted(kept_index, free) - 1
+        start, end = kept_index[segment], kept_index[segment + 1]
+        distance = _segment_distances(points, start, end, free)
+
+        # Farthest free point of every segment (free points are grouped by segment)
+        order = np.lexsort((-distance, segment))
+        farthest = np.r_[True, segment[order][1:] != segment[order][:-1]]
+        split = free[order][farthest]
+        split_start = start[order][farthest]
+        split_importance = np.minimum(distance[order][farthest], segment_importance[split_start])
+
+        importance[split] = split_importance
+        kept[split] = True
+        # Both halves inherit the importance of the point that created them
+        segment_importance[split] = split_importance
+        segment_importance[split_start] = split_importance
+
+    importance = importance.reshape(n_rockets, n_points)
+    return importance[0] if single else importance
+
+
+def simplify_mask(importance, tolerance=None, max_points=None):
+    """Points kept at a tolerance (m) and/or a maximum number of points per trajectory."""
+    keep = importance > -np.inf
+    if tolerance is not None:
+        keep &= importance > tolerance
+    if max_points is not None:
+        rank = np.argsort(np.argsort(-importance, axis=-1, kind="stable"), axis=-1)
+        keep &= rank < max_points
+    return keep
+
+
+def simplify(trajectory, tolerance=None, max_points=None, position_columns=(1, 2, 3)):
+    """
+    Simplifies a (n, columns) trajectory or a NaN-padded (rockets, n, columns) batch, with
+    positions in position_columns (x, y, z of the (time, x, y, z) rows by default). A batch
+    comes back NaN-padded to the longest simplified trajectory.
+    """
+    trajectory = np.asarray(trajectory)
+    if tolerance is None and max_points is None:
+        return trajectory
+    keep = simplify_mask(point_importance(trajectory[..., list(position_columns)]), tolerance, max_points)
+    if trajectory.ndim == 2:
+        return trajectory[keep]
+    counts = keep.sum(axis=1)
+    simplified = np.full((len(trajectory), counts.max(initial=0), trajectory.shape[2]), np.nan)
+    rows, cols = np.nonzero(keep)
+    slots = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    simplified[rows, slots] = trajectory[rows, cols]
+    return simplified
+
+
+def levels_of_detail(positions, tolerances=DEFAULT_TOLERANCES):
+    """Indices of the points kept at every tolerance, from the finest to the coarsest level."""
+    importance = point_importance(positions)
+    return {tolerance: np.flatnonzero(importance > tolerance) for tolerance in sorted(tolerances)}
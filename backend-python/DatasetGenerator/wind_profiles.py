@@ -0,0 +1,182 @@
+import argparse
+import hashlib
+import os
+import re
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from dataset_index import trajectory_path
+
+# Wind profiles shared by every rocket simulated in the same atmosphere snapshot (same GFS
+# forecast, see simulation_cache.atmosphere_snapshot). A profile is stored once, as altitude-
+# indexed arrays in dataset/wind_profiles/<id>.npz, and rockets reference it through the
+# wind_profile_id column of master_rocket_inputs.csv instead of carrying a *_wind.csv file and
+# wind columns on every trajectory row. lookup() gives the wind at any altitude; the models only
+# use the launch wind, which dataset_append.py looks up at the first trajectory point.
+#
+#   python wind_profiles.py --migrate            # profiles from the wind columns of old trajectories
+#   python wind_profiles.py --migrate --strip    # ... and drop those columns from the trajectory files
+#
+# Only NumPy / pandas: the training scripts import this module without RocketPy.
+
+# --- Configuration ---
+PROFILE_DIR = os.path.join("dataset", "wind_profiles")
+PROFILE_STEP = 10.0  # altitude resolution (m) of the stored profiles
+PROFILE_TOP = 20000.0  # m above sea level, well above the apogee of any generated rocket
+PROFILE_COLUMN = "wind_profile_id"
+WIND_COLUMNS = ["wind_velocity_x", "wind_velocity_y"]
+
+
+def profile_id(snapshot):
+    """
+    {'model': 'GFS', 'launch': '2025-06-02T12', 'issued': '2025-06-01', 'site': [43.2422, -0.0306]}
+    -> 'gfs_2025-06-02t12_2025-06-01_43.2422_-0.0306'
+    """
+    key = "_".join([str(snapshot[k]) for k in ("model", "launch", "issued")] + [str(v) for v in snapshot["site"]])
+    return re.sub(r"[^a-z0-9_.-]", "-", key.lower())
+
+
+def sample_environment(environment, top=PROFILE_TOP, step=PROFILE_STEP):
+    """(altitude, wind) of a RocketPy Environment, from the ground to top (m above sea level)."""
+    altitude = np.arange(environment.elevation, top + step, step)
+    wind = np.column_stack([np.asarray(environment.wind_velocity_x.get_value(altitude), dtype=float),
+                            np.asarray(environment.wind_velocity_y.get_value(altitude), dtype=float)])
+    return altitude, wind
+
+
+def bin_samples(altitude, wind, step=PROFILE_STEP):
+    """Profile of scattered (altitude, wind) samples: mean wind of every step-high altitude bin."""
+    altitude = np.asarray(altitude, dtype=float)
+    wind = np.asarray(wind, dtype=float)
+    valid = ~(np.isnan(altitude) | np.isnan(wind).any(axis=1))
+    altitude, wind = altitude[valid], wind[valid]
+    bins, index = np.unique(np.round(altitude / step).astype(np.int64), return_inverse=True)
+    counts = np.bincount(index)
+    means = np.column_stack([np.bincount(index, weights=wind[:, i]) / counts for i in range(wind.shape[1])])
+    return bins * step, means
+
+
+class WindProfileStore:
+    """Directory of .npz profiles (altitude, wind_x, wind_y), loaded once per process."""
+
+    def __init__(self, profile_dir=PROFILE_DIR):
+        self.profile_dir = profile_dir
+        self._profiles = {}
+
+    def path(self, profile_id):
+        return os.path.join(self.profile_dir, f"{profile_id}.npz")
+
+    def __contains__(self, profile_id):
+        return profile_id in self._profiles or os.path.exists(self.path(profile_id))
+
+    def ids(self):
+        if not os.path.isdir(self.profile_dir):
+            return []
+        return sorted(name[:-4] for name in os.listdir(self.profile_dir) if name.endswith(".npz"))
+
+    def put(self, profile_id, altitude, wind):
+        """Stores a profile unless it already exists (profiles of a snapshot never change)."""
+        if profile_id in self:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        order = np.argsort(altitude)
+        wind = np.asarray(wind, dtype=np.float32)[order]
+        # Write then rename: concurrent generators may store the same snapshot
+        tmp_path = f"{self.path(profile_id)}.tmp-{uuid.uuid4().hex}"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, altitude=np.asarray(altitude, dtype=np.float64)[order], wind_x=wind[:, 0], wind_y=wind[:, 1])
+        os.replace(tmp_path, self.path(profile_id))
+
+    def get(self, profile_id):
+        """(altitude, wind) arrays of a profile, wind of shape (n, 2)."""
+        if profile_id not in self._profiles:
+            with np.load(self.path(profile_id)) as data:
+                self._profiles[profile_id] = (data["altitude"], np.column_stack([data["wind_x"], data["wind_y"]]))
+        return self._profiles[profile_id]
+
+    def lookup(self, profile_ids, altitude):
+        """
+        Wind (n, 2) at every point, linearly interpolated in altitude (clamped at both ends).
+        profile_ids is one id for all the points or one per point; every profile is read once
+        and its points are interpolated together.
+        """
+        altitude = np.asarray(altitude, dtype=float).reshape(-1)
+        wind = np.empty((len(altitude), 2))
+        if np.ndim(profile_ids) == 0:
+            codes, ids = np.zeros(len(altitude), dtype=np.int64), [profile_ids]
+        else:
+            codes, ids = pd.factorize(np.asarray(profile_ids).reshape(-1))
+        # Points grouped by profile: one sort, then contiguous slices
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(ids) + 1))
+        for i, pid in enumerate(ids):
+            rows = order[bounds[i]:bounds[i + 1]]
+            profile_altitude, profile_wind = self.get(pid)
+            wind[rows, 0] = np.interp(altitude[rows], profile_altitude, profile_wind[:, 0])
+            wind[rows, 1] = np.interp(altitude[rows], profile_altitude, profile_wind[:, 1])
+        return wind
+
+
+def migrate_legacy_trajectories(master_input_file, store=None, strip=False, decimals=6):
+    """
+    Gives the rockets of an existing dataset a wind profile. Old trajectories carry the wind of
+    every point: rockets of the same delay with the same launch wind flew in the same snapshot,
+    so their samples are pooled into one profile. strip=True then removes the wind columns
+    from the trajectory files.
+    """
+    store = store or WindProfileStore()
+    df_inputs = pd.read_csv(master_input_file)
+    if PROFILE_COLUMN not in df_inputs:
+        df_inputs[PROFILE_COLUMN] = None
+    df_inputs[PROFILE_COLUMN] = df_inputs[PROFILE_COLUMN].astype(object)
+    todo = df_inputs.index[df_inputs[PROFILE_COLUMN].isna()]
+
+    groups = {}
+    for i in todo:
+        path = trajectory_path(df_inputs.at[i, "trajectory_file"])
+        try:
+            df_traj = pd.read_csv(path)
+        except (OSError, pd.errors.ParserError, pd.errors.EmptyDataError):
+            continue
+        if df_traj.empty or not set(WIND_COLUMNS) <= set(df_traj.columns):
+            continue
+        launch_wind = tuple(np.round(df_traj[WIND_COLUMNS].iloc[0].to_numpy(dtype=float), decimals))
+        group = groups.setdefault((int(df_inputs.at[i, "delay"]), launch_wind), {"rows": [], "samples": []})
+        group["rows"].append((i, path))
+        group["samples"].append(df_traj[["z"] + WIND_COLUMNS].to_numpy(dtype=float))
+
+    for (delay, launch_wind), group in groups.items():
+        # Same snapshot, same id: rockets migrated in a later run join their existing profile
+        pid = f"legacy_delay{delay}_{hashlib.sha1(repr(launch_wind).encode()).hexdigest()[:8]}"
+        samples = np.concatenate(group["samples"])
+        store.put(pid, *bin_samples(samples[:, 0], samples[:, 1:]))
+        for i, path in group["rows"]:
+            df_inputs.at[i, PROFILE_COLUMN] = pid
+            if strip:
+                df_traj = pd.read_csv(path)
+                df_traj.drop(columns=WIND_COLUMNS).to_csv(path, index=False)
+
+    df_inputs.to_csv(master_input_file, index=False)
+    migrated = sum(len(g["rows"]) for g in groups.values())
+    print(f"{migrated} rockets now reference {len(groups)} wind profiles in '{store.profile_dir}' "
+          f"({len(todo) - migrated} without wind data left as they are).")
+    return df_inputs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared wind profiles of the dataset.")
+    parser.add_argument("--migrate", action="store_true", help="build profiles from old trajectories with wind columns")
+    parser.add_argument("--strip", action="store_true", help="with --migrate: drop the wind columns of the trajectories")
+    parser.add_argument("--inputs", default=os.path.join("dataset", "master_rocket_inputs.csv"))
+    args = parser.parse_args()
+
+    if args.migrate:
+        migrate_legacy_trajectories(args.inputs, strip=args.strip)
+    else:
+        store = WindProfileStore()
+        for pid in store.ids():
+            altitude, wind = store.get(pid)
+            print(f"{pid}: {len(altitude)} levels, {altitude[0]:.0f}-{altitude[-1]:.0f} m, "
+                  f"max wind {np.hypot(wind[:, 0], wind[:, 1]).max():.1f} m/s")
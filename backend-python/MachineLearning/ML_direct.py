@@ -0,0 +1,153 @@
+import os
+import time
+import pandas as pd
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.decomposition import PCA
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.layers import Input, Dense, Dropout
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.callbacks import ReduceLROnPlateau
+from tensorflow.keras.regularizers import l2
+
+from preprocessing import (CATEGORICAL_COLUMNS, STATIC_NUMERIC_COLUMNS, expand_inertia,
+                           preprocessing_path, resolve_trajectory_path, save_preprocessing)
+
+# Direct (non-autoregressive) model: launch parameters -> whole trajectory in one forward pass.
+# Each trajectory is resampled on N_POINTS instants of its own flight time and compressed
+# with PCA; the network predicts the PCA coefficients, the flight time and the launch altitude.
+
+# --- 1. Configuration Parameters ---
+DATASET_DIR = '../DatasetGenerator'
+INPUT_FILE = os.path.join(DATASET_DIR, 'dataset', 'master_rocket_inputs_with_init_wind.csv')
+MODEL_PATH = 'models/direct_model.keras'
+N_POINTS = 256
+N_COMPONENTS = 32
+TEST_SIZE = 0.2
+BATCH_SIZE = 64
+EPOCHS = 300
+
+
+# --- 2. Trajectory Resampling ---
+def resample_trajectory(df_traj, n_points):
+    """Returns (flight_time, z0, positions) with positions (n_points, 3) relative to the pad."""
+    t = df_traj['time'].to_numpy()
+    flight_time = t[-1] - t[0]
+    t_new = np.linspace(t[0], t[-1], n_points)
+    z0 = df_traj['z'].iloc[0]
+    positions = np.stack([
+        np.interp(t_new, t, df_traj['x'].to_numpy()),
+        np.interp(t_new, t, df_traj['y'].to_numpy()),
+        np.interp(t_new, t, df_traj['z'].to_numpy()) - z0,
+    ], axis=1)
+    return flight_time, z0, positions
+
+
+# --- 3. Data Loading ---
+print("--- Data Loading and Preparation ---")
+try:
+    df_inputs = pd.read_csv(INPUT_FILE)
+except FileNotFoundError:
+    print(f"Error: File not found at {INPUT_FILE}.")
+    exit()
+
+rows, trajectories, scalars = [], [], []
+for _, row in df_inputs.iterrows():
+    path = resolve_trajectory_path(row['trajectory_file'], DATASET_DIR)
+    if not os.path.exists(path):
+        print(f"Warning: File not found at {path}")
+        continue
+    flight_time, z0, positions = resample_trajectory(pd.read_csv(path), N_POINTS)
+    rows.append(expand_inertia(row.to_dict()))
+    trajectories.append(positions.reshape(-1))
+    scalars.append([flight_time, z0])
+
+X_df = pd.DataFrame(rows)[STATIC_NUMERIC_COLUMNS + CATEGORICAL_COLUMNS]
+X_df = pd.get_dummies(X_df, columns=CATEGORICAL_COLUMNS, drop_first=False).astype('float32')
+Y_traj = np.array(trajectories, dtype=np.float32)
+Y_scalars = np.array(scalars, dtype=np.float32)
+print(f"Loaded {len(X_df)} trajectories resampled on {N_POINTS} points.")
+
+# --- 4. Split, Scaling and PCA ---
+train_index, test_index = train_test_split(np.arange(len(X_df)), test_size=TEST_SIZE, random_state=42)
+
+x_scaler = StandardScaler()
+X_train = x_scaler.fit_transform(X_df.iloc[train_index])
+X_test = x_scaler.transform(X_df.iloc[test_index])
+
+pca = PCA(n_components=N_COMPONENTS)
+coef_train = pca.fit_transform(Y_traj[train_index])
+coef_test = pca.transform(Y_traj[test_index])
+print(f"PCA explained variance with {N_COMPONENTS} components: {pca.explained_variance_ratio_.sum():.6f}")
+
+# The network predicts the standardized PCA coefficients followed by the standardized scalars
+y_scaler = StandardScaler()
+Y_train = y_scaler.fit_transform(np.hstack([coef_train, Y_scalars[train_index]]))
+Y_test = y_scaler.transform(np.hstack([coef_test, Y_scalars[test_index]]))
+
+N_FEATURES = X_train.shape[1]
+N_OUTPUTS = Y_train.shape[1]
+
+# --- 5. Model Definition and Training ---
+print("\n--- Model Definition and Training ---")
+model = Sequential([
+    Input(shape=(N_FEATURES,)),
+    Dense(units=128, activation='relu', kernel_regularizer=l2(1e-4)),
+    Dropout(0.1),
+    Dense(units=128, activation='relu', kernel_regularizer=l2(1e-4)),
+    Dense(units=N_OUTPUTS)
+])
+model.compile(optimizer=Adam(learning_rate=0.001), loss='mse', metrics=['mae'])
+model.summary()
+
+reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=20, min_lr=1e-6)
+history = model.fit(
+    X_train,
+    Y_train,
+    epochs=EPOCHS,
+    batch_size=BATCH_SIZE,
+    validation_split=0.1,
+    verbose=1,
+    callbacks=[reduce_lr]
+)
+
+
+# --- 6. Evaluation (in meters, on the reconstructed trajectories) ---
+def decode(y_scaled):
+    y = y_scaler.inverse_transform(y_scaled)
+    positions = pca.inverse_transform(y[:, :N_COMPONENTS]).reshape(-1, N_POINTS, 3)
+    return positions, y[:, N_COMPONENTS:]
+
+
+print("\n--- Evaluation ---")
+start = time.perf_counter()
+y_pred_scaled = model.predict(X_test, batch_size=len(X_test), verbose=0)
+inference_time = time.perf_counter() - start
+pred_positions, pred_scalars = decode(y_pred_scaled)
+true_positions = Y_traj[test_index].reshape(-1, N_POINTS, 3)
+pca_floor = np.abs(pca.inverse_transform(coef_test).reshape(-1, N_POINTS, 3) - true_positions).mean()
+
+print(f"Trajectory MAE (m): {np.abs(pred_positions - true_positions).mean():.2f}")
+print(f"PCA reconstruction floor MAE (m): {pca_floor:.2f}")
+print(f"Apogee MAE (m): {np.abs(pred_positions[:, :, 2].max(axis=1) - true_positions[:, :, 2].max(axis=1)).mean():.2f}")
+print(f"Flight time MAE (s): {np.abs(pred_scalars[:, 0] - Y_scalars[test_index, 0]).mean():.2f}")
+print(f"Inference: {len(X_test)} trajectories in {inference_time * 1000:.1f} ms (single forward pass)")
+
+# --- 7. Save Model and Preprocessing ---
+print("\n--- Saving Model ---")
+model.save(MODEL_PATH)
+save_preprocessing(preprocessing_path(MODEL_PATH), {
+    'model_type': 'direct',
+    'feature_columns': list(X_df.columns),
+    'x_mean': x_scaler.mean_,
+    'x_scale': x_scaler.scale_,
+    'y_mean': y_scaler.mean_,
+    'y_scale': y_scaler.scale_,
+    'n_points': N_POINTS,
+    'n_components': N_COMPONENTS,
+    'pca_mean': pca.mean_,
+    'pca_components': pca.components_,
+    'output_columns': ['time', 'x', 'y', 'z'],
+})
+print(f"Model saved to '{MODEL_PATH}', preprocessing to '{preprocessing_path(MODEL_PATH)}'")
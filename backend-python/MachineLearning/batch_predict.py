@@ -0,0 +1,106 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from predictor import OUTPUT_COLUMNS, TrajectoryPredictor
+
+# Offline batch prediction for parameter sweeps.
+# Input: a CSV in the master_rocket_inputs.csv schema (one rocket per row).
+# Output: one row per trajectory point (rocket_id, step, time, x, y, z) in a Parquet (or CSV) file.
+#
+#   python batch_predict.py sweep.csv sweep_predictions.parquet --model direct_model --workers 8
+
+DEFAULT_BATCH_SIZE = 4096
+
+_predictor = None
+
+
+def _init_worker(model_name, variant):
+    # One single-threaded ONNX Runtime session per process: the pool spreads batches across cores.
+    global _predictor
+    _predictor = TrajectoryPredictor.from_name(model_name, variant=variant, intra_op_threads=1)
+
+
+def _predict_chunk(features):
+    return _predictor.predict_batch(features)
+
+
+def to_long_table(rocket_ids, trajectories):
+    """(batch, n_points, 4) trajectories -> columnar long table, dropping NaN padding."""
+    n_rockets, n_points, _ = trajectories.shape
+    flat = trajectories.reshape(-1, 4)
+    valid = ~np.isnan(flat[:, 0])
+    table = {
+        'rocket_id': np.repeat(np.asarray(rocket_ids), n_points)[valid],
+        'step': np.tile(np.arange(n_points, dtype=np.int32), n_rockets)[valid],
+    }
+    for i, col in enumerate(OUTPUT_COLUMNS):
+        table[col] = flat[valid, i]
+    return pd.DataFrame(table)
+
+
+class ResultWriter:
+    """Appends result tables to a Parquet file (row group per batch) or a CSV file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self.writer = None
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema, compression='zstd')
+            self.writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a' if self.writer else 'w', header=self.writer is None, index=False)
+            self.writer = True
+
+    def close(self):
+        if self.parquet and self.writer is not None:
+            self.writer.close()
+
+
+def run_batch(input_file, output_file, model_name, variant=None, batch_size=DEFAULT_BATCH_SIZE, workers=None):
+    df_inputs = pd.read_csv(input_file)
+    rocket_ids = (df_inputs['rocket_id'] if 'rocket_id' in df_inputs else pd.Series(np.arange(len(df_inputs)))).astype(str)
+    print(f"Loaded {len(df_inputs)} parameter rows from '{input_file}'.")
+
+    # Encoding is column-wise so its cost does not grow with Python per-row work
+    encoder_predictor = TrajectoryPredictor.from_name(model_name, variant=variant, intra_op_threads=1)
+    features = encoder_predictor.encoder.encode_table(df_inputs)
+    chunks = [(start, features[start:start + batch_size]) for start in range(0, len(features), batch_size)]
+
+    workers = workers or os.cpu_count()
+    writer = ResultWriter(output_file)
+    start_time = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_name, variant)) as pool:
+            # map() keeps the output in input order while the workers run ahead
+            for (start, chunk), trajectories in zip(chunks, pool.map(_predict_chunk, [c for _, c in chunks])):
+                writer.write(to_long_table(rocket_ids.iloc[start:start + len(chunk)].to_numpy(), trajectories))
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start_time
+    print(f"Predicted {len(features)} trajectories in {elapsed:.2f} s "
+          f"({len(features) / max(elapsed, 1e-9):.0f} rockets/s, {workers} workers). Results: '{output_file}'")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predict trajectories for every row of a parameter CSV.")
+    parser.add_argument("input", help="CSV in the master_rocket_inputs.csv schema")
+    parser.add_argument("output", help="output file (.parquet or .csv)")
+    parser.add_argument("--model", default="direct_model", help="model name under models/")
+    parser.add_argument("--variant", default=None, help="quantized variant, e.g. int8")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    run_batch(args.input, args.output, args.model, args.variant, args.batch_size, args.workers)
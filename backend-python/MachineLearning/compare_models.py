@@ -0,0 +1,119 @@
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from tensorflow.keras.callbacks import ReduceLROnPlateau
+
+from convert_onnx import export_onnx, median_latency
+from model_zoo import FIXED_WINDOW_MODELS, MODEL_REGISTRY, build_model
+from pipeline import prepare_sequences
+from train import EpochTimer
+
+# Trains every architecture of model_zoo.py on the same windows as ML1.py and reports what
+# each one costs on CPU against what it buys in accuracy:
+#
+#   python compare_models.py                          # all registered models, 10 epochs
+#   python compare_models.py --models gru,conv1d,mlp --epochs 20 --onnx
+#
+# The table is printed and written to models/model_comparison.csv. Pick the cheapest model
+# that meets the accuracy bar and set MODEL_NAME in ML1.py accordingly.
+
+# --- 1. Configuration ---
+FILE_PATH = 'dataset_tensorflow.csv'
+REPORT_PATH = 'models/model_comparison.csv'
+N_STEPS = 30
+TEST_SIZE = 0.2
+BATCH_SIZE = 512
+EPOCHS = 10
+LATENCY_REPEATS = 20
+
+
+# --- 2. Measurements ---
+def onnx_latency(model, name, data, batch, repeats):
+    import onnxruntime as ort
+
+    shape = [None] + list(data.input_shape)
+    if name not in FIXED_WINDOW_MODELS:
+        shape[1] = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, f"{name}.onnx")
+        export_onnx(model, shape, path)
+        session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        input_name = session.get_inputs()[0].name
+        return median_latency(lambda: session.run(None, {input_name: batch}), repeats)
+
+
+def evaluate_model(name, data, epochs, batch_size, with_onnx=False):
+    model = build_model(name, data.input_shape, data.n_outputs)
+    timer = EpochTimer()
+    reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, min_lr=1e-6)
+    history = model.fit(data.X_train, data.Y_train, epochs=epochs, batch_size=batch_size, validation_split=0.1,
+                        verbose=0, callbacks=[timer, reduce_lr])
+
+    y_pred_scaled = model.predict(data.X_test, batch_size=batch_size, verbose=0)
+    y_pred = data.y_scaler.inverse_transform(y_pred_scaled)
+    y_true = data.y_scaler.inverse_transform(data.Y_test)
+
+    batch = data.X_test[:batch_size]
+    result = {
+        'model': name,
+        'parameters': model.count_params(),
+        # The first epoch includes graph tracing, the median is the steady-state cost
+        'epoch_time_s': float(np.median(timer.times)),
+        'first_epoch_s': timer.times[0],
+        'batch_size': len(batch),
+        'keras_latency_ms': median_latency(lambda: model(batch, training=False), LATENCY_REPEATS),
+        'single_latency_ms': median_latency(lambda: model(batch[:1], training=False), LATENCY_REPEATS),
+        'val_loss': history.history['val_loss'][-1],
+        'test_mae_scaled': float(np.abs(y_pred_scaled - data.Y_test).mean()),
+        'test_mae_m': float(np.abs(y_pred - y_true).mean()),
+    }
+    if with_onnx:
+        result['onnx_latency_ms'] = onnx_latency(model, name, data, batch, LATENCY_REPEATS)
+    return result
+
+
+def compare_models(names, data, epochs=EPOCHS, batch_size=BATCH_SIZE, with_onnx=False, report_path=REPORT_PATH):
+    results = []
+    for name in names:
+        print(f"Training '{name}' for {epochs} epochs...")
+        results.append(evaluate_model(name, data, epochs, batch_size, with_onnx))
+        print(f"  {results[-1]['parameters']} parameters, {results[-1]['epoch_time_s']:.1f} s/epoch, "
+              f"test MAE {results[-1]['test_mae_m']:.2f} m")
+    report = pd.DataFrame(results).sort_values('test_mae_m')
+    os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+    report.to_csv(report_path, index=False)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the cost and accuracy of the sequence architectures.")
+    parser.add_argument("--models", default=",".join(MODEL_REGISTRY),
+                        help=f"comma-separated names among: {', '.join(MODEL_REGISTRY)}")
+    parser.add_argument("--data", default=FILE_PATH)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--onnx", action="store_true", help="also measure the ONNX Runtime latency")
+    parser.add_argument("--output", default=REPORT_PATH)
+    args = parser.parse_args()
+
+    names = args.models.split(",")
+    unknown = [name for name in names if name not in MODEL_REGISTRY]
+    if unknown:
+        parser.error(f"unknown models: {', '.join(unknown)}")
+    try:
+        df = pd.read_csv(args.data)
+    except FileNotFoundError:
+        print(f"Error: File not found at {args.data}.")
+        exit()
+
+    print("--- Data Loading and Preparation ---")
+    data = prepare_sequences(df, N_STEPS, TEST_SIZE)
+    print(f"{len(data.X_train)} training / {len(data.X_test)} test windows of shape {data.input_shape}\n")
+
+    report = compare_models(names, data, args.epochs, args.batch_size, args.onnx, args.output)
+    print("\n--- Model Comparison ---")
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+    print(f"\nReport written to '{args.output}'")
@@ -0,0 +1,316 @@
+import argparse
+import gzip
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import onnxruntime as ort
+import pandas as pd
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback, ReduceLROnPlateau
+from tensorflow.keras.models import clone_model, load_model
+from tensorflow.keras.optimizers import Adam
+
+from convert_onnx import convert_to_onnx, export_onnx, input_shape_for, median_latency, optimize_onnx, quantize_onnx
+from model_zoo import build_model, model_metadata
+from pipeline import prepare_sequences
+from predictor import TrajectoryPredictor
+from preprocessing import load_preprocessing, preprocessing_path, save_preprocessing
+from train import fit_with_checkpoints, run_dir_for
+
+# Compression stage after ML1.py, for serving: distills the trained sequence model into a
+# smaller student (trained on a blend of the teacher outputs and the ground truth), prunes the
+# smallest weights of the student while fine-tuning it, and quantizes it to int8. Every stage
+# is measured against the original model: ONNX size (raw and gzipped, which is what sparsity
+# saves), CPU latency in ONNX Runtime, error on the test windows and full rollout error.
+#
+#   python compress.py                                  # gru student, 50% sparsity, int8
+#   python compress.py --student lstm --units 32,16 --sparsity 0.7
+#   python compress.py --no-distill --sparsity 0.5      # prune and quantize the model itself
+#
+# The compressed model is saved as models/trajectory_model_student.keras with its preprocessing
+# metadata and goes through convert_onnx.py as usual, which writes the .onnx and _int8.onnx
+# files the predictor loads: TrajectoryPredictor.from_name("trajectory_model_student", "int8").
+
+# --- 1. Configuration ---
+FILE_PATH = 'dataset_tensorflow.csv'
+TEACHER_PATH = 'models/trajectory_model.keras'
+STUDENT_PATH = 'models/trajectory_model_student.keras'
+REPORT_PATH = 'models/compression_report.csv'
+ROCKETS_FILE = os.path.join('..', 'DatasetGenerator', 'dataset', 'master_rocket_inputs_with_init_wind.csv')
+N_STEPS = 30
+TEST_SIZE = 0.2
+BATCH_SIZE = 512
+STUDENT_MODEL = 'gru'
+STUDENT_HYPERPARAMETERS = {'units': (32, 16), 'dense_units': 8}
+DISTILL_EPOCHS = 30
+PATIENCE = 5
+DISTILL_ALPHA = 0.5  # weight of the teacher outputs in the student targets, the rest is ground truth
+SPARSITY = 0.5  # fraction of every kernel set to zero
+PRUNE_EPOCHS = 10  # sparsity ramps up over the first 2/3, the rest fine-tunes at the final sparsity
+PRUNE_LEARNING_RATE = 1e-4
+EVAL_WINDOWS = 20000
+ROLLOUT_ROCKETS = 32
+LATENCY_REPEATS = 50
+
+
+# --- 2. Distillation ---
+def distill(teacher, data, student_name, hyperparameters, alpha=DISTILL_ALPHA, epochs=DISTILL_EPOCHS,
+            batch_size=BATCH_SIZE, patience=PATIENCE, run_dir=None):
+    """
+    Trains a student on alpha * teacher output + (1 - alpha) * ground truth (scaled units).
+    The run directory defaults to runs/student_<name>-<hash of its configuration>.
+    """
+    run_dir = run_dir or run_dir_for(f'student_{student_name}', {**hyperparameters, 'alpha': alpha,
+                                                                 'input_shape': list(data.input_shape)})
+    teacher_train = teacher.predict(data.X_train, batch_size=batch_size, verbose=0)
+    targets = alpha * teacher_train + (1 - alpha) * data.Y_train
+    student = build_model(student_name, data.input_shape, data.n_outputs, **hyperparameters)
+    student, _ = fit_with_checkpoints(student, data.X_train, targets, run_dir, epochs, batch_size, patience)
+    return student, targets
+
+
+# --- 3. Magnitude Pruning ---
+def prunable_weights(model):
+    # Kernels and recurrent kernels; biases and normalization parameters are kept dense
+    return [w for w in model.trainable_weights if len(w.shape) >= 2]
+
+
+def magnitude_mask(values, sparsity):
+    """Mask keeping the 1 - sparsity fraction of values with the largest magnitude."""
+    k = int(round(sparsity * values.size))
+    if k == 0:
+        return np.ones(values.shape, dtype=np.float32)
+    threshold = np.partition(np.abs(values).ravel(), k - 1)[k - 1]
+    return (np.abs(values) > threshold).astype(np.float32)
+
+
+class MagnitudePruning(Callback):
+    """
+    Gradual magnitude pruning (Zhu & Gupta): at every epoch the sparsity of each kernel grows
+    along s * (1 - (1 - progress)^3) and the smallest weights are masked; the masks are
+    re-applied after every batch so pruned weights stay at zero.
+    """
+
+    def __init__(self, final_sparsity, ramp_epochs):
+        super().__init__()
+        self.final_sparsity = final_sparsity
+        self.ramp_epochs = max(1, ramp_epochs)
+
+    def sparsity_at(self, epoch):
+        progress = min(1.0, (epoch + 1) / self.ramp_epochs)
+        return self.final_sparsity * (1 - (1 - progress) ** 3)
+
+    def on_train_begin(self, logs=None):
+        self.kernels = prunable_weights(self.model)
+
+    def on_epoch_begin(self, epoch, logs=None):
+        sparsity = self.sparsity_at(epoch)
+        self.masks = [tf.constant(magnitude_mask(w.numpy(), sparsity)) for w in self.kernels]
+        self.apply_masks()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.apply_masks()
+
+    def apply_masks(self):
+        for weight, mask in zip(self.kernels, self.masks):
+            weight.assign(weight * mask)
+
+
+def prune(model, X, targets, sparsity=SPARSITY, epochs=PRUNE_EPOCHS, batch_size=BATCH_SIZE,
+          learning_rate=PRUNE_LEARNING_RATE):
+    """Fine-tunes a copy of model while pruning it to the given sparsity."""
+    pruned = clone_model(model)
+    pruned.set_weights(model.get_weights())
+    pruned.compile(optimizer=Adam(learning_rate=learning_rate), loss='mse', metrics=['mae'])
+    # No early stopping or best checkpoint here: an early epoch is not pruned enough
+    pruned.fit(X, targets, epochs=epochs, batch_size=batch_size, validation_split=0.1, verbose=1,
+               callbacks=[MagnitudePruning(sparsity, int(np.ceil(epochs * 2 / 3))),
+                          ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=3, min_lr=1e-6)])
+    return pruned
+
+
+def weight_sparsity(model):
+    weights = prunable_weights(model)
+    zeros = sum(int(np.sum(w.numpy() == 0)) for w in weights)
+    return zeros / max(1, sum(int(np.prod(w.shape)) for w in weights))
+
+
+# --- 4. Measurements ---
+def export_variants(model, metadata, name, work_dir, quantize=True):
+    """fp32 (optimized) and int8 ONNX files of a Keras model, each with its metadata file."""
+    raw_path = os.path.join(work_dir, f"{name}_raw.onnx")
+    export_onnx(model, input_shape_for(model, metadata), raw_path)
+    paths = {name: os.path.join(work_dir, f"{name}.onnx")}
+    optimize_onnx(raw_path, paths[name])
+    if quantize and quantize_onnx(raw_path, os.path.join(work_dir, f"{name}_int8.onnx"), "int8"):
+        paths[f"{name}_int8"] = os.path.join(work_dir, f"{name}_int8.onnx")
+    for path in paths.values():
+        save_preprocessing(preprocessing_path(path), metadata)
+    return paths
+
+
+def onnx_session(path):
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+def run_windows(session, X, batch_size=BATCH_SIZE):
+    input_name = session.get_inputs()[0].name
+    return np.concatenate([session.run(None, {input_name: X[start:start + batch_size]})[0]
+                           for start in range(0, len(X), batch_size)])
+
+
+def rollout_distance(trajectories, reference):
+    """Mean and landing distance (m) between two NaN-padded (rockets, points, 4) rollouts."""
+    n_points = min(trajectories.shape[1], reference.shape[1])
+    a, b = trajectories[:, :n_points, 1:], reference[:, :n_points, 1:]
+    distance = np.linalg.norm(a - b, axis=2)  # NaN once either rocket has landed
+    landing = []
+    for trajectory, ref in zip(trajectories, reference):
+        last, ref_last = trajectory[~np.isnan(trajectory[:, 0])], ref[~np.isnan(ref[:, 0])]
+        if len(last) and len(ref_last):
+            landing.append(np.linalg.norm(last[-1, 1:] - ref_last[-1, 1:]))
+    return float(np.nanmean(distance)), float(np.mean(landing)) if landing else np.nan
+
+
+def measure_variant(name, onnx_path, keras_model, data, X_eval, Y_eval_m, teacher_eval_m, rockets, teacher_rollout):
+    session = onnx_session(onnx_path)
+    input_name = session.get_inputs()[0].name
+    with open(onnx_path, 'rb') as f:
+        gzip_kb = len(gzip.compress(f.read())) / 1024
+    y_pred_m = data.y_scaler.inverse_transform(run_windows(session, X_eval))
+
+    predictor = TrajectoryPredictor(onnx_path)
+    rollout = predictor.predict_batch(predictor.encoder.encode_table(rockets))
+    rollout_mean, landing = (rollout_distance(rollout, teacher_rollout) if teacher_rollout is not None
+                             else (0.0, 0.0))
+    return {
+        'variant': name,
+        'parameters': keras_model.count_params(),
+        'sparsity': weight_sparsity(keras_model),
+        'onnx_kb': os.path.getsize(onnx_path) / 1024,
+        'gzip_kb': gzip_kb,
+        'latency_1_ms': median_latency(lambda: session.run(None, {input_name: X_eval[:1]}), LATENCY_REPEATS),
+        f'latency_{ROLLOUT_ROCKETS}_ms': median_latency(
+            lambda: session.run(None, {input_name: X_eval[:ROLLOUT_ROCKETS]}), LATENCY_REPEATS),
+        'test_mae_m': float(np.abs(y_pred_m - Y_eval_m).mean()),
+        'teacher_diff_m': float(np.abs(y_pred_m - teacher_eval_m).mean()),
+        'rollout_diff_m': rollout_mean,
+        'landing_diff_m': landing,
+    }, rollout
+
+
+def sample_rockets(rockets_file=ROCKETS_FILE, n=ROLLOUT_ROCKETS, seed=0):
+    """Launch parameters of a fixed sample of dataset rockets, for the rollout comparison."""
+    df = pd.read_csv(rockets_file)
+    return df.sample(n=min(n, len(df)), random_state=seed).reset_index(drop=True)
+
+
+# --- 5. Compression Pipeline ---
+def compress(teacher_path=TEACHER_PATH, student_path=STUDENT_PATH, data_path=FILE_PATH, report_path=REPORT_PATH,
+             student_name=STUDENT_MODEL, hyperparameters=None, distill_student=True, alpha=DISTILL_ALPHA,
+             sparsity=SPARSITY, epochs=DISTILL_EPOCHS, prune_epochs=PRUNE_EPOCHS):
+    hyperparameters = STUDENT_HYPERPARAMETERS if hyperparameters is None else hyperparameters
+    if not os.path.exists(teacher_path):
+        print(f"Error: Input model '{teacher_path}' not found.")
+        print("Please run ML1.py first to train and save the model.")
+        return None
+    try:
+        df = pd.read_csv(data_path)
+    except FileNotFoundError:
+        print(f"Error: File not found at {data_path}.")
+        return None
+
+    print("--- Data Loading and Preparation ---")
+    data = prepare_sequences(df, N_STEPS, TEST_SIZE)
+    teacher = load_model(teacher_path)
+    teacher_metadata_path = preprocessing_path(teacher_path)
+    if os.path.exists(teacher_metadata_path):
+        teacher_metadata = load_preprocessing(teacher_metadata_path)
+        if teacher_metadata['feature_columns'] != data.feature_columns:
+            print(f"Error: '{data_path}' does not have the features the teacher was trained on.")
+            return None
+    else:
+        teacher_metadata = data.metadata()
+
+    print(f"\n--- Distillation ({student_name if distill_student else 'skipped'}) ---")
+    if distill_student:
+        student, targets = distill(teacher, data, student_name, hyperparameters, alpha, epochs)
+        student_metadata = data.metadata(**model_metadata(student_name))
+    else:
+        student, targets = teacher, data.Y_train
+        student_metadata = dict(teacher_metadata)
+
+    stages = [('teacher', teacher, teacher_metadata)]
+    if distill_student:
+        stages.append(('student', student, student_metadata))
+    final, final_metadata = student, student_metadata
+    if sparsity > 0:
+        print(f"\n--- Magnitude Pruning ({sparsity:.0%}) ---")
+        final = prune(student, data.X_train, targets, sparsity, prune_epochs)
+        print(f"Kernel sparsity reached: {weight_sparsity(final):.1%}")
+        stages.append(('pruned', final, student_metadata))
+    final_metadata = {**final_metadata, 'compression': {
+        'teacher': teacher_path, 'distilled': distill_student, 'alpha': alpha if distill_student else None,
+        'sparsity': weight_sparsity(final)}}
+
+    print("\n--- Size, Latency and Error Report ---")
+    stride = max(1, len(data.X_test) // EVAL_WINDOWS)
+    X_eval = data.X_test[::stride]
+    Y_eval_m = data.y_scaler.inverse_transform(data.Y_test[::stride])
+    teacher_eval_m = data.y_scaler.inverse_transform(teacher.predict(X_eval, batch_size=BATCH_SIZE, verbose=0))
+    rockets = sample_rockets()
+    results, teacher_rollout = [], None
+    work_dir = tempfile.mkdtemp()
+    try:
+        for name, model, metadata in stages:
+            for variant, path in export_variants(model, metadata, name, work_dir).items():
+                result, rollout = measure_variant(variant, path, model, data, X_eval, Y_eval_m, teacher_eval_m,
+                                                  rockets, teacher_rollout)
+                if variant == 'teacher':
+                    teacher_rollout = rollout
+                results.append(result)
+                print(f"  {variant}: {result['onnx_kb']:.0f} KB, {result['latency_1_ms']:.3f} ms/call, "
+                      f"test MAE {result['test_mae_m']:.2f} m, rollout diff {result['rollout_diff_m']:.2f} m")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    report = pd.DataFrame(results)
+    os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+    report.to_csv(report_path, index=False)
+
+    print("\n--- Saving Compressed Model ---")
+    final.save(student_path)
+    save_preprocessing(preprocessing_path(student_path), final_metadata)
+    print(f"Model saved to '{student_path}', preprocessing to '{preprocessing_path(student_path)}'")
+    # Same export as for the original model: ONNX, int8 variant and parity check
+    convert_to_onnx(student_path, quantize="int8")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distill, prune and quantize the trajectory model for serving.")
+    parser.add_argument("--teacher", default=TEACHER_PATH, help="trained Keras model (ML1.py)")
+    parser.add_argument("--output", default=STUDENT_PATH, help="compressed Keras model")
+    parser.add_argument("--data", default=FILE_PATH)
+    parser.add_argument("--report", default=REPORT_PATH)
+    parser.add_argument("--student", default=STUDENT_MODEL, help="student architecture from model_zoo")
+    parser.add_argument("--units", default=None, help="comma-separated layer sizes of the student, e.g. 32,16")
+    parser.add_argument("--no-distill", action="store_true", help="prune and quantize the teacher itself")
+    parser.add_argument("--alpha", type=float, default=DISTILL_ALPHA, help="weight of the teacher in the targets")
+    parser.add_argument("--sparsity", type=float, default=SPARSITY, help="0 disables pruning")
+    parser.add_argument("--epochs", type=int, default=DISTILL_EPOCHS)
+    parser.add_argument("--prune-epochs", type=int, default=PRUNE_EPOCHS)
+    args = parser.parse_args()
+
+    hyperparameters = dict(STUDENT_HYPERPARAMETERS)
+    if args.units:
+        hyperparameters['units'] = tuple(int(u) for u in args.units.split(","))
+    report = compress(args.teacher, args.output, args.data, args.report, args.student, hyperparameters,
+                      not args.no_distill, args.alpha, args.sparsity, args.epochs, args.prune_epochs)
+    if report is not None:
+        print("\n--- Compression Report ---")
+        print(report.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+        print(f"\nReport written to '{args.report}'")
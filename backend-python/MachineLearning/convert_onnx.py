@@ -1,4 +1,9 @@
+import argparse
 import os
+import shutil
+import sys
+import tempfile
+import time
 import numpy as np
 # Monkey patch for tf2onnx compatibility with NumPy 2.0+ (Python 3.13)
 # tf2onnx relies on np.cast which was removed in NumPy 2.0.
@@ -9,74 +14,215 @@ except AttributeError:
 
 import tensorflow as tf
 import tf2onnx
+import onnxruntime as ort
 
-def convert_to_onnx():
-    input_model_path = "models/trajectory_model.keras"
-    output_model_path = "models/trajectory_model.onnx"
+from preprocessing import load_preprocessing, preprocessing_path
 
+DEFAULT_MODEL_PATH = "models/trajectory_model.keras"
+OPSET = 13
+PARITY_STEPS = 30  # window length of the parity samples when neither the metadata nor the model fix it
+
+
+def input_shape_for(model, metadata, dynamic_sequence=True):
+    """
+    Input shape with a dynamic batch axis, read from the preprocessing metadata
+    when available and from the Keras model otherwise. Sequence models also get
+    a dynamic time axis unless the architecture needs a fixed window length.
+    """
+    if metadata is not None and metadata.get('model_type') == 'sequence':
+        shape = [None, metadata['n_steps'], len(metadata['feature_columns'])]
+    elif metadata is not None:
+        shape = [None, len(metadata['feature_columns'])]
+    else:
+        shape = [None] + list(model.input_shape[1:])
+    if len(shape) == 3 and dynamic_sequence and metadata is not None and metadata.get('dynamic_sequence', True):
+        shape[1] = None
+    return shape
+
+
+def export_onnx(model, input_shape, output_path, opset=OPSET):
+    # Tracing a tf.function avoids the Keras 3 'output_names' errors of tf2onnx.convert.from_keras
+    # and the temporary SavedModel round trip.
+    input_signature = [tf.TensorSpec(input_shape, tf.float32, name="input")]
+    forward = tf.function(lambda x: model(x, training=False), input_signature=input_signature)
+    tf2onnx.convert.from_function(forward, input_signature=input_signature, opset=opset, output_path=output_path)
+
+
+def optimize_onnx(input_path, output_path):
+    # Offline graph optimization (constant folding, node fusions). EXTENDED keeps the graph
+    # portable across CPUs, unlike ORT_ENABLE_ALL which bakes in hardware-specific layouts.
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    options.optimized_model_filepath = output_path
+    ort.InferenceSession(input_path, options, providers=["CPUExecutionProvider"])
+
+
+def quantize_onnx(input_path, output_path, mode):
+    if mode == "int8":
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(input_path, output_path, weight_type=QuantType.QInt8)
+    elif mode == "fp16":
+        try:
+            import onnx
+            from onnxconverter_common import float16
+        except ImportError:
+            print("Error: fp16 conversion requires the 'onnx' and 'onnxconverter-common' packages.")
+            return False
+        model_fp16 = float16.convert_float_to_float16(onnx.load(input_path), keep_io_types=True)
+        onnx.save(model_fp16, output_path)
+    else:
+        raise ValueError(f"Unknown quantization mode: {mode}")
+    return True
+
+
+def median_latency(fn, repeats):
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def parity_shape(input_shape, model, metadata, batch_size):
+    """
+    Concrete shape of the parity samples. The time axis of a sequence model comes from the
+    training window (metadata n_steps): model_zoo models declare it dynamic in Keras too.
+    """
+    shape = [batch_size] + list(input_shape[1:])
+    if len(shape) == 3 and shape[1] is None:
+        shape[1] = (metadata or {}).get('n_steps') or model.input_shape[1] or PARITY_STEPS
+    return shape
+
+
+def dynamic_reference(model):
+    """
+    Copy of a sequence model built for a fixed window, rebuilt with the input shape
+    (None, None, n_features) and the same weights, so that longer windows have a Keras
+    reference. None when the architecture needs its fixed window (e.g. Flatten).
+    """
+    config = model.get_config()
+    if isinstance(config.get('build_input_shape'), (list, tuple)) and len(config['build_input_shape']) == 3:
+        config['build_input_shape'] = [None, None, config['build_input_shape'][2]]
+    for layer in config.get('layers', []):
+        layer_config = layer.get('config', {})
+        for key in ('batch_shape', 'batch_input_shape'):
+            shape = layer_config.get(key)
+            if shape is not None and len(shape) == 3:
+                layer_config[key] = [None, None, shape[2]]
+    try:
+        reference = model.__class__.from_config(config)
+        reference.set_weights(model.get_weights())
+    except (ValueError, TypeError):
+        return None
+    return reference
+
+
+def check_parity(model, onnx_path, sample, atol, repeats=20):
+    """
+    Compares the ONNX model with the Keras model on a sample batch (values and latency).
+    Returns None when no Keras reference accepts the sample (window left unverified).
+    """
+    session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+    actual = session.run(None, {input_name: sample})[0]
+    try:
+        expected = model(sample, training=False).numpy()
+    except ValueError:
+        # The Keras model was built for a fixed window; only the ONNX graph is dynamic.
+        model = dynamic_reference(model)
+        if model is None:
+            print(f"  {os.path.basename(onnx_path)} input {tuple(sample.shape)}: UNVERIFIED, the Keras model "
+                  f"cannot be rebuilt for this window length")
+            return None
+        expected = model(sample, training=False).numpy()
+    max_error = float(np.max(np.abs(expected - actual)))
+    keras_ms = median_latency(lambda: model(sample, training=False), repeats)
+    onnx_ms = median_latency(lambda: session.run(None, {input_name: sample}), repeats)
+    ok = max_error <= atol
+    print(f"  {os.path.basename(onnx_path)} input {tuple(sample.shape)}: max |diff| = {max_error:.2e} "
+          f"({'OK' if ok else 'FAILED'}, atol={atol:.0e}), latency Keras {keras_ms:.2f} ms / ONNX {onnx_ms:.2f} ms "
+          f"({os.path.getsize(onnx_path) / 1024:.0f} KB)")
+    return ok
+
+
+def convert_to_onnx(input_model_path=DEFAULT_MODEL_PATH, output_model_path=None, quantize=None, optimize=True,
+                    dynamic_sequence=True, batch_size=64, atol=1e-4, quantized_atol=5e-2, opset=OPSET):
+    output_model_path = output_model_path or os.path.splitext(input_model_path)[0] + ".onnx"
     if not os.path.exists(input_model_path):
         print(f"Error: Input model '{input_model_path}' not found.")
         print("Please run ML1.py first to train and save the model.")
-        return
+        return False
+
+    metadata = None
+    metadata_path = preprocessing_path(input_model_path)
+    if os.path.exists(metadata_path):
+        metadata = load_preprocessing(metadata_path)
+    else:
+        print(f"Warning: '{metadata_path}' not found, reading the input shape from the model.")
 
     print(f"Loading model from '{input_model_path}'...")
+    model = tf.keras.models.load_model(input_model_path)
+    input_shape = input_shape_for(model, metadata, dynamic_sequence)
+    print(f"Input signature: {input_shape}")
+
+    temp_dir = tempfile.mkdtemp()
     try:
-        model = tf.keras.models.load_model(input_model_path)
-        
-        # Hardcoded input shape based on ML1.py (N_STEPS=30, N_FEATURES=38)
-        # The model expects a batch dimension (None)
-        input_signature = [tf.TensorSpec((None, 30, 38), tf.float32, name="input")]
-        
-        # Convert
-        # Keras 3 compatibility fix: Save as TF SavedModel first, then convert.
-        # Direct conversion from Keras 3 objects often fails with 'output_names' error.
-        temp_saved_model = "temp_tf_saved_model"
-        if os.path.exists(temp_saved_model):
-            import shutil
-            shutil.rmtree(temp_saved_model)
-            
-        print(f"Saving temporary TF model to '{temp_saved_model}'...")
-        model.export(temp_saved_model) # Keras 3 export
-        
-        print(f"Converting to ONNX (output: '{output_model_path}')...")
-        # Use tf2onnx.convert.main() directly to run in the same process
-        # This ensures the np.cast monkey patch is applied.
-        import sys
-        from tf2onnx.convert import main as tf2onnx_main
-        
-        # Mock sys.argv
-        original_argv = sys.argv
-        sys.argv = [
-            "tf2onnx.convert",
-            "--saved-model", temp_saved_model,
-            "--output", output_model_path,
-            "--opset", "13"
-        ]
-        
-        try:
-            tf2onnx_main()
-            print(f"Success! Model saved to '{output_model_path}'")
-        except SystemExit as e:
-            if e.code == 0:
-                print(f"Success! Model saved to '{output_model_path}'")
+        raw_path = os.path.join(temp_dir, "raw.onnx")
+        print(f"Converting to ONNX (opset {opset})...")
+        export_onnx(model, input_shape, raw_path, opset)
+        if optimize:
+            optimize_onnx(raw_path, output_model_path)
+        else:
+            shutil.copyfile(raw_path, output_model_path)
+        print(f"Model saved to '{output_model_path}'")
+
+        variants = [(output_model_path, atol)]
+        if quantize:
+            quantized_path = f"{os.path.splitext(output_model_path)[0]}_{quantize}.onnx"
+            if quantize_onnx(raw_path, quantized_path, quantize):
+                print(f"Quantized ({quantize}) model saved to '{quantized_path}'")
+                variants.append((quantized_path, quantized_atol))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    # Inputs are standardized, so a standard normal batch is representative of real data.
+    print("\n--- Parity and latency check ---")
+    rng = np.random.default_rng(0)
+    fixed_shape = parity_shape(input_shape, model, metadata, batch_size)
+    samples = [rng.standard_normal(fixed_shape).astype(np.float32)]
+    if len(input_shape) == 3 and input_shape[1] is None:
+        # Also exercise the dynamic time axis with a longer window
+        samples.append(rng.standard_normal([batch_size, fixed_shape[1] * 2, fixed_shape[2]]).astype(np.float32))
+    ok = True
+    unverified = 0
+    for path, tolerance in variants:
+        for sample in samples:
+            result = check_parity(model, path, sample, tolerance)
+            if result is None:
+                unverified += 1
             else:
-                print(f"tf2onnx exited with code {e.code}")
-        except Exception as e:
-            print(f"Error converting to ONNX: {e}")
-            import traceback
-            traceback.print_exc()
-        finally:
-            sys.argv = original_argv
-            
-        # Cleanup
-        if os.path.exists(temp_saved_model):
-            import shutil
-            shutil.rmtree(temp_saved_model)
-        
-    except Exception as e:
-        print(f"Error during conversion: {e}")
-        import traceback
-        traceback.print_exc()
+                ok = result and ok
+    if unverified:
+        print(f"Warning: {unverified} parity check(s) unverified, use --fixed-sequence to export the "
+              f"training window only.")
+    return ok
+
 
 if __name__ == "__main__":
-    convert_to_onnx()
+    parser = argparse.ArgumentParser(description="Export a trained Keras trajectory model to ONNX.")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Keras model to export")
+    parser.add_argument("--output", default=None, help="ONNX file (default: model path with .onnx)")
+    parser.add_argument("--quantize", choices=["int8", "fp16"], default=None,
+                        help="also write a quantized variant next to the ONNX model")
+    parser.add_argument("--no-optimize", action="store_true", help="skip offline graph optimization")
+    parser.add_argument("--fixed-sequence", action="store_true", help="keep the time axis fixed to n_steps")
+    parser.add_argument("--batch-size", type=int, default=64, help="sample batch size for the parity check")
+    parser.add_argument("--atol", type=float, default=1e-4, help="parity tolerance for the fp32 model")
+    parser.add_argument("--opset", type=int, default=OPSET)
+    args = parser.parse_args()
+
+    success = convert_to_onnx(args.model, args.output, args.quantize, not args.no_optimize,
+                              not args.fixed_sequence, args.batch_size, args.atol, opset=args.opset)
+    sys.exit(0 if success else 1)
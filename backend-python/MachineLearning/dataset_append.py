@@ -0,0 +1,259 @@
+import argparse
+import ast
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from preprocessing import CATEGORICAL_COLUMNS, expand_inertia, resolve_trajectory_path
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'DatasetGenerator'))
+from wind_profiles import PROFILE_COLUMN, PROFILE_DIR, WIND_COLUMNS, WindProfileStore
+
+# Incremental version of dataset_modifier.py: merges only the rocket_ids that are not in the
+# training store yet, appends their rows to dataset_tensorflow.csv and updates the running
+# scaler statistics (count / mean / M2 per column) kept in the manifest. The cost of an append
+# is proportional to the new rockets, not to the size of the dataset.
+#
+#   python dataset_append.py                       # append every new rocket of the inputs file
+#   python dataset_append.py --rebuild-manifest    # one-off full pass over an existing dataset
+
+# --- 1. Configuration ---
+DATASET_DIR = '../DatasetGenerator'
+INPUT_FILE = os.path.join(DATASET_DIR, 'dataset', 'master_rocket_inputs_with_init_wind.csv')
+DATASET_FILE = 'dataset_tensorflow.csv'
+MANIFEST_FILE = 'dataset_manifest.json'
+PATH_COLUMN = 'trajectory_file'
+WIND_PROFILES = WindProfileStore(os.path.join(DATASET_DIR, PROFILE_DIR))
+DERIVED_COLUMNS = ['vx', 'vy', 'vz', 'ax', 'ay', 'az']
+
+
+# --- 2. Running Statistics ---
+def add_derived_features(df):
+    """Velocity and acceleration per simulation, as used by ML1.py."""
+    by_simulation = df.groupby('simulation_id', sort=False)
+    for axis in ('x', 'y', 'z'):
+        df['v' + axis] = by_simulation[axis].diff().fillna(0)
+    by_simulation = df.groupby('simulation_id', sort=False)
+    for axis in ('x', 'y', 'z'):
+        df['a' + axis] = by_simulation['v' + axis].diff().fillna(0)
+    return df
+
+
+def chunk_statistics(df):
+    """count / mean / M2 of every numeric and one-hot column of a chunk of the dataset."""
+    df = add_derived_features(df.copy())
+    present = [col for col in CATEGORICAL_COLUMNS if col in df.columns]
+    numeric = pd.get_dummies(df, columns=present, drop_first=False).select_dtypes(include=['number', 'bool'])
+    values = numeric.to_numpy(dtype=np.float64)
+    mean = values.mean(axis=0)
+    m2 = ((values - mean) ** 2).sum(axis=0)
+    return {
+        'count': len(values),
+        'mean': dict(zip(numeric.columns, mean.tolist())),
+        'm2': dict(zip(numeric.columns, m2.tolist())),
+    }
+
+
+def merge_statistics(a, b):
+    """
+    Chan et al. parallel combination of two sets of running statistics. A one-hot
+    column that only exists on one side is all zeros on the other one.
+    """
+    if a is None or a['count'] == 0:
+        return b
+    n_a, n_b = a['count'], b['count']
+    n = n_a + n_b
+    merged = {'count': n, 'mean': {}, 'm2': {}}
+    for col in dict.fromkeys(list(a['mean']) + list(b['mean'])):
+        mean_a, m2_a = a['mean'].get(col, 0.0), a['m2'].get(col, 0.0)
+        mean_b, m2_b = b['mean'].get(col, 0.0), b['m2'].get(col, 0.0)
+        delta = mean_b - mean_a
+        merged['mean'][col] = mean_a + delta * n_b / n
+        merged['m2'][col] = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+    return merged
+
+
+def scaler_statistics(manifest, columns):
+    """(mean, variance) arrays for the given columns, as a StandardScaler would fit them."""
+    stats = manifest['stats']
+    mean = np.array([stats['mean'][col] for col in columns])
+    var = np.array([stats['m2'][col] for col in columns]) / stats['count']
+    return mean, var
+
+
+# --- 3. Manifest ---
+def load_manifest(path=MANIFEST_FILE):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    # Write then rename, so an interrupted run never leaves a truncated manifest
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def rebuild_manifest(dataset_file=DATASET_FILE, chunksize=500_000):
+    """One full pass over an existing dataset file (needed once, before the first append)."""
+    manifest = {'dataset_file': dataset_file, 'columns': None, 'n_rows': 0, 'rockets': {}, 'stats': None}
+    carry = None
+    for chunk in pd.read_csv(dataset_file, chunksize=chunksize):
+        manifest['columns'] = list(chunk.columns)
+        # Keep the last simulation of the chunk for the next one, so derived features never straddle chunks
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        last_id = chunk['simulation_id'].iloc[-1]
+        carry = chunk[chunk['simulation_id'] == last_id]
+        complete = chunk[chunk['simulation_id'] != last_id]
+        if len(complete):
+            register_rows(manifest, complete)
+    if carry is not None:
+        register_rows(manifest, carry)
+    return manifest
+
+
+def register_rows(manifest, df):
+    counts = df.groupby(['rocket_id', 'simulation_id'], sort=False).size()
+    for (rocket_id, simulation_id), n_rows in counts.items():
+        manifest['rockets'][rocket_id] = {'simulation_id': int(simulation_id), 'rows': int(n_rows)}
+    manifest['n_rows'] += len(df)
+    manifest['stats'] = merge_statistics(manifest['stats'], chunk_statistics(df))
+
+
+def expand_inertia_column(df):
+    """
+    Splits the '(Ixy, Ixy, Iz)' inertia strings of a dataset table into inertia_ixy / inertia_iz
+    (as preprocessing.expand_inertia does for one rocket). Each distinct string is parsed once.
+    """
+    if 'inertia' not in df:
+        return df
+    codes, uniques = pd.factorize(df['inertia'])
+    inertia = np.array([ast.literal_eval(v) if isinstance(v, str) else v for v in uniques], dtype=np.float64)
+    df = df.drop(columns='inertia')
+    df['inertia_ixy'] = inertia[codes, 0]
+    df['inertia_iz'] = inertia[codes, 2]
+    return df
+
+
+def migrate_inertia_column(dataset_file=DATASET_FILE, chunksize=500_000):
+    """
+    One-off schema migration of a store written by dataset_modifier.py before the inertia
+    split: rewrites the file with inertia_ixy / inertia_iz and returns its new manifest.
+    """
+    tmp_path = dataset_file + '.tmp'
+    for i, chunk in enumerate(pd.read_csv(dataset_file, chunksize=chunksize)):
+        expand_inertia_column(chunk).to_csv(tmp_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    os.replace(tmp_path, dataset_file)
+    return rebuild_manifest(dataset_file)
+
+
+def discard_interrupted_append(manifest, dataset_file=DATASET_FILE):
+    """
+    An append records the size of the dataset file in the manifest before writing its rows.
+    If that record is still there, the run stopped before the manifest was updated: the rows
+    it may have written are cut off so the next append does not duplicate them.
+    """
+    pending = manifest.pop('pending_append', None)
+    if pending is not None and os.path.exists(dataset_file) and os.path.getsize(dataset_file) > pending['file_size']:
+        print(f"Discarding the rows of an interrupted append to '{dataset_file}'.")
+        with open(dataset_file, 'r+b') as f:
+            f.truncate(pending['file_size'])
+
+
+# --- 4. Append ---
+def load_new_rocket(row, simulation_id, input_columns):
+    df_traj = pd.read_csv(resolve_trajectory_path(row[PATH_COLUMN], DATASET_DIR))
+    # Inputs without the launch wind take it from the first trajectory point, or from the
+    # shared wind profile of the rocket when the trajectory has no wind columns
+    profile = row.pop(PROFILE_COLUMN, None)
+    if any(col not in input_columns for col in WIND_COLUMNS):
+        if all(col in df_traj for col in WIND_COLUMNS):
+            launch_wind = df_traj[WIND_COLUMNS].iloc[0].to_numpy()
+        elif isinstance(profile, str):
+            launch_wind = WIND_PROFILES.lookup(profile, df_traj['z'].iloc[:1])[0]
+        else:
+            launch_wind = None
+        if launch_wind is not None:
+            row.update(zip(WIND_COLUMNS, launch_wind))
+    # The inertia tuple is stored as a string: training needs its numeric components
+    row = expand_inertia(row)
+    row.pop('inertia', None)
+    for col_name, value in row.items():
+        if col_name != PATH_COLUMN:
+            df_traj[col_name] = value
+    df_traj['simulation_id'] = simulation_id
+    return df_traj
+
+
+def append_new_rockets(input_file=INPUT_FILE, dataset_file=DATASET_FILE, manifest_file=MANIFEST_FILE):
+    manifest = load_manifest(manifest_file)
+    if manifest is None:
+        if os.path.exists(dataset_file):
+            print(f"No manifest found, indexing the existing '{dataset_file}' once...")
+            manifest = rebuild_manifest(dataset_file)
+        else:
+            manifest = {'dataset_file': dataset_file, 'columns': None, 'n_rows': 0, 'rockets': {}, 'stats': None}
+    discard_interrupted_append(manifest, dataset_file)
+    if 'inertia' in (manifest['columns'] or []):
+        print(f"Splitting the inertia column of '{dataset_file}' into inertia_ixy / inertia_iz (once)...")
+        manifest = migrate_inertia_column(dataset_file)
+        save_manifest(manifest, manifest_file)
+
+    df_inputs = pd.read_csv(input_file)
+    df_new = df_inputs[~df_inputs['rocket_id'].isin(manifest['rockets'])]
+    if df_new.empty:
+        print("No new rockets to append.")
+        return manifest
+    print(f"Appending {len(df_new)} new rockets (dataset has {len(manifest['rockets'])}).")
+
+    next_id = max((r['simulation_id'] for r in manifest['rockets'].values()), default=-1) + 1
+    simulations = []
+    for i, (_, row) in enumerate(df_new.iterrows()):
+        path = resolve_trajectory_path(row[PATH_COLUMN], DATASET_DIR)
+        if not os.path.exists(path):
+            print(f"Warning: File not found at {path}")
+            continue
+        simulations.append(load_new_rocket(row.to_dict(), next_id + i, df_inputs.columns))
+    if not simulations:
+        return manifest
+    df_append = pd.concat(simulations, ignore_index=True)
+
+    # Keep the column order of the existing file
+    if manifest['columns'] is None:
+        manifest['columns'] = list(df_append.columns)
+    missing = set(manifest['columns']) - set(df_append.columns)
+    if missing:
+        raise ValueError(f"New rockets are missing dataset columns: {sorted(missing)}")
+    df_append = df_append[manifest['columns']]
+    # Rows and manifest change together: the manifest first records where the rows start
+    manifest['pending_append'] = {'file_size': os.path.getsize(dataset_file) if os.path.exists(dataset_file) else 0}
+    save_manifest(manifest, manifest_file)
+    df_append.to_csv(dataset_file, mode='a', header=manifest['n_rows'] == 0, index=False)
+
+    del manifest['pending_append']
+    register_rows(manifest, df_append)
+    save_manifest(manifest, manifest_file)
+    print(f"Dataset now has {len(manifest['rockets'])} rockets / {manifest['n_rows']} rows.")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append new rockets to the training dataset.")
+    parser.add_argument("--inputs", default=INPUT_FILE, help="master inputs CSV listing the rockets")
+    parser.add_argument("--dataset", default=DATASET_FILE)
+    parser.add_argument("--manifest", default=MANIFEST_FILE)
+    parser.add_argument("--rebuild-manifest", action="store_true", help="re-index the whole dataset file")
+    args = parser.parse_args()
+
+    if args.rebuild_manifest:
+        save_manifest(rebuild_manifest(args.dataset), args.manifest)
+        print(f"Manifest rebuilt: '{args.manifest}'")
+    else:
+        append_new_rockets(args.inputs, args.dataset, args.manifest)
@@ -2,6 +2,8 @@ import pandas as pd
 import os
 from tqdm import tqdm  # Optional: for a progress bar
 
+from dataset_append import expand_inertia_column
+
 # 1. Setup paths
 BASE_DIR = 'C:/Users/arthu/PycharmProjects/ClosedRocket/dataset'  # Root folder of your data
 BASE_DIR_TRAJECTORY = 'C:/Users/arthu/PycharmProjects/ClosedRocket'
@@ -47,6 +49,8 @@ for index, row in tqdm(df_inputs.iterrows(), total=df_inputs.shape[0]):
 
 # 5. Concatenate into one massive dataset
 final_dataset = pd.concat(all_simulations, ignore_index=True)
+# Numeric inertia components instead of the "(Ixy, Ixy, Iz)" string, as dataset_append.py writes them
+final_dataset = expand_inertia_column(final_dataset)
 
 print(f"Final dataset shape: {final_dataset.shape}")
 print(final_dataset.head())
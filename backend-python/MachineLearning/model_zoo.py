@@ -0,0 +1,117 @@
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.layers import (GRU, LSTM, BatchNormalization, Conv1D, Dense, Dropout, Flatten,
+                                     GlobalAveragePooling1D, Input)
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.regularizers import l2
+
+# Registry of the sequence architectures trained by ML1.py and compared by compare_models.py.
+# Every builder takes the window shape (n_steps, n_features) and the number of outputs and
+# returns an uncompiled Sequential model; layer sizes, dropout and L2 are keyword arguments
+# (tuned by tune.py). All of them run on CPU: recurrent layers keep their default
+# tanh/sigmoid activations so TensorFlow can use its fused kernels.
+
+
+def build_lstm(input_shape, n_outputs, units=(64, 32, 16), dense_units=8, dropout=0.4, l2_weight=0.01):
+    """Stacked 64/32/16 LSTM (the original ML1.py model)."""
+    layers = [Input(shape=(None, input_shape[1]))]
+    for i, n_units in enumerate(units):
+        layers += [
+            LSTM(units=n_units, return_sequences=i < len(units) - 1, kernel_regularizer=l2(l2_weight)),
+            BatchNormalization(),
+            Dropout(dropout),
+        ]
+    layers += [
+        Dense(units=dense_units, activation='relu', kernel_regularizer=l2(l2_weight)),
+        Dense(units=n_outputs)
+    ]
+    return Sequential(layers)
+
+
+def build_lstm_relu(input_shape, n_outputs, units=(512, 256, 128, 64, 32, 16), dense_units=8, dropout=0.2,
+                    l2_weight=0.0):
+    """Six-layer 512..16 relu LSTM of DatasetGenerator/ML1.py, kept as a cost reference (no fused kernel)."""
+    layers = [Input(shape=(None, input_shape[1]))]
+    for i, n_units in enumerate(units):
+        last = i == len(units) - 1
+        layers.append(LSTM(units=n_units, activation='relu', return_sequences=not last,
+                           kernel_regularizer=l2(l2_weight)))
+        if not last:
+            layers.append(Dropout(dropout))
+    layers += [
+        Dense(units=dense_units, activation='relu'),
+        Dense(units=n_outputs)
+    ]
+    return Sequential(layers)
+
+
+def build_gru(input_shape, n_outputs, units=(64, 32), dense_units=16, dropout=0.2, l2_weight=0.0):
+    """Stacked GRU layers: about 3/4 of the LSTM cost per unit."""
+    layers = [Input(shape=(None, input_shape[1]))]
+    for i, n_units in enumerate(units):
+        last = i == len(units) - 1
+        layers.append(GRU(units=n_units, return_sequences=not last, kernel_regularizer=l2(l2_weight)))
+        if not last:
+            layers.append(Dropout(dropout))
+    layers += [
+        Dense(units=dense_units, activation='relu'),
+        Dense(units=n_outputs)
+    ]
+    return Sequential(layers)
+
+
+def build_conv1d(input_shape, n_outputs, units=(32, 32, 32, 32), dense_units=32, dropout=0.0, l2_weight=0.0):
+    """
+    Causal 1-D convolutions with dilations 1, 2, 4, 8... (31 steps of receptive field with
+    the default four layers), no recurrence to unroll.
+    """
+    layers = [Input(shape=(None, input_shape[1]))]
+    for i, filters in enumerate(units):
+        layers.append(Conv1D(filters=filters, kernel_size=3, padding='causal', dilation_rate=2 ** i,
+                             activation='relu', kernel_regularizer=l2(l2_weight)))
+    layers += [
+        GlobalAveragePooling1D(),
+        Dropout(dropout),
+        Dense(units=dense_units, activation='relu'),
+        Dense(units=n_outputs)
+    ]
+    return Sequential(layers)
+
+
+def build_mlp(input_shape, n_outputs, units=(128, 64), dense_units=None, dropout=0.1, l2_weight=0.0):
+    """Small MLP over the flattened window: needs exactly n_steps time steps."""
+    layers = [Input(shape=tuple(input_shape)), Flatten()]
+    for i, n_units in enumerate(units):
+        layers.append(Dense(units=n_units, activation='relu', kernel_regularizer=l2(l2_weight)))
+        if i == 0:
+            layers.append(Dropout(dropout))
+    layers.append(Dense(units=n_outputs))
+    return Sequential(layers)
+
+
+MODEL_REGISTRY = {
+    'lstm': build_lstm,
+    'lstm_relu': build_lstm_relu,
+    'gru': build_gru,
+    'conv1d': build_conv1d,
+    'mlp': build_mlp,
+}
+
+# Architectures whose input window length is fixed (no dynamic time axis in ONNX)
+FIXED_WINDOW_MODELS = {'mlp'}
+
+
+def build_model(name, input_shape, n_outputs, learning_rate=0.001, **hyperparameters):
+    """
+    Builds and compiles a registered architecture. hyperparameters (units, dense_units,
+    dropout, l2_weight) override the defaults of its builder.
+    """
+    if name not in MODEL_REGISTRY:
+        raise ValueError(f"Unknown model '{name}', choose one of: {', '.join(MODEL_REGISTRY)}")
+    model = MODEL_REGISTRY[name](input_shape, n_outputs, **hyperparameters)
+    model.compile(optimizer=Adam(learning_rate=learning_rate), loss='mse', metrics=['mae'])
+    return model
+
+
+def model_metadata(name):
+    """Extra preprocessing metadata describing the architecture."""
+    return {'architecture': name, 'dynamic_sequence': name not in FIXED_WINDOW_MODELS}
@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from dataset_append import DERIVED_COLUMNS, MANIFEST_FILE, add_derived_features, load_manifest, scaler_statistics
+from preprocessing import CATEGORICAL_COLUMNS
+
+# Data preparation shared by every sequence model (ML1.py, compare_models.py): physics
+# features, one-hot encoding, scaling, chronological split and sliding windows. All the
+# architectures of model_zoo.py are trained and evaluated on exactly the same arrays.
+
+TARGET_COLUMNS = ['x', 'y', 'z']
+EXCLUDED_COLUMNS = ['delay', 'rocket_id', 'simulation_id']
+
+
+# --- 1. Sequence Creation and Scaling ---
+def create_sequences(X, Y, n_steps, dtype=np.float32):
+    """Windows of n_steps rows of X, each paired with the row of Y that follows it."""
+    X_data = X.values if isinstance(X, (pd.DataFrame, pd.Series)) else X
+    Y_data = Y.values if isinstance(Y, (pd.DataFrame, pd.Series)) else Y
+    if len(X_data) <= n_steps:
+        return np.empty((0, n_steps, X_data.shape[1]), dtype=dtype), np.empty((0, Y_data.shape[1]), dtype=dtype)
+    # (n_windows, n_features, n_steps) view, copied once in the (n_windows, n_steps, n_features) layout
+    windows = sliding_window_view(np.asarray(X_data, dtype=dtype), n_steps, axis=0)[:-1]
+    X_seq = np.ascontiguousarray(windows.transpose(0, 2, 1))
+    Y_seq = np.asarray(Y_data[n_steps:], dtype=dtype)
+    return X_seq, Y_seq
+
+
+def scaler_from_manifest(manifest, columns):
+    # StandardScaler built from the running statistics kept by dataset_append.py (no refit pass)
+    mean, var = scaler_statistics(manifest, columns)
+    scaler = StandardScaler()
+    scaler.mean_, scaler.var_ = mean, var
+    scaler.scale_ = np.where(var > 0, np.sqrt(var), 1.0)
+    scaler.n_features_in_ = len(columns)
+    scaler.n_samples_seen_ = manifest['stats']['count']
+    return scaler
+
+
+# --- 2. Feature Engineering ---
+def add_physics_features(df):
+    """Velocity and acceleration columns (per simulation when the dataset has simulation ids)."""
+    if 'simulation_id' in df:
+        # Velocity / acceleration per simulation, so they never straddle two rockets
+        return add_derived_features(df)
+    # Calculate Velocity (First Derivative)
+    df['vx'] = df['x'].diff().fillna(0)
+    df['vy'] = df['y'].diff().fillna(0)
+    df['vz'] = df['z'].diff().fillna(0)
+
+    # Calculate Acceleration (Second Derivative) - Optional, helps if data is clean
+    df['ax'] = df['vx'].diff().fillna(0)
+    df['ay'] = df['vy'].diff().fillna(0)
+    df['az'] = df['vz'].diff().fillna(0)
+    return df
+
+
+# --- 3. Preparation ---
+class SequenceData:
+    """Scaled train/test windows of the dataset, with everything needed to save the preprocessing."""
+
+    def __init__(self, X_train, Y_train, X_test, Y_test, feature_columns, x_scaler, y_scaler, n_steps, dt,
+                 launch_altitude):
+        self.X_train, self.Y_train = X_train, Y_train
+        self.X_test, self.Y_test = X_test, Y_test
+        self.feature_columns = feature_columns
+        self.x_scaler, self.y_scaler = x_scaler, y_scaler
+        self.n_steps = n_steps
+        self.dt = dt
+        self.launch_altitude = launch_altitude
+
+    @property
+    def input_shape(self):
+        return self.X_train.shape[1:]
+
+    @property
+    def n_outputs(self):
+        return self.Y_train.shape[1]
+
+    def metadata(self, **extra):
+        # The preprocessing metadata lets convert_onnx.py and the predictor rebuild the
+        # input signature and the scaling without re-reading the dataset.
+        return {
+            'model_type': 'sequence',
+            'feature_columns': self.feature_columns,
+            'target_columns': TARGET_COLUMNS,
+            'x_mean': self.x_scaler.mean_,
+            'x_scale': self.x_scaler.scale_,
+            'y_mean': self.y_scaler.mean_,
+            'y_scale': self.y_scaler.scale_,
+            'n_steps': self.n_steps,
+            'n_features': len(self.feature_columns),
+            'dt': self.dt,
+            'launch_altitude': self.launch_altitude,
+            **extra,
+        }
+
+
+def scale_features(df, test_size, manifest_file=MANIFEST_FILE):
+    """
+    Physics features, one-hot encoding, scaling and chronological split, before windowing.
+    Returns a dict of flat float32 arrays (X_train, Y_train, X_test, Y_test) and the
+    preprocessing (feature_columns, x_scaler, y_scaler, dt, launch_altitude).
+    """
+    df = add_physics_features(df)
+
+    # We keep the physics columns in X, but Y is still just x,y,z
+    X_df = df.drop(columns=TARGET_COLUMNS + EXCLUDED_COLUMNS, errors='ignore')
+    # Ensure the physics features are INCLUDED in X_df
+    X_df = pd.concat([X_df, df[DERIVED_COLUMNS]], axis=1)
+    Y_df = df[TARGET_COLUMNS]
+
+    # One-Hot Encoding
+    present_categorical_cols = [col for col in CATEGORICAL_COLUMNS if col in X_df.columns]
+    if present_categorical_cols:
+        X_df = pd.get_dummies(X_df, columns=present_categorical_cols, drop_first=False)
+
+    # Scaled as plain arrays: X_df repeats the physics columns, which scikit-learn rejects as feature names
+    X_values = X_df.to_numpy(dtype=np.float64)
+    Y_values = Y_df.to_numpy(dtype=np.float64)
+
+    # StandardScaler is better for data that follows a normal distribution (like physics errors)
+    manifest = load_manifest(manifest_file)
+    if manifest is not None and manifest['n_rows'] == len(df) and set(X_df.columns) <= set(manifest['stats']['mean']):
+        print(f"Using the scaler statistics of '{manifest_file}'")
+        x_scaler = scaler_from_manifest(manifest, list(X_df.columns))
+        y_scaler = scaler_from_manifest(manifest, TARGET_COLUMNS)
+        X_scaled = x_scaler.transform(X_values)
+        Y_scaled = y_scaler.transform(Y_values)
+    else:
+        x_scaler = StandardScaler()
+        y_scaler = StandardScaler()
+        X_scaled = x_scaler.fit_transform(X_values)
+        Y_scaled = y_scaler.fit_transform(Y_values)
+    X_scaled = X_scaled.astype(np.float32)
+    Y_scaled = Y_scaled.astype(np.float32)
+
+    # Chronological split; the windows are then built inside each part
+    train_index, test_index = train_test_split(np.arange(len(df)), test_size=test_size, shuffle=False)
+
+    time_steps = df['time'].diff()
+    if 'simulation_id' in df:
+        launch_altitude = float(df.groupby('simulation_id')['z'].first().median())
+    else:
+        launch_altitude = float(df['z'].iloc[0])
+    return {
+        'X_train': X_scaled[train_index], 'Y_train': Y_scaled[train_index],
+        'X_test': X_scaled[test_index], 'Y_test': Y_scaled[test_index],
+        'feature_columns': list(X_df.columns),
+        'x_scaler': x_scaler, 'y_scaler': y_scaler,
+        'dt': float(time_steps[time_steps > 0].median()),
+        'launch_altitude': launch_altitude,
+    }
+
+
+def prepare_sequences(df, n_steps, test_size, manifest_file=MANIFEST_FILE):
+    flat = scale_features(df, test_size, manifest_file)
+    X_train, Y_train = create_sequences(flat['X_train'], flat['Y_train'], n_steps)
+    X_test, Y_test = create_sequences(flat['X_test'], flat['Y_test'], n_steps)
+    return SequenceData(X_train, Y_train, X_test, Y_test, flat['feature_columns'], flat['x_scaler'],
+                        flat['y_scaler'], n_steps, dt=flat['dt'], launch_altitude=flat['launch_altitude'])
@@ -0,0 +1,174 @@
+"""
+Lightweight inference runtime for the exported trajectory models.
+
+Depends only on NumPy and ONNX Runtime (no TensorFlow, sklearn or matplotlib),
+so a serving worker starts in well under a second. A model is the pair
+models/<name>.onnx + models/<name>_preprocessing.json written by ML1.py or
+ML_direct.py and convert_onnx.py.
+
+    predictor = TrajectoryPredictor.from_name("direct_model")
+    trajectory = predictor.predict({"heading": 220, "motor_name": "Pro75M1670", ...})
+
+Trajectories are arrays of rows (time, x, y, z).
+"""
+import os
+
+import numpy as np
+import onnxruntime as ort
+
+from preprocessing import ParamEncoder, load_preprocessing, preprocessing_path
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+OUTPUT_COLUMNS = ['time', 'x', 'y', 'z']
+
+# Features of the sequence model that change along the rollout (see ML1.py)
+DYNAMIC_COLUMNS = ['time', 'vx', 'vy', 'vz', 'ax', 'ay', 'az']
+MAX_ROLLOUT_STEPS = 2000
+
+
+class TrajectoryPredictor:
+    def __init__(self, model_path, metadata_path=None, intra_op_threads=0):
+        self.metadata = load_preprocessing(metadata_path or preprocessing_path(model_path))
+        self.model_type = self.metadata['model_type']
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+        self.x_mean = np.asarray(self.metadata['x_mean'], dtype=np.float32)
+        self.x_scale = np.asarray(self.metadata['x_scale'], dtype=np.float32)
+        self.y_mean = np.asarray(self.metadata['y_mean'], dtype=np.float32)
+        self.y_scale = np.asarray(self.metadata['y_scale'], dtype=np.float32)
+        self.encoder = ParamEncoder(self.metadata['feature_columns'], fill_values=self.x_mean)
+
+        if self.model_type == 'direct':
+            self.n_points = self.metadata['n_points']
+            self.n_components = self.metadata['n_components']
+            self.pca_mean = np.asarray(self.metadata['pca_mean'], dtype=np.float32)
+            self.pca_components = np.asarray(self.metadata['pca_components'], dtype=np.float32)
+        else:
+            columns = self.metadata['feature_columns']
+            self.n_steps = self.metadata['n_steps']
+            self.dt = self.metadata['dt']
+            self.launch_altitude = self.metadata['launch_altitude']
+            # ML1.py may carry a feature twice (e.g. vx); every copy follows the rollout
+            self.dynamic_index = {col: [j for j, c in enumerate(columns) if c == col]
+                                  for col in DYNAMIC_COLUMNS if col in columns}
+
+    @classmethod
+    def from_name(cls, name, variant=None, models_dir=MODELS_DIR, **kwargs):
+        """Loads models/<name>.onnx (or the quantized models/<name>_<variant>.onnx)."""
+        filename = f"{name}_{variant}.onnx" if variant else f"{name}.onnx"
+        return cls(os.path.join(models_dir, filename),
+                   os.path.join(models_dir, name + "_preprocessing.json"), **kwargs)
+
+    def encode(self, params_list):
+        """Launch parameter dictionaries -> raw (unscaled) feature rows."""
+        return self.encoder(params_list)
+
+    def _run(self, x):
+        return self.session.run(None, {self.input_name: x})[0]
+
+    # --- Direct model ---
+    def _predict_direct(self, features):
+        x = ((features - self.x_mean) / self.x_scale).astype(np.float32)
+        y = self._run(x) * self.y_scale + self.y_mean
+        coefficients, scalars = y[:, :self.n_components], y[:, self.n_components:]
+        positions = (coefficients @ self.pca_components + self.pca_mean).reshape(len(x), self.n_points, 3)
+        flight_time, z0 = scalars[:, 0], scalars[:, 1]
+        trajectory = np.empty((len(x), self.n_points, 4), dtype=np.float32)
+        trajectory[:, :, 0] = np.linspace(0.0, 1.0, self.n_points, dtype=np.float32) * flight_time[:, None]
+        trajectory[:, :, 1:] = positions
+        trajectory[:, :, 3] += z0[:, None]
+        return trajectory
+
+    # --- Sequence (autoregressive) model ---
+    def iter_rollout(self, features, max_steps=MAX_ROLLOUT_STEPS):
+        """
+        Rolls the sequence model out for a batch of raw feature rows, starting
+        from the rocket at rest on the pad. Yields (time, positions, active) per
+        step, positions being (batch, 3) and active marking rockets not landed yet.
+        """
+        batch = len(features)
+        features = features.copy()
+        features[:, [j for indices in self.dynamic_index.values() for j in indices]] = 0.0
+        window = np.repeat(((features - self.x_mean) / self.x_scale)[:, None, :], self.n_steps, axis=1)
+        window = window.astype(np.float32)
+        position = np.zeros((batch, 3), dtype=np.float32)
+        position[:, 2] = self.launch_altitude
+        velocity = np.zeros_like(position)
+        active = np.ones(batch, dtype=bool)
+        climbed = np.zeros(batch, dtype=bool)
+
+        for step in range(1, max_steps + 1):
+            y = self._run(window) * self.y_scale + self.y_mean
+            new_velocity = y - position
+            acceleration = new_velocity - velocity
+            position, velocity = y.astype(np.float32), new_velocity
+            t = step * self.dt
+            yield t, position, active.copy()
+
+            climbed |= position[:, 2] > self.launch_altitude + 1.0
+            active &= ~(climbed & (position[:, 2] <= self.launch_altitude))
+            if not active.any():
+                return
+
+            # Slide the window and append the new (scaled) step
+            window[:, :-1] = window[:, 1:]
+            row = window[:, -1]
+            for col, values in (('time', np.full(batch, t)),
+                                ('vx', velocity[:, 0]), ('vy', velocity[:, 1]), ('vz', velocity[:, 2]),
+                                ('ax', acceleration[:, 0]), ('ay', acceleration[:, 1]), ('az', acceleration[:, 2])):
+                for j in self.dynamic_index.get(col, ()):
+                    row[:, j] = (values - self.x_mean[j]) / self.x_scale[j]
+
+    def _predict_sequence(self, features, max_steps):
+        # Rockets that landed early are padded with NaN up to the longest flight
+        steps = []
+        for t, position, active in self.iter_rollout(features, max_steps):
+            rows = np.full((len(features), 4), np.nan, dtype=np.float32)
+            rows[active, 0] = t
+            rows[active, 1:] = position[active]
+            steps.append(rows)
+        return np.stack(steps, axis=1)
+
+    # --- Public API ---
+    def predict_batch(self, batch, max_steps=MAX_ROLLOUT_STEPS):
+        """
+        Predicts trajectories for a batch given as a list of parameter dictionaries
+        or as an array of encoded feature rows. Returns (batch, n_points, 4).
+        """
+        features = self.encode(batch) if not isinstance(batch, np.ndarray) else batch.astype(np.float32)
+        if self.model_type == 'direct':
+            return self._predict_direct(features)
+        return self._predict_sequence(features, max_steps)
+
+    def predict(self, params, max_steps=MAX_ROLLOUT_STEPS):
+        """Predicts the trajectory (n_points, 4) of a single rocket."""
+        trajectory = self.predict_batch([params], max_steps)[0]
+        return trajectory[~np.isnan(trajectory[:, 0])]
+
+    def iter_predict(self, params, chunk_size=64, max_steps=MAX_ROLLOUT_STEPS):
+        """
+        Yields the trajectory of a single rocket in chunks of rows, as soon as they
+        are available: per rollout step for the sequence model, in one pass for the
+        direct model.
+        """
+        features = self.encode([params])
+        if self.model_type == 'direct':
+            trajectory = self._predict_direct(features)[0]
+            for start in range(0, len(trajectory), chunk_size):
+                yield trajectory[start:start + chunk_size]
+            return
+        pending = []
+        for t, position, active in self.iter_rollout(features, max_steps):
+            if not active[0]:
+                break
+            pending.append((t, *position[0]))
+            if len(pending) >= chunk_size:
+                yield np.asarray(pending, dtype=np.float32)
+                pending = []
+        if pending:
+            yield np.asarray(pending, dtype=np.float32)
@@ -0,0 +1,189 @@
+"""
+Feature encoding and preprocessing metadata shared by the trajectory models.
+
+This module only depends on NumPy and the standard library so that the
+serving code can import it without pulling in pandas, sklearn or TensorFlow.
+"""
+import ast
+import json
+import os
+
+import numpy as np
+
+TARGET_COLUMNS = ['x', 'y', 'z']
+CATEGORICAL_COLUMNS = ['motor_name', 'fin_cat', 'trigger']
+
+# Launch parameters describing one rocket, in the master_rocket_inputs schema
+# (inertia is split into its two distinct components).
+STATIC_NUMERIC_COLUMNS = [
+    'heading', 'ramp_inclinaison', 'radius', 'mass', 'inertia_ixy', 'inertia_iz',
+    'center_of_mass_without_motor', 'cone_length', 'rocket_length', 'number_of_ailerons',
+    'root_chord', 'tip_chord', 'span', 'fins_pos', 'fin_inclinaison', 'drag_coeff',
+    'wind_velocity_x', 'wind_velocity_y',
+]
+# Bookkeeping columns of the input tables, accepted but never encoded
+ID_COLUMNS = ['delay', 'rocket_id', 'trajectory_file', 'simulation_id', 'wind_profile_id']
+
+
+def expand_inertia(params):
+    """
+    Returns a copy of params with the (Ixy, Ixy, Iz) inertia tuple split into
+    'inertia_ixy' and 'inertia_iz'. The tuple may be given as its CSV string.
+    """
+    inertia = params.get('inertia')
+    if inertia is None or 'inertia_ixy' in params:
+        return params
+    if isinstance(inertia, str):
+        inertia = ast.literal_eval(inertia)
+    params = dict(params)
+    params['inertia_ixy'] = float(inertia[0])
+    params['inertia_iz'] = float(inertia[2])
+    return params
+
+
+def _is_present(value):
+    return value is not None and value == value  # NaN != NaN
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _to_numeric(values):
+    """float32 array with NaN for missing cells, and the mask of non-numeric ones."""
+    values = np.asarray(values)
+    try:
+        return values.astype(np.float32), np.zeros(len(values), dtype=bool)
+    except (TypeError, ValueError):
+        numeric = np.array([_to_float(v) for v in values], dtype=np.float32)
+        present = np.array([_is_present(v) and v != '' for v in values], dtype=bool)
+        return numeric, np.isnan(numeric) & present
+
+
+class ParamEncoder:
+    """
+    Encodes parameter dictionaries into the feature layout used at training.
+
+    One-hot columns follow the pd.get_dummies naming ('motor_name_Pro75M1670').
+    Values missing from a row are taken from fill_values (usually the training
+    mean, so they scale to 0) or 0 when no fill values are given. Serving
+    encodes with strict=True so that typos and malformed values are rejected
+    instead of silently becoming the training mean.
+    """
+
+    def __init__(self, feature_columns, fill_values=None):
+        self.feature_columns = list(feature_columns)
+        self.fill_values = (np.zeros(len(self.feature_columns), dtype=np.float32) if fill_values is None
+                            else np.asarray(fill_values, dtype=np.float32))
+        self.plan = []
+        for col in self.feature_columns:
+            category = next((cat for cat in CATEGORICAL_COLUMNS if col.startswith(cat + '_')), None)
+            if category is not None:
+                self.plan.append((category, col[len(category) + 1:]))
+            else:
+                self.plan.append((col, None))
+
+    def __call__(self, rows, strict=False):
+        """Row-wise entry point: a list of parameter dictionaries, encoded as encode_table."""
+        keys = dict.fromkeys(key for row in rows for key in row)
+        if not keys:
+            return np.tile(self.fill_values, (len(rows), 1))
+        return self.encode_table({key: [row.get(key) for row in rows] for key in keys}, strict)
+
+    def encode_table(self, table, strict=False):
+        """
+        Column-wise encoding for large batches: table maps column names to
+        equal-length sequences (a DataFrame, or a dict of lists / arrays).
+        Missing cells (None, NaN, blank) keep their fill value. Non-numeric values
+        and unknown categories are filled too, unless strict, where they and
+        unknown column names raise a ValueError naming the columns.
+        """
+        n_rows = len(next(iter(table.values()))) if isinstance(table, dict) else len(table)
+        columns = {key: table[key] for key in table.keys()}
+        invalid = []
+        if strict:
+            known = set(CATEGORICAL_COLUMNS + STATIC_NUMERIC_COLUMNS + ID_COLUMNS + ['inertia'])
+            known.update(key for key, _ in self.plan)
+            invalid += [f"{key} (unknown column)" for key in columns if key not in known]
+        if 'inertia' in columns:
+            inertia = np.full((n_rows, 3), np.nan)
+            unparseable = False
+            for i, value in enumerate(columns['inertia']):
+                if not _is_present(value) or value == '':
+                    continue  # no inertia in this row: fill values
+                try:
+                    inertia[i] = ast.literal_eval(value) if isinstance(value, str) else value
+                except (TypeError, ValueError, SyntaxError):
+                    unparseable = True
+            if unparseable:
+                invalid.append("inertia (expected an (Ixy, Ixy, Iz) tuple)")
+            # Explicit inertia_ixy / inertia_iz cells take precedence over the tuple
+            for name, k in (('inertia_ixy', 0), ('inertia_iz', 2)):
+                explicit = np.full(n_rows, np.nan)
+                if name in columns:
+                    explicit, unparseable = _to_numeric(columns[name])
+                    if unparseable.any():
+                        invalid.append(name)
+                columns[name] = np.where(np.isnan(explicit), inertia[:, k], explicit)
+        categories = {}
+        for key, category_value in self.plan:
+            if category_value is not None:
+                categories.setdefault(key, set()).add(category_value)
+        encoded = np.tile(self.fill_values, (n_rows, 1))
+        for j, (key, category_value) in enumerate(self.plan):
+            if key not in columns:
+                continue
+            values = np.asarray(columns[key])
+            if category_value is not None:
+                present = (np.array([_is_present(v) and v != '' for v in values], dtype=bool)
+                           if values.dtype.kind in 'OUS' else np.ones(n_rows, dtype=bool))
+                encoded[present, j] = values[present].astype(str) == category_value
+            else:
+                numeric, unparseable = _to_numeric(values)
+                if unparseable.any():
+                    invalid.append(key)
+                present = ~np.isnan(numeric)
+                encoded[present, j] = numeric[present]
+        if strict:
+            for key, known_values in categories.items():
+                if key not in columns:
+                    continue
+                values = [v for v in columns[key] if _is_present(v) and v != '']
+                unknown = sorted({str(v) for v in values} - known_values)
+                if unknown:
+                    invalid.append(f"{key} (unknown values {unknown})")
+            if invalid:
+                raise ValueError(f"Invalid columns: {', '.join(str(c) for c in invalid)}")
+        return encoded
+
+
+def resolve_trajectory_path(trajectory_file, root):
+    """trajectory_file is stored relative to DatasetGenerator, with Windows separators."""
+    return os.path.join(root, *trajectory_file.replace('\\', '/').split('/'))
+
+
+def preprocessing_path(model_path):
+    """Metadata file stored next to a model: models/x.keras -> models/x_preprocessing.json"""
+    return os.path.splitext(model_path)[0] + '_preprocessing.json'
+
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def save_preprocessing(path, metadata):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(metadata, f, default=_to_json)
+
+
+def load_preprocessing(path):
+    with open(path) as f:
+        return json.load(f)
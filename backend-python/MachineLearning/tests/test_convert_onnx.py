@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+pytest.importorskip('tensorflow')
+pytest.importorskip('tf2onnx')
+
+from convert_onnx import convert_to_onnx
+from model_zoo import build_model, model_metadata
+from preprocessing import preprocessing_path, save_preprocessing
+
+N_STEPS = 30
+FEATURES = ['time', 'vx', 'vy', 'vz', 'mass']
+
+
+def save_gru(tmp_path, with_metadata=True):
+    model = build_model('gru', (N_STEPS, len(FEATURES)), 3, units=(8, 4), dense_units=4)
+    model_path = str(tmp_path / 'trajectory_model.keras')
+    model.save(model_path)
+    if with_metadata:
+        save_preprocessing(preprocessing_path(model_path), {
+            'model_type': 'sequence', 'n_steps': N_STEPS, 'feature_columns': FEATURES,
+            'n_features': len(FEATURES), **model_metadata('gru'),
+        })
+    return model_path
+
+
+def test_converts_a_model_zoo_model_with_a_dynamic_time_axis(tmp_path):
+    model_path = save_gru(tmp_path)
+
+    assert convert_to_onnx(model_path, quantize='int8', batch_size=4)
+    assert os.path.exists(str(tmp_path / 'trajectory_model.onnx'))
+    assert os.path.exists(str(tmp_path / 'trajectory_model_int8.onnx'))
+
+
+def test_converts_a_model_zoo_model_without_metadata(tmp_path):
+    model_path = save_gru(tmp_path, with_metadata=False)
+
+    assert convert_to_onnx(model_path, batch_size=4)
+
+
+def test_checks_longer_windows_of_a_fixed_window_model_against_a_rebuilt_reference(tmp_path, capsys):
+    import tensorflow as tf
+
+    model = tf.keras.Sequential([tf.keras.Input(shape=(N_STEPS, len(FEATURES))), tf.keras.layers.GRU(4),
+                                 tf.keras.layers.Dense(3)])
+    model_path = str(tmp_path / 'trajectory_model.keras')
+    model.save(model_path)
+    save_preprocessing(preprocessing_path(model_path), {
+        'model_type': 'sequence', 'n_steps': N_STEPS, 'feature_columns': FEATURES, 'n_features': len(FEATURES),
+    })
+
+    assert convert_to_onnx(model_path, batch_size=4)
+    output = capsys.readouterr().out
+    assert f'input (4, {2 * N_STEPS}, {len(FEATURES)}): max |diff|' in output
+    assert 'UNVERIFIED' not in output
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataset_append
+from pipeline import scale_features
+
+
+def write_rocket(root, rocket_id, n_rows=40):
+    time = np.linspace(0, 10, n_rows)
+    df = pd.DataFrame({'time': time, 'x': time * 2, 'y': time, 'z': 100 + 50 * time - 4.9 * time ** 2})
+    os.makedirs(os.path.join(root, 'dataset', 'trajectories'), exist_ok=True)
+    df.to_csv(os.path.join(root, 'dataset', 'trajectories', f'{rocket_id}_trajectory.csv'), index=False)
+    return f'dataset\\trajectories\\{rocket_id}_trajectory.csv'
+
+
+def write_inputs(root, n_rockets):
+    rocket_ids = [f'rocket_{i:04d}' for i in range(n_rockets)]
+    inputs = pd.DataFrame({
+        'delay': [0] * n_rockets,
+        'heading': np.linspace(10, 20, n_rockets),
+        'motor_name': ['Pro75M1670'] * n_rockets,
+        'mass': np.linspace(8, 9.5, n_rockets),
+        'inertia': [f'({9.7 + i / 2}, {9.7 + i / 2}, {0.009 + i / 500})' for i in range(n_rockets)],
+        'rocket_id': rocket_ids,
+        'trajectory_file': [write_rocket(root, rocket_id) for rocket_id in rocket_ids],
+        'wind_velocity_x': np.linspace(1, -2, n_rockets),
+        'wind_velocity_y': np.linspace(0.5, 3, n_rockets),
+    })
+    input_file = str(root / 'inputs.csv')
+    inputs.to_csv(input_file, index=False)
+    return input_file, inputs
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_append, 'DATASET_DIR', str(tmp_path))
+    return tmp_path, str(tmp_path / 'dataset_tensorflow.csv'), str(tmp_path / 'dataset_manifest.json')
+
+
+def test_appended_store_goes_through_scale_features(store, capsys):
+    root, dataset_file, manifest_file = store
+    input_file, _ = write_inputs(root, 2)
+
+    manifest = dataset_append.append_new_rockets(input_file, dataset_file, manifest_file)
+
+    df = pd.read_csv(dataset_file)
+    assert 'inertia' not in df.columns
+    assert df.groupby('rocket_id')['inertia_ixy'].first().tolist() == [9.7, 10.2]
+    assert df.groupby('rocket_id')['inertia_iz'].first().tolist() == [0.009, 0.011]
+    assert 'inertia_ixy' in manifest['stats']['mean']
+
+    flat = scale_features(df, 0.2, manifest_file)
+    assert 'Using the scaler statistics' in capsys.readouterr().out
+    assert {'inertia_ixy', 'inertia_iz'} <= set(flat['feature_columns'])
+    assert flat['X_train'].dtype == np.float32
+    ixy = flat['feature_columns'].index('inertia_ixy')
+    assert np.isclose(flat['x_scaler'].mean_[ixy], df['inertia_ixy'].mean())
+
+
+def test_append_to_a_store_with_the_inertia_string(store):
+    root, dataset_file, manifest_file = store
+    input_file, inputs = write_inputs(root, 3)
+    # Store written by the old dataset_modifier.py: trajectory rows with the raw inertia string
+    legacy = []
+    for simulation_id, row in inputs.iloc[:2].iterrows():
+        df_traj = pd.read_csv(root / row['trajectory_file'].replace('\\', '/'))
+        for col in inputs.columns.drop('trajectory_file'):
+            df_traj[col] = row[col]
+        df_traj['simulation_id'] = simulation_id
+        legacy.append(df_traj)
+    pd.concat(legacy, ignore_index=True).to_csv(dataset_file, index=False)
+
+    manifest = dataset_append.append_new_rockets(input_file, dataset_file, manifest_file)
+
+    df = pd.read_csv(dataset_file)
+    assert 'inertia' not in df.columns and 'inertia' not in manifest['columns']
+    assert df.groupby('rocket_id')['inertia_ixy'].first().tolist() == [9.7, 10.2, 10.7]
+    assert sorted(manifest['rockets']) == ['rocket_0000', 'rocket_0001', 'rocket_0002']
+    assert manifest['n_rows'] == len(df) == 120
+
+
+def test_interrupted_append_is_not_duplicated(store, monkeypatch):
+    root, dataset_file, manifest_file = store
+    input_file, _ = write_inputs(root, 2)
+    dataset_append.append_new_rockets(input_file, dataset_file, manifest_file)
+    input_file, _ = write_inputs(root, 4)
+
+    # Crash after the rows are written, before the manifest records them
+    def crash(manifest, df):
+        raise KeyboardInterrupt
+    with monkeypatch.context() as m:
+        m.setattr(dataset_append, 'register_rows', crash)
+        with pytest.raises(KeyboardInterrupt):
+            dataset_append.append_new_rockets(input_file, dataset_file, manifest_file)
+    assert len(pd.read_csv(dataset_file)) == 160
+
+    manifest = dataset_append.append_new_rockets(input_file, dataset_file, manifest_file)
+
+    df = pd.read_csv(dataset_file)
+    assert len(df) == manifest['n_rows'] == 160
+    assert df.groupby('rocket_id').size().tolist() == [40] * 4
+    assert 'pending_append' not in manifest
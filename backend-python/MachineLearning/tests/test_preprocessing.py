@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from preprocessing import ParamEncoder
+
+FEATURES = ['mass', 'inertia_ixy', 'inertia_iz', 'motor_name_Pro75M1670', 'motor_name_Cesaroni']
+FILL = [8.0, 9.0, 0.01, 0.5, 0.5]
+
+
+def test_encode_table_keeps_fill_values_for_missing_cells():
+    encoder = ParamEncoder(FEATURES, FILL)
+    rows = [
+        {'mass': 7.5, 'inertia': '(9.7, 9.7, 0.009)', 'motor_name': 'Pro75M1670'},
+        {'mass': None, 'inertia': None, 'motor_name': None},
+        {'mass': 'heavy'},
+    ]
+    columns = {key: [row.get(key) for row in rows] for key in ('mass', 'inertia', 'motor_name')}
+
+    encoded = encoder.encode_table(columns)
+
+    np.testing.assert_allclose(encoded[0], [7.5, 9.7, 0.009, 1.0, 0.0], rtol=1e-6)
+    np.testing.assert_allclose(encoded[1], FILL, rtol=1e-6)
+    np.testing.assert_allclose(encoded[2], FILL, rtol=1e-6)
+    np.testing.assert_allclose(encoded, encoder(rows), rtol=1e-6)
+
+
+def test_encode_table_treats_blank_csv_cells_as_missing():
+    encoder = ParamEncoder(FEATURES, FILL)
+    df = pd.DataFrame({'mass': [7.5, np.nan], 'inertia': ['(9.7, 9.7, 0.009)', np.nan]})
+
+    np.testing.assert_allclose(encoder.encode_table(df)[1], FILL, rtol=1e-6)
+
+
+def test_rows_and_table_encode_nan_and_text_alike():
+    encoder = ParamEncoder(FEATURES, FILL)
+    rows = [{'mass': float('nan'), 'motor_name': float('nan')}, {'mass': '7.5', 'inertia_ixy': 'x'}]
+    columns = {key: [row.get(key) for row in rows] for key in ('mass', 'motor_name', 'inertia_ixy')}
+
+    np.testing.assert_allclose(encoder(rows), encoder.encode_table(columns), rtol=1e-6)
+    np.testing.assert_allclose(encoder(rows)[0], FILL, rtol=1e-6)
+
+
+def test_strict_encoding_rejects_unknown_and_unparseable_columns():
+    encoder = ParamEncoder(FEATURES, FILL)
+    rows = [{'mass': 'heavy', 'mas': 7.5, 'motor_name': 'Unknown', 'rocket_id': 'r1', 'inertia': '(9.7,'}]
+
+    with pytest.raises(ValueError) as error:
+        encoder(rows, strict=True)
+    for column in ('mass', 'mas (unknown column)', "motor_name (unknown values ['Unknown'])", 'inertia'):
+        assert column in str(error.value)
+    # Missing cells are still filled in strict mode
+    np.testing.assert_allclose(encoder([{'mass': '', 'rocket_id': 'r2'}], strict=True)[0], FILL, rtol=1e-6)
@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import matplotlib
+matplotlib.use('Agg')  # headless: figures go to files, training never blocks on a window
+import matplotlib.pyplot as plt
+from mpl_toolkits.mplot3d import Axes3D  # noqa: F401 (registers the 3d projection)
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from tensorflow.keras.callbacks import (BackupAndRestore, Callback, CSVLogger, EarlyStopping, ModelCheckpoint,
+                                        ReduceLROnPlateau)
+from tensorflow.keras.models import load_model
+from tensorflow.keras.utils import Sequence
+
+# Training driver used by ML1.py. A run lives in its own directory, named after the
+# architecture and a hash of its hyperparameters (run_dir_for), so that a backup is only
+# ever restored into the model it was saved from:
+#
+#   runs/<name>-<hash>/best.keras         best model so far (lowest val_loss)
+#   runs/<name>-<hash>/backup/            state of the interrupted run (weights, optimizer, epoch)
+#   runs/<name>-<hash>/lr_schedule.json   ReduceLROnPlateau state (learning rate, best, counters)
+#   runs/<name>-<hash>/history.csv        one line per epoch, across resumed sessions
+#   runs/<name>-<hash>/history.png, trajectory_3d.png, trajectory_components.png, metrics.json
+#
+# Re-running after an interruption resumes from the backup; delete the run directory
+# (or pass resume=False) to start from scratch.
+
+RUNS_DIR = 'runs'
+
+
+# --- 1. Training ---
+def run_dir_for(name, hyperparameters, runs_dir=RUNS_DIR):
+    """runs/<name>-<hash of the hyperparameters>: one run directory per model configuration."""
+    payload = json.dumps(hyperparameters, sort_keys=True, default=str)
+    return os.path.join(runs_dir, f"{name}-{hashlib.sha256(payload.encode()).hexdigest()[:8]}")
+
+
+def fit_with_checkpoints(model, X, Y, run_dir, epochs, batch_size, patience=10, resume=True, validation_split=0.1,
+                         lr_patience=5, verbose=1):
+    """
+    Fits with best-model checkpointing, early stopping on val_loss and resumable state.
+    Returns (best model, history DataFrame of every epoch of the run).
+    """
+    os.makedirs(run_dir, exist_ok=True)
+    best_path = os.path.join(run_dir, 'best.keras')
+    backup_dir = os.path.join(run_dir, 'backup')
+    history_path = os.path.join(run_dir, 'history.csv')
+    lr_state_path = os.path.join(run_dir, 'lr_schedule.json')
+
+    resuming = resume and os.path.isdir(backup_dir) and bool(os.listdir(backup_dir))
+    if resuming:
+        print(f"Resuming the interrupted run in '{run_dir}'")
+    else:
+        # A new run must not inherit the backup, log or best model of an older one
+        for path in (history_path, best_path, lr_state_path):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(backup_dir, ignore_errors=True)
+
+    # Keras callbacks start from scratch in every session: carry the best val_loss and the
+    # epochs without improvement of the sessions already logged
+    best_val_loss, wait = logged_progress(history_path) if resuming else (None, 0)
+    callbacks = [
+        BackupAndRestore(backup_dir=backup_dir),
+        ModelCheckpoint(best_path, monitor='val_loss', save_best_only=True, initial_value_threshold=best_val_loss),
+        ResumedEarlyStopping(best_val_loss, wait, monitor='val_loss', patience=patience),
+        ResumedReduceLROnPlateau(lr_state_path, monitor='val_loss', factor=0.5, patience=lr_patience, min_lr=1e-6),
+        CSVLogger(history_path, append=resuming),
+    ]
+    model.fit(X, Y, epochs=epochs, batch_size=batch_size, validation_split=validation_split, verbose=verbose,
+              callbacks=callbacks)
+
+    history = pd.read_csv(history_path)
+    best_epoch = int(history.loc[history['val_loss'].idxmin(), 'epoch']) + 1
+    print(f"Training stopped after {len(history)} epochs, best val_loss {history['val_loss'].min():.4f} "
+          f"at epoch {best_epoch}")
+    # The best epoch may belong to a previous session, so reload it rather than trusting EarlyStopping
+    return load_model(best_path), history
+
+
+def logged_progress(history_path):
+    """(best val_loss, epochs logged since it) of the previous sessions of a run, (None, 0) if none."""
+    if not os.path.exists(history_path):
+        return None, 0
+    val_loss = pd.read_csv(history_path).get('val_loss', pd.Series(dtype=float)).dropna().reset_index(drop=True)
+    if val_loss.empty:
+        return None, 0
+    best = int(val_loss.idxmin())
+    return float(val_loss[best]), len(val_loss) - 1 - best
+
+
+class ResumedEarlyStopping(EarlyStopping):
+    """EarlyStopping that continues from the best value and patience counter of a previous session."""
+
+    def __init__(self, initial_best=None, initial_wait=0, **kwargs):
+        super().__init__(**kwargs)
+        self.initial_best = initial_best
+        self.initial_wait = initial_wait
+
+    def on_train_begin(self, logs=None):
+        super().on_train_begin(logs)
+        if self.initial_best is not None:
+            self.best = self.initial_best
+            self.wait = self.initial_wait
+
+
+class ResumedReduceLROnPlateau(ReduceLROnPlateau):
+    """
+    ReduceLROnPlateau that saves its state to state_path after every epoch and reloads it
+    when training begins, so that a resumed run keeps its reduced learning rate, best value
+    and counters instead of restarting the schedule.
+    """
+
+    def __init__(self, state_path, **kwargs):
+        super().__init__(**kwargs)
+        self.state_path = state_path
+
+    def on_train_begin(self, logs=None):
+        super().on_train_begin(logs)
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                state = json.load(f)
+            self.best = state['best']
+            self.wait = state['wait']
+            self.cooldown_counter = state['cooldown_counter']
+            self.model.optimizer.learning_rate = state['learning_rate']
+
+    def on_epoch_end(self, epoch, logs=None):
+        super().on_epoch_end(epoch, logs)
+        state = {'best': float(self.best), 'wait': int(self.wait), 'cooldown_counter': int(self.cooldown_counter),
+                 'learning_rate': float(np.asarray(self.model.optimizer.learning_rate))}
+        with open(self.state_path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.state_path + '.tmp', self.state_path)
+
+
+class WindowBatches(Sequence):
+    """
+    Batches of the create_sequences windows (X[i:i + n_steps] -> Y[i + n_steps]) of flat arrays,
+    built one batch at a time. The flat arrays may be memory-mapped: the full
+    (windows, n_steps, features) array is never materialized.
+    """
+
+    def __init__(self, X, Y, n_steps, batch_size, indices=None, shuffle=False, seed=None):
+        super().__init__()
+        self.windows = sliding_window_view(X, n_steps, axis=0)  # (rows - n_steps + 1, features, n_steps) view
+        self.Y = Y
+        self.n_steps = n_steps
+        self.batch_size = batch_size
+        self.order = np.arange(max(0, len(X) - n_steps)) if indices is None else np.array(indices)
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+        if shuffle:
+            self.rng.shuffle(self.order)
+
+    def __len__(self):
+        return (len(self.order) + self.batch_size - 1) // self.batch_size
+
+    def __getitem__(self, i):
+        index = self.order[i * self.batch_size:(i + 1) * self.batch_size]
+        X = np.ascontiguousarray(self.windows[index].transpose(0, 2, 1), dtype=np.float32)
+        return X, np.asarray(self.Y[index + self.n_steps], dtype=np.float32)
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self.rng.shuffle(self.order)
+
+
+class EpochTimer(Callback):
+    """Wall-clock time of every training epoch (validation included)."""
+
+    def on_train_begin(self, logs=None):
+        self.times = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.times.append(time.perf_counter() - self.start)
+
+
+class PruningCallback(Callback):
+    """
+    Stops a trial early: should_prune(epoch, val_loss) is called after every epoch and
+    returns True when the trial is not worth finishing (used by tune.py).
+    """
+
+    def __init__(self, should_prune):
+        super().__init__()
+        self.should_prune = should_prune
+        self.pruned_at = None
+
+    def on_epoch_end(self, epoch, logs=None):
+        val_loss = (logs or {}).get('val_loss')
+        if val_loss is not None and self.should_prune(epoch, float(val_loss)):
+            self.pruned_at = epoch
+            self.model.stop_training = True
+
+
+# --- 2. Headless Output ---
+def save_history_plot(history, path):
+    epochs = np.arange(1, len(history) + 1)
+    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    for ax, metric, label in ((axes[0], 'loss', 'Loss (MSE)'), (axes[1], 'mae', 'MAE')):
+        ax.plot(epochs, history[metric], 'b', label=f'Training {label}')
+        ax.plot(epochs, history[f'val_{metric}'], 'r', label=f'Validation {label}')
+        ax.set_title(f'Training and Validation {label}')
+        ax.set_xlabel('Epochs')
+        ax.set_ylabel(label)
+        ax.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def save_trajectory_plots(y_true, y_pred, run_dir):
+    # 3D trajectory
+    fig = plt.figure(figsize=(10, 8))
+    ax = fig.add_subplot(111, projection='3d')
+    ax.plot(y_true[:, 0], y_true[:, 1], y_true[:, 2],
+            label='Actual Trajectory', color='green', linewidth=2, alpha=0.7)
+    ax.plot(y_pred[:, 0], y_pred[:, 1], y_pred[:, 2],
+            label='Predicted Trajectory', color='red', linestyle='--', linewidth=2, alpha=0.7)
+    ax.set_title('3D Flight Trajectory Comparison')
+    ax.set_xlabel('X Position')
+    ax.set_ylabel('Y Position')
+    ax.set_zlabel('Z Position')
+    ax.legend()
+    fig.savefig(os.path.join(run_dir, 'trajectory_3d.png'))
+    plt.close(fig)
+
+    # Coordinate-wise comparison (X, Y, Z separately)
+    fig, axes = plt.subplots(3, 1, figsize=(12, 10), sharex=True)
+    for i, (component, color) in enumerate(zip(['X', 'Y', 'Z'], ['blue', 'orange', 'purple'])):
+        axes[i].plot(y_true[:, i], label=f'Actual {component}', color=color)
+        axes[i].plot(y_pred[:, i], label=f'Predicted {component}', color='black', linestyle='--')
+        axes[i].set_ylabel(f'{component} Position')
+        axes[i].legend(loc='upper right')
+        axes[i].grid(True)
+    axes[-1].set_xlabel('Time Step (Test Set)')
+    fig.suptitle('Coordinate-wise Comparison (X, Y, Z)')
+    fig.tight_layout()
+    fig.savefig(os.path.join(run_dir, 'trajectory_components.png'))
+    plt.close(fig)
+
+
+def save_metrics(metrics, path):
+    with open(path, 'w') as f:
+        json.dump(metrics, f, indent=2, default=float)
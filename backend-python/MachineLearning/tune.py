@@ -0,0 +1,343 @@
+import argparse
+import hashlib
+import inspect
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from dataset_append import MANIFEST_FILE
+from pipeline import scale_features
+from preprocessing import load_preprocessing, save_preprocessing
+
+# Unattended hyperparameter search for the sequence models of model_zoo.py.
+#
+#   python tune.py --trials 200                     # overnight run, one trial per free core group
+#   python tune.py --trials 40 --threads-per-trial 4 --epochs 30
+#   python tune.py --report                         # best trials so far
+#
+# The CSV is preprocessed once into a cache of .npy arrays that every trial memory-maps;
+# trials run in a process pool, each one limited to a few TensorFlow threads so they do not
+# fight over the cores. A trial whose validation loss is worse than the median of the other
+# trials at the same epoch is pruned. Every trial and every epoch is recorded in a local
+# SQLite table, so an interrupted search keeps its results and can simply be started again.
+
+# --- 1. Configuration ---
+FILE_PATH = 'dataset_tensorflow.csv'
+CACHE_DIR = os.path.join('cache', 'tune')
+RESULTS_DB = os.path.join('runs', 'tuning.sqlite')
+TEST_SIZE = 0.2
+VALIDATION_SPLIT = 0.1
+EPOCHS = 50
+PATIENCE = 8
+# Pruning starts after WARMUP_EPOCHS, once MIN_TRIALS_FOR_PRUNING other trials reached that epoch
+WARMUP_EPOCHS = 3
+MIN_TRIALS_FOR_PRUNING = 4
+# Bump when scale_features() changes, so old caches are not reused
+CACHE_VERSION = 1
+
+# Categorical choices are lists, (low, high) tuples are sampled log-uniformly for the
+# 'log' parameters and uniformly otherwise. 'width' scales the default layer sizes.
+SEARCH_SPACE = {
+    'model': ['lstm', 'gru', 'conv1d', 'mlp'],
+    'n_steps': [10, 20, 30, 45, 60],
+    'batch_size': [128, 256, 512, 1024],
+    'width': [0.5, 1.0, 1.5, 2.0],
+    'dropout': (0.0, 0.5),
+    'l2_weight': (1e-5, 1e-1),
+    'learning_rate': (1e-4, 3e-3),
+}
+LOG_PARAMETERS = {'l2_weight', 'learning_rate'}
+
+
+# --- 2. Shared Dataset Cache ---
+def cache_key(file_path, test_size, manifest_file):
+    stat = os.stat(file_path)
+    manifest_mtime = os.path.getmtime(manifest_file) if os.path.exists(manifest_file) else None
+    payload = [CACHE_VERSION, os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, test_size, manifest_mtime]
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()[:16]
+
+
+def build_dataset_cache(file_path=FILE_PATH, test_size=TEST_SIZE, cache_dir=CACHE_DIR,
+                        manifest_file=MANIFEST_FILE):
+    """Preprocesses the CSV once; returns the cache directory holding the flat scaled arrays."""
+    path = os.path.join(cache_dir, cache_key(file_path, test_size, manifest_file))
+    if os.path.exists(os.path.join(path, 'preprocessing.json')):
+        print(f"Using the preprocessed dataset in '{path}'")
+        return path
+
+    print(f"Preprocessing '{file_path}' into '{path}'...")
+    flat = scale_features(pd.read_csv(file_path), test_size, manifest_file)
+    # Written next to its final place then renamed, so a worker never maps a partial cache
+    tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+    os.makedirs(tmp_path)
+    for name in ('X_train', 'Y_train', 'X_test', 'Y_test'):
+        np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(flat[name]))
+    save_preprocessing(os.path.join(tmp_path, 'preprocessing.json'), {
+        'feature_columns': flat['feature_columns'],
+        'x_mean': flat['x_scaler'].mean_,
+        'x_scale': flat['x_scaler'].scale_,
+        'y_mean': flat['y_scaler'].mean_,
+        'y_scale': flat['y_scaler'].scale_,
+        'dt': flat['dt'],
+        'launch_altitude': flat['launch_altitude'],
+        'source': os.path.abspath(file_path),
+        'test_size': test_size,
+    })
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return path
+
+
+def load_dataset_cache(path):
+    """Flat arrays memory-mapped read-only: every worker shares the same page cache."""
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+              for name in ('X_train', 'Y_train', 'X_test', 'Y_test')}
+    return arrays, load_preprocessing(os.path.join(path, 'preprocessing.json'))
+
+
+# --- 3. Results Table ---
+class ResultsTable:
+    """Trials and per-epoch validation losses in a local SQLite file, shared by the workers."""
+
+    def __init__(self, path=RESULTS_DB):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS trials (
+                trial_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                epochs INTEGER,
+                best_val_loss REAL,
+                test_mae REAL,
+                test_mae_m REAL,
+                parameters INTEGER,
+                epoch_time_s REAL,
+                duration_s REAL,
+                error TEXT,
+                created REAL,
+                finished REAL
+            );
+            CREATE TABLE IF NOT EXISTS epochs (
+                trial_id INTEGER NOT NULL,
+                epoch INTEGER NOT NULL,
+                val_loss REAL NOT NULL,
+                PRIMARY KEY (trial_id, epoch)
+            );
+        """)
+
+    def add_trial(self, params):
+        cursor = self.connection.execute("INSERT INTO trials (params, status, created) VALUES (?, 'queued', ?)",
+                                         (json.dumps(params), time.time()))
+        return cursor.lastrowid
+
+    def set_status(self, trial_id, status):
+        self.connection.execute("UPDATE trials SET status = ? WHERE trial_id = ?", (status, trial_id))
+
+    def mark_interrupted(self):
+        """Trials left queued or running by a search that was killed."""
+        cursor = self.connection.execute(
+            "UPDATE trials SET status = 'interrupted' WHERE status IN ('queued', 'running')")
+        return cursor.rowcount
+
+    def report(self, trial_id, epoch, val_loss, warmup=WARMUP_EPOCHS, min_trials=MIN_TRIALS_FOR_PRUNING):
+        """Records an epoch; True when the trial should be pruned (median stopping rule)."""
+        self.connection.execute("INSERT OR REPLACE INTO epochs VALUES (?, ?, ?)", (trial_id, epoch, val_loss))
+        if epoch + 1 < warmup:
+            return False
+        # Best val_loss up to this epoch, for this trial and for the others that got this far
+        best = self.connection.execute("SELECT MIN(val_loss) FROM epochs WHERE trial_id = ? AND epoch <= ?",
+                                       (trial_id, epoch)).fetchone()[0]
+        others = [row[0] for row in self.connection.execute(
+            "SELECT MIN(val_loss) FROM epochs WHERE trial_id != ? AND epoch <= ? "
+            "GROUP BY trial_id HAVING MAX(epoch) >= ?", (trial_id, epoch, epoch))]
+        return len(others) >= min_trials and best > float(np.median(others))
+
+    def finish(self, trial_id, status, **results):
+        columns = ['status', 'finished'] + list(results)
+        values = [status, time.time()] + list(results.values())
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        self.connection.execute(f"UPDATE trials SET {assignments} WHERE trial_id = ?", values + [trial_id])
+
+    def to_frame(self):
+        return pd.read_sql_query("SELECT * FROM trials ORDER BY trial_id", self.connection)
+
+    def best(self, n=10):
+        # Pruned trials stopped early: their val_loss is not comparable with the complete ones
+        return pd.read_sql_query(
+            "SELECT * FROM trials WHERE status = 'complete' AND test_mae_m IS NOT NULL "
+            "ORDER BY best_val_loss LIMIT ?", self.connection, params=(n,))
+
+    def count(self, status):
+        return self.connection.execute("SELECT COUNT(*) FROM trials WHERE status = ?", (status,)).fetchone()[0]
+
+
+# --- 4. Search Space ---
+def sample_params(rng):
+    params = {}
+    for name, space in SEARCH_SPACE.items():
+        if isinstance(space, list):
+            params[name] = space[rng.integers(len(space))]
+        elif name in LOG_PARAMETERS:
+            params[name] = float(math.exp(rng.uniform(math.log(space[0]), math.log(space[1]))))
+        else:
+            params[name] = float(rng.uniform(*space))
+    # numpy scalars -> plain Python values, for JSON
+    return {name: value.item() if hasattr(value, 'item') else value for name, value in params.items()}
+
+
+def model_hyperparameters(params):
+    """Keyword arguments of model_zoo.build_model for a sampled parameter set."""
+    from model_zoo import MODEL_REGISTRY
+
+    defaults = inspect.signature(MODEL_REGISTRY[params['model']]).parameters
+    units = tuple(max(4, int(round(n * params['width']))) for n in defaults['units'].default)
+    return {'units': units, 'dropout': params['dropout'], 'l2_weight': params['l2_weight']}
+
+
+# --- 5. Trials (worker processes) ---
+def init_worker(threads):
+    # Must run before TensorFlow is imported in the worker
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def run_trial(trial_id, params, cache_path, db_path, epochs, patience):
+    import tensorflow as tf
+    from tensorflow.keras.callbacks import EarlyStopping
+
+    from model_zoo import build_model
+    from train import EpochTimer, PruningCallback, WindowBatches
+
+    table = ResultsTable(db_path)
+    table.set_status(trial_id, 'running')
+    start = time.perf_counter()
+    try:
+        arrays, preprocessing = load_dataset_cache(cache_path)
+        n_steps, batch_size = params['n_steps'], params['batch_size']
+        # Windows are cut from the memory-mapped arrays batch by batch: a trial never holds
+        # the whole windowed dataset. The last 10% of the training windows validate, as
+        # validation_split would.
+        n_windows = max(0, len(arrays['X_train']) - n_steps)
+        n_fit = int(n_windows * (1 - VALIDATION_SPLIT))
+        train_batches = WindowBatches(arrays['X_train'], arrays['Y_train'], n_steps, batch_size,
+                                      np.arange(n_fit), shuffle=True, seed=trial_id)
+        val_batches = WindowBatches(arrays['X_train'], arrays['Y_train'], n_steps, batch_size,
+                                    np.arange(n_fit, n_windows))
+        test_batches = WindowBatches(arrays['X_test'], arrays['Y_test'], n_steps, batch_size)
+
+        model = build_model(params['model'], (n_steps, arrays['X_train'].shape[1]), arrays['Y_train'].shape[1],
+                            learning_rate=params['learning_rate'], **model_hyperparameters(params))
+        timer = EpochTimer()
+        pruning = PruningCallback(lambda epoch, val_loss: table.report(trial_id, epoch, val_loss))
+        history = model.fit(train_batches, validation_data=val_batches, epochs=epochs, shuffle=False, verbose=0,
+                            callbacks=[timer, pruning,
+                                       EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True)])
+
+        y_pred = model.predict(test_batches, verbose=0)
+        error = np.abs(y_pred - arrays['Y_test'][n_steps:])
+        results = {
+            'epochs': len(history.history['val_loss']),
+            'best_val_loss': float(np.min(history.history['val_loss'])),
+            'test_mae': float(error.mean()),
+            'test_mae_m': float((error * np.asarray(preprocessing['y_scale'])).mean()),
+            'parameters': model.count_params(),
+            'epoch_time_s': float(np.median(timer.times)),
+            'duration_s': time.perf_counter() - start,
+        }
+        table.finish(trial_id, 'pruned' if pruning.pruned_at is not None else 'complete', **results)
+        return trial_id, results
+    except Exception as e:
+        table.finish(trial_id, 'failed', error=f"{type(e).__name__}: {e}", duration_s=time.perf_counter() - start)
+        raise
+    finally:
+        tf.keras.backend.clear_session()
+
+
+# --- 6. Search ---
+def run_search(n_trials, workers=None, threads_per_trial=2, epochs=EPOCHS, patience=PATIENCE, seed=None,
+               file_path=FILE_PATH, db_path=RESULTS_DB, cache_dir=CACHE_DIR):
+    cache_path = build_dataset_cache(file_path, TEST_SIZE, cache_dir)
+    table = ResultsTable(db_path)
+    interrupted = table.mark_interrupted()
+    if interrupted:
+        print(f"{interrupted} trials of a previous search were interrupted.")
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_trial)
+    print(f"Running {n_trials} trials on {workers} workers x {threads_per_trial} threads.")
+
+    rng = np.random.default_rng(seed)
+    # TensorFlow is not fork-safe: workers are spawned and import it after the thread limits are set
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker,
+                             initargs=(threads_per_trial,)) as pool:
+        futures = {}
+        for _ in range(n_trials):
+            params = sample_params(rng)
+            trial_id = table.add_trial(params)
+            futures[pool.submit(run_trial, trial_id, params, cache_path, db_path, epochs, patience)] = trial_id
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                trial_id, results = future.result()
+                print(f"[{done}/{n_trials}] trial {trial_id}: val_loss {results['best_val_loss']:.4f}, "
+                      f"test MAE {results['test_mae_m']:.2f} m, {results['epochs']} epochs")
+            except Exception as e:
+                print(f"[{done}/{n_trials}] trial {futures[future]} failed: {e}")
+    return table
+
+
+def print_best(table, n=10):
+    best = table.best(n)
+    pruned = table.count('pruned')
+    if pruned:
+        print(f"{pruned} pruned trials are not ranked.")
+    if best.empty:
+        print("No complete trials yet.")
+        return
+    print(best[['trial_id', 'status', 'best_val_loss', 'test_mae_m', 'parameters', 'epoch_time_s', 'epochs',
+                'params']].to_string(index=False))
+    params = json.loads(best['params'].iloc[0])
+    print(f"\nBest parameters: {params}")
+    print(f"ML1.py: MODEL_NAME = '{params['model']}', N_STEPS = {params['n_steps']}, "
+          f"BATCH_SIZE = {params['batch_size']}, HYPERPARAMETERS = {model_hyperparameters(params)}, "
+          f"LEARNING_RATE = {params['learning_rate']:.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter search for the sequence models.")
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=None, help="default: cores / threads per trial")
+    parser.add_argument("--threads-per-trial", type=int, default=2)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--patience", type=int, default=PATIENCE)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--data", default=FILE_PATH)
+    parser.add_argument("--db", default=RESULTS_DB)
+    parser.add_argument("--report", action="store_true", help="only print the best trials recorded so far")
+    args = parser.parse_args()
+
+    if args.report:
+        print_best(ResultsTable(args.db))
+    else:
+        if not os.path.exists(args.data):
+            print(f"Error: File not found at {args.data}.")
+            exit()
+        print_best(run_search(args.trials, args.workers, args.threads_per_trial, args.epochs, args.patience,
+                              args.seed, args.data, args.db))
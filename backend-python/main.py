@@ -1,9 +1,365 @@
-from fastapi import FastAPI
-import your_model
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+import numpy as np
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BACKEND_DIR, "MachineLearning"))
+sys.path.append(os.path.join(BACKEND_DIR, "DatasetGenerator"))
+import geodesy
+import simulation_jobs
+import trajectory_lod
+from predictor import OUTPUT_COLUMNS, TrajectoryPredictor
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Queued simulations survive restarts: the dispatcher picks them up again on startup
+    get_job_manager().start()
+    yield
+    get_job_manager().stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+MODELS = {
+    "direct": "direct_model",
+    "sequence": "trajectory_model",
+}
+FORMATS = ["json", "ndjson", "sse", "binary"]
+BATCH_FORMATS = ["json", "ndjson", "binary"]
+COORDINATES = {
+    "local": OUTPUT_COLUMNS,
+    "geodetic": ["time", "latitude", "longitude", "altitude"],
+}
+MAX_BATCH_ROWS = 100_000
+BATCH_SIZE = 4096
+MAX_SIMULATION_TIMEOUT = 3600  # seconds
+EVENT_POLL_INTERVAL = 0.5
+
+
+class LaunchParams(BaseModel):
+    # Same defaults as RocketCreator
+    heading: float = 220
+    ramp_inclinaison: float = 85
+    motor_name: str = "Pro75M1670"
+    radius: float = 127 / 2000
+    mass: float = 14.426
+    inertia_ixy: float = 6.321
+    inertia_iz: float = 0.034
+    center_of_mass_without_motor: float = 1
+    cone_length: float = 0.55829
+    rocket_length: float = 2.533
+    fin_cat: str = "trapezoidal"
+    number_of_ailerons: int = 4
+    root_chord: float = 0.120
+    tip_chord: float = 0.060
+    span: float = 0.110
+    fins_pos: float = 0
+    fin_inclinaison: float = 0.5
+    drag_coeff: float = 1.0
+    trigger: str = "apogee"
+
+
+class RocketParams(LaunchParams):
+    wind_velocity_x: float = 0.0
+    wind_velocity_y: float = 0.0
+
+
+class SimulationParams(LaunchParams):
+    # Launch day in days from today: the simulation uses the weather forecast of that day
+    delay: int = Field(0, ge=0, le=10)
+
+    def rocket_creator_kwargs(self):
+        params = self.model_dump(exclude={"inertia_ixy", "inertia_iz"})
+        params["inertia"] = (self.inertia_ixy, self.inertia_ixy, self.inertia_iz)
+        return params
+
+
+@lru_cache(maxsize=None)
+def get_predictor(model):
+    if model not in MODELS:
+        raise HTTPException(status_code=400, detail=f"Unknown model '{model}', expected one of {list(MODELS)}")
+    try:
+        return TrajectoryPredictor.from_name(MODELS[model])
+    except Exception as e:
+        # Missing or unreadable ONNX / preprocessing files: not cached, so a later export is picked up
+        print(f"Could not load model '{model}': {type(e).__name__}: {e}")
+        raise HTTPException(status_code=503, detail=f"Model '{model}' is not available: models/{MODELS[model]}.onnx "
+                                                    f"or its preprocessing file is missing or unreadable")
+
+
+def check_coordinates(coordinates):
+    if coordinates not in COORDINATES:
+        raise HTTPException(status_code=400,
+                            detail=f"Unknown coordinates '{coordinates}', expected one of {list(COORDINATES)}")
+
+
+def to_coordinates(trajectory, coordinates):
+    """(..., 4) local-frame rows (time, x, y, z) -> rows in the requested coordinates."""
+    if coordinates == "local":
+        return trajectory
+    converted = np.empty(trajectory.shape, dtype=np.float64)
+    converted[..., 0] = trajectory[..., 0]
+    converted[..., 1], converted[..., 2], converted[..., 3] = geodesy.local_to_geodetic(
+        trajectory[..., 1], trajectory[..., 2], trajectory[..., 3])
+    return converted
+
+
+def check_level_of_detail(max_points, tolerance):
+    if max_points is not None and max_points < 3:
+        raise HTTPException(status_code=400, detail="max_points must be at least 3 (launch, apogee and landing)")
+    if tolerance is not None and tolerance <= 0:
+        raise HTTPException(status_code=400, detail="tolerance must be positive (meters)")
+
+
+def binary_response(trajectory, columns=OUTPUT_COLUMNS):
+    # Little-endian float32, row-major, shape given in the headers
+    return Response(
+        content=np.ascontiguousarray(trajectory, dtype="<f4").tobytes(),
+        media_type="application/octet-stream",
+        headers={
+            "X-Trajectory-Shape": ",".join(str(d) for d in trajectory.shape),
+            "X-Trajectory-Columns": ",".join(columns),
+        },
+    )
+
+
+def stream_points(chunks, fmt, coordinates="local"):
+    columns = COORDINATES[coordinates]
+    for chunk in chunks:
+        lines = []
+        for row in to_coordinates(chunk, coordinates).tolist():
+            point = json.dumps(dict(zip(columns, row)))
+            lines.append(f"data: {point}\n\n" if fmt == "sse" else point + "\n")
+        yield "".join(lines)
+    if fmt == "sse":
+        yield "event: end\ndata: {}\n\n"
 
-app = FastAPI()
 
 @app.get("/predict")
-def predict(x: float):
-    result = your_model.inference(x)
-    return {"prediction": result}
+def predict(params: RocketParams = Depends(), model: str = "direct", format: str = "json",
+            coordinates: str = "local", max_points: int | None = None, tolerance: float | None = None):
+    """
+    Predicts the trajectory of one rocket. format=ndjson / sse stream the points
+    as the model produces them, format=binary returns a float32 (n, 4) array.
+    coordinates=geodetic returns latitude / longitude / altitude instead of x / y / z.
+    max_points and/or tolerance (m) return a simplified level of detail that keeps
+    the launch, apogee and landing points exact.
+    """
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}', expected one of {FORMATS}")
+    check_coordinates(coordinates)
+    check_level_of_detail(max_points, tolerance)
+    predictor = get_predictor(model)
+    rocket = params.model_dump()
+    simplified = max_points is not None or tolerance is not None
+
+    if format in ("ndjson", "sse"):
+        media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+        # A level of detail needs the whole trajectory, which is then streamed at once
+        chunks = ([trajectory_lod.simplify(predictor.predict(rocket), tolerance, max_points)] if simplified
+                  else predictor.iter_predict(rocket))
+        return StreamingResponse(stream_points(chunks, format, coordinates), media_type=media_type)
+
+    trajectory = trajectory_lod.simplify(predictor.predict(rocket), tolerance, max_points)
+    trajectory = to_coordinates(trajectory, coordinates)
+    if format == "binary":
+        return binary_response(trajectory, COORDINATES[coordinates])
+    return {"columns": COORDINATES[coordinates], "prediction": trajectory.tolist()}
+
+
+def parse_batch_rows(body, content_type):
+    # CSV in the master_rocket_inputs.csv schema, or JSON {"rows": [{...}, ...]}
+    if content_type.startswith("text/csv"):
+        try:
+            return list(csv.DictReader(io.StringIO(body.decode())))
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="CSV body must be UTF-8 encoded")
+    try:
+        rows = json.loads(body)["rows"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail='Expected text/csv or JSON {"rows": [...]}')
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise HTTPException(status_code=400, detail='"rows" must be a list of parameter objects')
+    return rows
+
+
+def predict_rows(predictor, rows):
+    keys = dict.fromkeys(key for row in rows for key in row)
+    columns = {key: [row.get(key) for row in rows] for key in keys}
+    try:
+        features = predictor.encoder.encode_table(columns, strict=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    trajectories = [predictor.predict_batch(features[start:start + BATCH_SIZE])
+                    for start in range(0, len(features), BATCH_SIZE)]
+    if len(trajectories) == 1:
+        return trajectories[0]
+    # Sequence model rollouts may have different lengths per batch: pad with NaN
+    n_points = max(t.shape[1] for t in trajectories)
+    return np.concatenate([np.pad(t, ((0, 0), (0, n_points - t.shape[1]), (0, 0)), constant_values=np.nan)
+                           for t in trajectories])
+
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request, model: str = "direct", format: str = "binary", coordinates: str = "local",
+                        max_points: int | None = None, tolerance: float | None = None):
+    """
+    Predicts the trajectories of many rockets at once. Returns a (rockets, points, 4)
+    float32 array (format=binary, NaN-padded), or JSON / one NDJSON line per rocket.
+    max_points / tolerance simplify every trajectory as in GET /predict.
+    """
+    if format not in BATCH_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}', expected one of {BATCH_FORMATS}")
+    check_coordinates(coordinates)
+    check_level_of_detail(max_points, tolerance)
+    predictor = get_predictor(model)
+    rows = parse_batch_rows(await request.body(), request.headers.get("content-type", ""))
+    if not rows:
+        raise HTTPException(status_code=400, detail="No parameter rows given")
+    if len(rows) > MAX_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_ROWS} rows per request")
+    rocket_ids = [str(row.get("rocket_id", i)) for i, row in enumerate(rows)]
+
+    trajectories = await run_in_threadpool(predict_rows, predictor, rows)
+    trajectories = await run_in_threadpool(trajectory_lod.simplify, trajectories, tolerance, max_points)
+    trajectories = to_coordinates(trajectories, coordinates)
+    if format == "binary":
+        # Rockets are in the order of the input rows
+        return binary_response(trajectories, COORDINATES[coordinates])
+
+    def rocket_points(i):
+        trajectory = trajectories[i]
+        return trajectory[~np.isnan(trajectory[:, 0])].tolist()
+
+    if format == "ndjson":
+        lines = (json.dumps({"rocket_id": rocket_id, "prediction": rocket_points(i)}) + "\n"
+                 for i, rocket_id in enumerate(rocket_ids))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    return {"columns": COORDINATES[coordinates], "rocket_ids": rocket_ids,
+            "predictions": [rocket_points(i) for i in range(len(rocket_ids))]}
+
+
+@lru_cache(maxsize=None)
+def get_job_manager():
+    return simulation_jobs.JobManager()
+
+
+def get_job(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown simulation job '{job_id}'")
+    return job
+
+
+def job_status(job):
+    status = {key: job[key] for key in ("job_id", "status", "error", "created", "started", "finished")}
+    status["cached"] = None if job["cached"] is None else bool(job["cached"])
+    return status
+
+
+@app.post("/simulations", status_code=202)
+def submit_simulation(params: SimulationParams, timeout: float = simulation_jobs.DEFAULT_TIMEOUT):
+    """
+    Queues a full RocketPy simulation (seconds to minutes) and returns its job id at once.
+    Poll GET /simulations/{job_id}, or follow GET /simulations/{job_id}/events, then fetch
+    GET /simulations/{job_id}/result. timeout is in seconds.
+    """
+    if not 0 < timeout <= MAX_SIMULATION_TIMEOUT:
+        raise HTTPException(status_code=400, detail=f"timeout must be in ]0, {MAX_SIMULATION_TIMEOUT}] seconds")
+    try:
+        job_id = get_job_manager().submit(params.rocket_creator_kwargs(), timeout)
+    except simulation_jobs.QueueFullError as e:
+        raise HTTPException(status_code=503, detail=f"Simulation queue is full ({e}), retry later",
+                            headers={"Retry-After": "30"})
+    return job_status(get_job(job_id))
+
+
+@app.get("/simulations/{job_id}")
+def simulation_status(job_id: str):
+    return job_status(get_job(job_id))
+
+
+@app.get("/simulations/{job_id}/events")
+async def simulation_events(job_id: str):
+    """Server-sent events: one 'status' event per status change, then 'end' once the job is over."""
+    get_job(job_id)
+
+    async def events():
+        last = None
+        while True:
+            status = job_status(await run_in_threadpool(get_job, job_id))
+            if status != last:
+                yield f"event: status\ndata: {json.dumps(status)}\n\n"
+                last = status
+            if status["status"] in simulation_jobs.FINAL_STATUSES:
+                yield "event: end\ndata: {}\n\n"
+                return
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.delete("/simulations/{job_id}")
+def cancel_simulation(job_id: str):
+    """Cancels a queued or running simulation; finished jobs are left as they are."""
+    if not get_job_manager().cancel(job_id):
+        job = get_job(job_id)
+        raise HTTPException(status_code=409, detail=f"Simulation job is already {job['status']}")
+    return job_status(get_job(job_id))
+
+
+def finished_job(job_id):
+    job = get_job(job_id)
+    if job["status"] != "succeeded":
+        if job["status"] in simulation_jobs.FINAL_STATUSES:
+            detail = "Rocket is unstable, nothing was simulated" if job["status"] == "unstable" else \
+                f"Simulation job {job['status']}: {job['error']}"
+            raise HTTPException(status_code=422 if job["status"] == "unstable" else 410, detail=detail)
+        raise HTTPException(status_code=409, detail=f"Simulation job is still {job['status']}")
+    return job
+
+
+def job_file(job, name):
+    path = get_job_manager().file_path(job, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Simulation job produced no {name} file")
+    return path
+
+
+@app.get("/simulations/{job_id}/result")
+def simulation_result(job_id: str, format: str = "json", coordinates: str = "local",
+                      max_points: int | None = None, tolerance: float | None = None):
+    """Simulated trajectory, with the same formats, coordinates and level of detail options as GET /predict."""
+    if format not in BATCH_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}', expected one of {BATCH_FORMATS}")
+    check_coordinates(coordinates)
+    check_level_of_detail(max_points, tolerance)
+    job = finished_job(job_id)
+    trajectory = np.loadtxt(job_file(job, "trajectory"), delimiter=",", skiprows=1,
+                            usecols=range(len(OUTPUT_COLUMNS)), ndmin=2)
+    trajectory = trajectory_lod.simplify(trajectory, tolerance, max_points)
+    if format == "ndjson":
+        return StreamingResponse(stream_points([trajectory], format, coordinates), media_type="application/x-ndjson")
+    trajectory = to_coordinates(trajectory, coordinates)
+    if format == "binary":
+        return binary_response(trajectory, COORDINATES[coordinates])
+    return {"columns": COORDINATES[coordinates], "trajectory": trajectory.tolist()}
+
+
+@app.get("/simulations/{job_id}/kml")
+def simulation_kml(job_id: str):
+    job = finished_job(job_id)
+    return FileResponse(job_file(job, "kml"), media_type="application/vnd.google-earth.kml+xml",
+                        filename=f"{job_id}.kml")